@@ -0,0 +1,266 @@
+"""
+Structured, level-controlled logging for the recognizers and API servers.
+
+All loggers live under the 'anpr' namespace. configure_logging() attaches
+a QueueHandler to it, and a QueueListener thread formats and writes the
+records, so log I/O never runs on the request path. Records carry the
+correlation ID of the request they belong to.
+
+Verbose per-candidate diagnostics (raw OCR text per config, every pattern
+match, image sizes) are only emitted when the logger is at DEBUG level or
+when the current request was picked by ANPR_LOG_SAMPLE_RATE.
+
+Environment variables:
+    ANPR_LOG_LEVEL        DEBUG, INFO, WARNING, ... (default INFO)
+    ANPR_LOG_FORMAT       'text' or 'json' (default text)
+    ANPR_LOG_SAMPLE_RATE  Fraction of requests with diagnostics at any level (default 0)
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional, Tuple
+
+ROOT_LOGGER = 'anpr'
+
+# Correlation ID and diagnostics sampling decision of the request being served
+_request_id = ContextVar('anpr_request_id', default='-')
+_sampled = ContextVar('anpr_log_sampled', default=False)
+
+# Attributes every LogRecord has; anything else was passed in `extra` and is logged as a field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener = None
+_configure_lock = threading.Lock()
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Return a logger in the 'anpr' namespace.
+
+    Args:
+        name (str): Component name, e.g. 'uk_recognizer'
+
+    Returns:
+        logging.Logger: Logger named 'anpr.<name>'
+    """
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def sample_rate_from_env() -> float:
+    """Fraction of requests that log verbose diagnostics (ANPR_LOG_SAMPLE_RATE)."""
+    return float(os.environ.get('ANPR_LOG_SAMPLE_RATE', 0))
+
+
+def current_request_id() -> str:
+    """Correlation ID of the request being served, or '-' outside of a request."""
+    return _request_id.get()
+
+
+def current_request() -> Tuple[str, bool]:
+    """
+    Correlation ID and sampling decision of the current request.
+
+    Used to carry the request context into worker processes.
+
+    Returns:
+        Tuple[str, bool]: (request ID, whether diagnostics are sampled)
+    """
+    return _request_id.get(), _sampled.get()
+
+
+@contextmanager
+def request_context(request_id: Optional[str] = None, sampled: Optional[bool] = None):
+    """
+    Tag every record logged inside the with-block with a correlation ID.
+
+    Args:
+        request_id (Optional[str]): Correlation ID; a new one is generated if None
+        sampled (Optional[bool]): Log diagnostics for this request; drawn from
+            ANPR_LOG_SAMPLE_RATE if None
+
+    Yields:
+        str: The correlation ID
+    """
+    request_id = request_id or uuid.uuid4().hex[:16]
+    if sampled is None:
+        rate = sample_rate_from_env()
+        sampled = rate > 0 and random.random() < rate
+    id_token = _request_id.set(request_id)
+    sampled_token = _sampled.set(sampled)
+    try:
+        yield request_id
+    finally:
+        _sampled.reset(sampled_token)
+        _request_id.reset(id_token)
+
+
+def diagnostics_enabled(logger: logging.Logger) -> bool:
+    """
+    Whether verbose diagnostics should be logged right now.
+
+    Check this before building expensive diagnostic messages.
+
+    Args:
+        logger (logging.Logger): Logger the diagnostics would go to
+
+    Returns:
+        bool: True at DEBUG level or for a sampled request
+    """
+    return _sampled.get() or logger.isEnabledFor(logging.DEBUG)
+
+
+def diagnostic(logger: logging.Logger, msg: str, *args, **fields) -> None:
+    """
+    Log a verbose diagnostic message if diagnostics are enabled.
+
+    Messages use %-style arguments so nothing is formatted when they are
+    dropped. For a sampled request below DEBUG level they are logged at INFO.
+
+    Args:
+        logger (logging.Logger): Target logger
+        msg (str): Message with %-style placeholders
+        *args: Message arguments
+        **fields: Structured fields added to the record
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(msg, *args, extra=fields)
+    elif _sampled.get():
+        logger.info(msg, *args, extra=dict(fields, sampled=True))
+
+
+class CorrelationFilter(logging.Filter):
+    """Adds the current request's correlation ID to every record."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as one JSON object per line, including its extra fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'request_id': getattr(record, 'request_id', '-'),
+            'message': record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key not in entry:
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human readable format with the correlation ID and extra fields as key=value pairs."""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)-7s %(name)s [%(request_id)s] %(message)s')
+
+    def format(self, record: logging.LogRecord) -> str:
+        if not hasattr(record, 'request_id'):
+            record.request_id = '-'
+        text = super().format(record)
+        fields = [f"{key}={value}" for key, value in vars(record).items()
+                  if key not in _RECORD_ATTRIBUTES and key != 'request_id']
+        return f"{text} {' '.join(fields)}" if fields else text
+
+
+def configure_logging(level: Optional[str] = None, fmt: Optional[str] = None, stream=None) -> logging.Logger:
+    """
+    Route 'anpr' log records through a queue to a background writer thread.
+
+    Calling it again replaces the previous configuration.
+
+    Args:
+        level (Optional[str]): Log level (default: ANPR_LOG_LEVEL or INFO)
+        fmt (Optional[str]): 'text' or 'json' (default: ANPR_LOG_FORMAT or text)
+        stream: Output stream (default: stderr)
+
+    Returns:
+        logging.Logger: The configured 'anpr' logger
+    """
+    global _listener
+    level = (level or os.environ.get('ANPR_LOG_LEVEL', 'INFO')).upper()
+    fmt = (fmt or os.environ.get('ANPR_LOG_FORMAT', 'text')).lower()
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter() if fmt == 'json' else TextFormatter())
+
+    # The correlation ID is read in the calling thread, before the record is queued
+    records = queue.SimpleQueue()
+    handler = logging.handlers.QueueHandler(records)
+    handler.addFilter(CorrelationFilter())
+
+    with _configure_lock:
+        logger = logging.getLogger(ROOT_LOGGER)
+        if _listener is not None:
+            _listener.stop()
+        for existing in list(logger.handlers):
+            if isinstance(existing, logging.handlers.QueueHandler):
+                logger.removeHandler(existing)
+
+        logger.setLevel(level)
+        logger.addHandler(handler)
+        logger.propagate = False
+        _listener = logging.handlers.QueueListener(records, output)
+        _listener.start()
+
+    return logger
+
+
+def shutdown_logging() -> None:
+    """Write out queued records and stop the writer thread."""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+atexit.register(shutdown_logging)
+
+
+def init_flask_request_ids(app) -> None:
+    """
+    Give every request of a Flask app a correlation ID.
+
+    The ID is taken from the X-Request-ID header when the client sent one
+    and is returned in the X-Request-ID response header.
+
+    Args:
+        app (flask.Flask): Application to instrument
+    """
+    from flask import g, request
+
+    @app.before_request
+    def _enter_request_context():
+        context = request_context(request.headers.get('X-Request-ID'))
+        g.request_id = context.__enter__()
+        g.request_log_context = context
+
+    @app.after_request
+    def _add_request_id_header(response):
+        if 'request_id' in g:
+            response.headers['X-Request-ID'] = g.request_id
+        return response
+
+    @app.teardown_request
+    def _exit_request_context(error=None):
+        context = g.pop('request_log_context', None)
+        if context is not None:
+            context.__exit__(None, None, None)
@@ -0,0 +1,336 @@
+"""
+OCR cascade used by the one-click API server (web_interface/start_api.py).
+
+The cascade reads a whole uploaded image as a plate: a contrast-enhanced
+OCR pass, an OpenCV-thresholded pass, single character extraction, a
+high-contrast last attempt and finally the upload's filename. Each step
+only runs while no plate has been found, and each is a separately timed
+stage of the 'api' pipeline configuration.
+
+The confidence of a plate is calibrated (confidence.py) from the OCR word
+confidences, the registration grammar, the candidate score of the image and
+the agreement between OCR passes, rather than fixed by the step that found
+it; a filename guess, with no OCR behind it, scores low.
+"""
+
+import re
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image, ImageEnhance
+
+from anpr_logging import diagnostic, get_logger
+from candidates import score_candidates
+from confidence import confidence_features, plate_confidence
+from debug_sink import DebugSink
+from image_io import load_image, describe_source
+from ocr_engine import OCREngine, get_default_engine
+from ocr_ladder import ConfigLadder
+from pipeline import Pipeline, PipelineContext, Stage
+from uk_grammar import decode
+
+log = get_logger('api_cascade')
+
+# OCR configs for the recognition cascade, in default order
+API_OCR_CONFIGS = [
+    '--psm 7 -l eng --oem 3',
+    '--psm 8 -l eng --oem 3',
+    '--psm 6 -l eng --oem 3',
+    '--psm 11 -l eng --oem 3',
+    '--psm 13 -l eng --oem 3',
+    '--psm 12 -l eng --oem 3'
+]
+
+# Configs of the high-contrast last attempt
+FINAL_OCR_CONFIGS = [
+    '--psm 6 -l eng --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789',
+    '--psm 11 -l eng --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789',
+    '--psm 4 -l eng --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
+]
+
+# Matches at this calibrated confidence are accepted without trying further configs
+EARLY_EXIT_CONFIDENCE = 0.9
+
+# UK license plate format patterns (with variations to handle OCR errors)
+UK_PATTERNS = [
+    r'[A-Z]{2}\s?\d{2}\s?[A-Z]{3}',  # Standard format: AA00 AAA
+    r'[A-Z]{2}\d{2,3}[A-Z]{2,3}',    # No spaces: AA00AAA or similar
+    r'[A-Z]{2}\s?\d{2}\s?[A-Z0-9]{3}' # Allow some digits in the last part
+]
+
+
+def _pattern_matches(text: str):
+    """Yield every plate-like match of the UK patterns in OCR text, without whitespace."""
+    # Clean the text by removing common problematic characters
+    cleaned_text = re.sub(r'[^A-Z0-9\s]', '', text)
+
+    for pattern in UK_PATTERNS:
+        for match in re.findall(pattern, cleaned_text):
+            match_clean = re.sub(r'\s', '', match)
+            if len(match_clean) >= 7:
+                yield match_clean
+
+
+def _read_text(ocr: OCREngine, image, config: str) -> Tuple[str, float]:
+    """Run OCR and return the upper-cased text of its words and their mean confidence (0-100)."""
+    ocr_data = ocr.image_to_data(image, config=config)
+    words = [(str(text), float(conf)) for text, conf in zip(ocr_data['text'], ocr_data['conf'])
+             if str(text).strip() and float(conf) >= 0]
+    text = ' '.join(text for text, _ in words).upper()
+    return text, (sum(conf for _, conf in words) / len(words) if words else 0.0)
+
+
+def _read_features(ctx: PipelineContext, ocr_confidence: float, plate_text: str,
+                   agreement: float = 1.0) -> Dict[str, float]:
+    """Confidence features of a plate read from the whole uploaded image."""
+    decoded = decode(plate_text)
+    return confidence_features(ocr_confidence, decoded['cost'] if decoded else None,
+                               ctx.meta['candidate_score'], agreement)
+
+
+def _set_plate(ctx: PipelineContext, plate_number: str, features: Dict[str, float]) -> None:
+    """Record the plate found by a cascade step and its calibrated confidence."""
+    ctx.meta['plate_number'] = plate_number
+    ctx.meta['confidence_features'] = [features]
+    ctx.meta['confidence'] = plate_confidence(features)
+    ctx.count('found')
+
+
+def _found(ctx: PipelineContext) -> bool:
+    """Whether an earlier cascade step already found a plate."""
+    return ctx.meta.get('plate_number') is not None
+
+
+def build_api_pipeline(ocr_engine: Optional[OCREngine] = None,
+                       debug_sink: Optional[DebugSink] = None) -> Pipeline:
+    """
+    Create the 'api' pipeline configuration.
+
+    Pass filename= to Pipeline.run() to enable the filename fallback.
+
+    Args:
+        ocr_engine (Optional[OCREngine]): OCR backend; defaults to the shared engine pool
+        debug_sink (Optional[DebugSink]): Destination for the thresholded image
+
+    Returns:
+        Pipeline: The API recognition cascade
+    """
+    ocr = ocr_engine if ocr_engine is not None else get_default_engine()
+    debug_sink = debug_sink if debug_sink is not None else DebugSink()
+    # Ladders learn which config wins most often and try it first
+    initial_ladder = ConfigLadder('api_initial', API_OCR_CONFIGS)
+    opencv_ladder = ConfigLadder('api_opencv', API_OCR_CONFIGS)
+
+    def decode(ctx):
+        # Decode the upload once into a single shared buffer; every
+        # stage below works on this array instead of re-reading a file
+        ctx.image = load_image(ctx.source)
+        if ctx.image is None:
+            log.warning("Error loading image: %s", describe_source(ctx.source))
+            ctx.done = True
+            return
+
+        # Decide whether intermediate images of this request are captured
+        ctx.meta['debug_frame'] = debug_sink.start_frame()
+
+    def preprocess(ctx):
+        # Get dimensions to verify it's a license plate (typical aspect ratio ~4.5:1)
+        height, width = ctx.image.shape[:2]
+        aspect_ratio = width / height
+        diagnostic(log, "Image dimensions: %dx%d, aspect ratio: %.2f", width, height, aspect_ratio)
+        
+        # The whole upload is read as one plate candidate
+        ctx.meta['candidate_score'] = float(score_candidates(ctx.image, [(0, 0, width, height)])[0])
+
+        # Convert to grayscale for better OCR (shared by all later stages)
+        gray = cv2.cvtColor(ctx.image, cv2.COLOR_BGR2GRAY)
+        ctx.images['gray'] = gray
+        ctx.meta['gray_image'] = Image.fromarray(gray)
+
+        # Resize to larger dimensions to improve OCR accuracy
+        scale_factor = 3
+        resized_image = ctx.meta['gray_image'].resize((width * scale_factor, height * scale_factor),
+                                                      Image.LANCZOS)
+
+        # Enhance contrast for better OCR
+        ctx.meta['enhanced_image'] = ImageEnhance.Contrast(resized_image).enhance(2.0)
+
+    def initial_ocr(ctx):
+        # Plate and OCR confidence of every pass, for the agreement between passes
+        passes = []
+        
+        # Try OCR configurations in learned order until a confident match is found
+        def attempt(config):
+            # Run OCR on the enhanced image
+            ocr_text, ocr_confidence = _read_text(ocr, ctx.meta['enhanced_image'], config)
+            ctx.count('ocr_passes')
+            diagnostic(log, "OCR with config '%s': %s", config, ocr_text, stage='ocr_initial')
+            
+            plate, confidence = None, 0.0
+            for match_clean in _pattern_matches(ocr_text):
+                # Format as AA00 AAA
+                formatted_plate = f"{match_clean[:4]} {match_clean[4:]}"
+                
+                # Standard format matches need no grammar correction and score higher
+                match_confidence = plate_confidence(_read_features(ctx, ocr_confidence, match_clean))
+                diagnostic(log, "Found potential plate: %s (confidence: %.2f)", formatted_plate, match_confidence)
+                
+                if match_confidence > confidence:
+                    plate, confidence = formatted_plate, match_confidence
+            passes.append((plate, ocr_confidence))
+            return plate, confidence
+        
+        best_plate, best_confidence, _, _ = initial_ladder.run(
+            attempt, lambda plate, confidence: confidence >= EARLY_EXIT_CONFIDENCE
+        )
+        
+        # If we found a plate, set the result
+        if best_plate:
+            plates_read = [plate for plate, _ in passes if plate]
+            agreement = plates_read.count(best_plate) / float(len(plates_read))
+            ocr_confidence = max(conf for plate, conf in passes if plate == best_plate)
+            _set_plate(ctx, best_plate, _read_features(ctx, ocr_confidence, best_plate, agreement))
+            log.debug("Best plate match: %s with confidence %.2f", best_plate, ctx.meta['confidence'])
+
+    def opencv_ocr(ctx):
+        if _found(ctx):
+            return
+        diagnostic(log, "No plate found with initial OCR. Trying OpenCV preprocessing...")
+
+        try:
+            # Resize image (3x larger)
+            gray = ctx.images['gray']
+            dim = (gray.shape[1] * 3, gray.shape[0] * 3)
+            resized = cv2.resize(gray, dim, interpolation=cv2.INTER_CUBIC)
+            ctx.images['resized'] = resized
+
+            # Apply image preprocessing techniques
+            # 1. Adaptive thresholding
+            thresh = cv2.adaptiveThreshold(resized, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                           cv2.THRESH_BINARY, 11, 2)
+
+            # 2. Noise removal
+            kernel = np.ones((1, 1), np.uint8)
+            opening = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel)
+
+            # Hand the processed image to the debug sink (written in the background)
+            if ctx.meta['debug_frame'] is not None:
+                debug_sink.emit(ctx.meta['debug_frame'], 'debug_processed', opening)
+
+            # Try OCR on the processed image, stopping at the first match
+            def attempt(config):
+                opencv_text, ocr_confidence = _read_text(ocr, opening, config)
+                ctx.count('ocr_passes')
+                diagnostic(log, "OpenCV processed OCR with config '%s': %s", config, opencv_text, stage='ocr_opencv')
+                
+                for match_clean in _pattern_matches(opencv_text):
+                    formatted_plate = f"{match_clean[:4]} {match_clean[4:]}"
+                    diagnostic(log, "OpenCV found potential plate: %s", formatted_plate)
+                    return formatted_plate, ocr_confidence
+                return None, 0.0
+            
+            plate, ocr_confidence, _, _ = opencv_ladder.run(attempt, lambda plate, confidence: True)
+            if plate:
+                _set_plate(ctx, plate, _read_features(ctx, ocr_confidence, plate))
+        except Exception as cv_error:
+            log.warning("OpenCV processing error: %s", cv_error)
+
+    def character_ocr(ctx):
+        if _found(ctx) or 'resized' not in ctx.images:
+            return
+        diagnostic(log, "Attempting direct character extraction...")
+
+        try:
+            # Apply different thresholding
+            _, binary = cv2.threshold(ctx.images['resized'], 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+
+            # Get text as individual characters
+            char_config = '--psm 10 -l eng --oem 3'
+            chars, ocr_confidence = _read_text(ocr, binary, char_config)
+            ctx.count('ocr_passes')
+            diagnostic(log, "Character extraction: %s", chars, stage='ocr_characters')
+
+            # Filter to only alphanumeric
+            chars_clean = re.sub(r'[^A-Z0-9]', '', chars)
+
+            # If we have enough characters for a license plate (at least 7)
+            if len(chars_clean) >= 7:
+                # Format the first 7 characters as a plate
+                plate = f"{chars_clean[:4]} {chars_clean[4:7]}"
+                _set_plate(ctx, plate, _read_features(ctx, ocr_confidence, plate))
+                log.debug("Extracted plate via characters: %s", ctx.meta['plate_number'])
+        except Exception as cv_error:
+            log.warning("OpenCV processing error: %s", cv_error)
+
+    def final_ocr(ctx):
+        # If the OCR and OpenCV methods both failed to find a plate,
+        # try direct character recognition from the image
+        if _found(ctx):
+            return
+        diagnostic(log, "Trying direct character recognition as last resort...")
+
+        # Enhance the grayscale image more aggressively
+        high_contrast = ImageEnhance.Contrast(ctx.meta['gray_image']).enhance(3.0)
+
+        # Try several more OCR configs that might pick up individual characters better
+        for config in FINAL_OCR_CONFIGS:
+            final_text, ocr_confidence = _read_text(ocr, high_contrast, config)
+            ctx.count('ocr_passes')
+            diagnostic(log, "Final attempt OCR: %s", final_text, stage='ocr_final')
+
+            # Extract all alphanumeric sequences of reasonable length
+            alphanumeric_groups = re.findall(r'[A-Z0-9]{4,}', final_text)
+
+            if alphanumeric_groups:
+                # Get the longest sequence
+                best_group = max(alphanumeric_groups, key=len)
+                diagnostic(log, "Best alphanumeric group: %s", best_group)
+
+                if len(best_group) >= 7:
+                    # Format as AA00 AAA if possible
+                    plate = f"{best_group[:4]} {best_group[4:7]}"
+                    _set_plate(ctx, plate, _read_features(ctx, ocr_confidence, plate))
+                    log.debug("Constructed plate from alphanumeric group: %s", ctx.meta['plate_number'])
+                    break
+
+    def filename_fallback(ctx):
+        # Manual visual clues if nothing else worked
+        if not _found(ctx):
+            # Extract any alphanumeric sequences from the filename that might be plate numbers
+            filename_upper = (ctx.meta.get('filename') or '').upper()
+            filename_plates = re.findall(r'[A-Z0-9]{5,}', filename_upper)
+            if filename_plates:
+                plate_from_filename = max(filename_plates, key=len)
+                if len(plate_from_filename) >= 7:
+                    # No OCR pass read this plate
+                    plate = f"{plate_from_filename[:4]} {plate_from_filename[4:7]}"
+                    _set_plate(ctx, plate, _read_features(ctx, 0.0, plate, agreement=0.0))
+                    log.info("Extracted plate from filename: %s", ctx.meta['plate_number'])
+
+        # If all else failed and we still couldn't identify the plate
+        if not _found(ctx):
+            log.debug("All recognition methods failed. Returning UNKNOWN.")
+
+    def country(ctx):
+        # Every plate the cascade accepts matches a UK format
+        if _found(ctx):
+            h, w = ctx.image.shape[:2]
+            ctx.plates.append({
+                "plate_number": ctx.meta['plate_number'],
+                "country_identifier": "GB",
+                "confidence": ctx.meta['confidence'],
+                "region": ctx.image,
+                "bbox": (0, 0, w, h)
+            })
+
+    return Pipeline('api', [
+        Stage('decode', 'decode', decode),
+        Stage('enhance', 'preprocess', preprocess),
+        Stage('ocr_initial', 'ocr', initial_ocr),
+        Stage('ocr_opencv', 'ocr', opencv_ocr),
+        Stage('ocr_characters', 'ocr', character_ocr),
+        Stage('ocr_final', 'ocr', final_ocr),
+        Stage('filename', 'grammar', filename_fallback),
+        Stage('country', 'country', country)
+    ])
@@ -0,0 +1,497 @@
+#!/usr/bin/env python3
+"""
+Accuracy and latency benchmark for the recognition pipelines.
+
+Every named pipeline configuration is run over a labelled corpus. Labels
+are taken from the image filenames: the part of the file name before the
+first underscore is the plate number (data/AA03BOJ.png, AB12CDE_00042.png).
+The report contains exact-match accuracy, character error rate, throughput,
+latency percentiles and OCR calls per image, and can be saved as a JSON
+baseline. When a baseline is given, the run fails if any recognizer
+regressed by more than the configured thresholds. ANPR_LADDER_STATS is
+ignored: OCR config ladders learn from the run in memory only.
+
+    python src/benchmark.py data --output baseline.json
+    python src/benchmark.py data --baseline baseline.json --max-latency-increase 0.2
+
+With --detection-sizes, only plate candidate search is timed, at full
+resolution and on the downscaled search image, with the corpus resized to
+each of the given long sides:
+
+    python src/benchmark.py data/synthetic --detection-sizes 640,1280,1920,3840
+
+With --calibrate, the confidence model (confidence.py) is refitted on the
+reads of all recognizers and written to a JSON file for
+ANPR_CONFIDENCE_CALIBRATION:
+    
+    python src/benchmark.py data/synthetic --calibrate calibration.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from anpr_logging import configure_logging
+from confidence import expected_calibration_error, fit_calibration, plate_confidence
+from image_features import DETECT_MAX_SIDE
+from image_io import decode_image
+from ocr_engine import OCREnginePool, create_engine
+from pipeline import PIPELINE_BUILDERS, PipelineContext, build_pipeline
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+
+
+def normalize_plate(text: Optional[str]) -> str:
+    """
+    Reduce a plate string to upper case letters and digits.
+
+    Args:
+        text (Optional[str]): Plate number as recognized or labelled
+
+    Returns:
+        str: Normalized plate, e.g. 'AB12CDE'
+    """
+    return re.sub(r'[^A-Z0-9]', '', (text or '').upper())
+
+
+def label_from_filename(path: str) -> str:
+    """
+    Read the ground truth plate from an image file name.
+
+    Args:
+        path (str): Image path such as 'data/AA03BOJ.png' or 'AB12CDE_00042.png'
+
+    Returns:
+        str: Normalized plate number
+    """
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return normalize_plate(stem.split('_')[0])
+
+
+def levenshtein(a: str, b: str) -> int:
+    """
+    Edit distance between two strings.
+
+    Args:
+        a (str): First string
+        b (str): Second string
+
+    Returns:
+        int: Minimum number of insertions, deletions and substitutions
+    """
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def character_error_rate(prediction: str, truth: str) -> float:
+    """
+    Character error rate of a prediction.
+
+    Args:
+        prediction (str): Normalized recognized plate
+        truth (str): Normalized ground truth plate
+
+    Returns:
+        float: Edit distance divided by the length of the ground truth
+    """
+    return levenshtein(prediction, truth) / float(max(len(truth), 1))
+
+
+def load_corpus(paths: List[str]) -> List[Tuple[str, str, bytes]]:
+    """
+    Collect labelled images from files and directories (not recursive).
+
+    Args:
+        paths (List[str]): Image files and/or directories
+
+    Returns:
+        List[Tuple[str, str, bytes]]: (path, label, encoded image bytes) sorted by path
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(os.path.join(path, name) for name in os.listdir(path))
+        else:
+            files.append(path)
+
+    corpus = []
+    for path in sorted(files):
+        if not path.lower().endswith(IMAGE_EXTENSIONS) or not os.path.isfile(path):
+            continue
+        with open(path, 'rb') as f:
+            corpus.append((path, label_from_filename(path), f.read()))
+    return corpus
+
+
+def run_benchmark(name: str, corpus: List[Tuple[str, str, bytes]], ocr_backend: Optional[str] = None,
+                  warmup: int = 1, verbose: bool = False) -> Dict[str, Any]:
+    """
+    Run one pipeline configuration over the corpus.
+
+    Images are handed to the pipeline as encoded bytes, so decoding is part
+    of the measured latency while disk reads are not. No filename is passed,
+    so that fallbacks which read the filename cannot see the label.
+
+    Args:
+        name (str): Pipeline configuration name
+        corpus (List[Tuple[str, str, bytes]]): Output of load_corpus()
+        ocr_backend (Optional[str]): OCR backend for create_engine()
+        warmup (int): Untimed runs over the first images before measuring
+        verbose (bool): Show the recognizers' console output
+
+    Returns:
+        Dict[str, Any]: Summary metrics, per-stage timings and per-image results
+    """
+    ocr = OCREnginePool(lambda: create_engine(ocr_backend), size=1)
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+
+    with output:
+        pipeline = build_pipeline(name, ocr_engine=ocr)
+        for _, _, data in corpus[:warmup]:
+            pipeline.run(data)
+        pipeline.reset_stats()
+
+        images = []
+        started = time.perf_counter()
+        for path, label, data in corpus:
+            calls_before = ocr.calls
+            start = time.perf_counter()
+            confidence, features = None, None
+            try:
+                ctx = pipeline.run(data)
+                prediction = normalize_plate(ctx.plates[0]['plate_number']) if ctx.plates else ''
+                if ctx.plates and 'confidence' in ctx.plates[0]:
+                    confidence = ctx.plates[0]['confidence']
+                    features = ctx.meta['confidence_features'][0]
+                error = None
+            except Exception as e:
+                prediction, error = '', f"{type(e).__name__}: {str(e)}"
+            latency = time.perf_counter() - start
+
+            images.append({
+                'file': os.path.basename(path),
+                'label': label,
+                'prediction': prediction,
+                'correct': prediction == label,
+                'cer': character_error_rate(prediction, label),
+                'latency_ms': 1000.0 * latency,
+                'ocr_calls': ocr.calls - calls_before,
+                'confidence': confidence,
+                'confidence_features': features,
+                'error': error
+            })
+        elapsed = time.perf_counter() - started
+
+    latencies = [image['latency_ms'] for image in images]
+    count = max(len(images), 1)
+    scored = [image for image in images if image['confidence'] is not None]
+    return {
+        'images': len(images),
+        'ocr_backend': ocr.name,
+        'exact_match': sum(image['correct'] for image in images) / float(count),
+        'cer': sum(image['cer'] for image in images) / float(count),
+        'errors': sum(1 for image in images if image['error']),
+        'throughput_ips': len(images) / elapsed if elapsed > 0 else 0.0,
+        'latency_ms': {
+            'mean': float(np.mean(latencies)) if latencies else 0.0,
+            'p50': float(np.percentile(latencies, 50)) if latencies else 0.0,
+            'p95': float(np.percentile(latencies, 95)) if latencies else 0.0,
+            'p99': float(np.percentile(latencies, 99)) if latencies else 0.0
+        },
+        'ocr_calls_per_image': sum(image['ocr_calls'] for image in images) / float(count),
+        'calibration_error': expected_calibration_error([image['confidence'] for image in scored],
+                                                        [image['correct'] for image in scored]),
+        'stages': {stage: stats['mean_ms'] for stage, stats in pipeline.stats()['stages'].items()},
+        'per_image': images
+    }
+
+
+def benchmark_detection(corpus: List[Tuple[str, str, bytes]], sizes: List[int],
+                        max_side: int = DETECT_MAX_SIDE, repeats: int = 3) -> Dict[str, Any]:
+    """
+    Time plate candidate search at full resolution and on the downscaled search image.
+
+    Every image is resized so that its longest side is each of `sizes`, and
+    both the 'uk' region search and the 'contour' edge map and contour
+    search are timed with detection at full resolution and at `max_side`.
+
+    Args:
+        corpus (List[Tuple[str, str, bytes]]): Output of load_corpus()
+        sizes (List[int]): Longest image sides to test
+        max_side (int): Longest side of the downscaled search image
+        repeats (int): Timed runs per image; the fastest counts
+
+    Returns:
+        Dict[str, Any]: Per size and detector: mean full and scaled milliseconds,
+            speed-up and mean number of candidates found
+    """
+    from plate_recognizer import PlateRecognizer
+    from uk_plate_recognizer import UKPlateRecognizer
+
+    images = [image for image in (decode_image(data) for _, _, data in corpus) if image is not None]
+    detectors = {}
+    for label, side in (('full', 0), ('scaled', max_side)):
+        uk = UKPlateRecognizer(headless=True, detect_max_side=side, detect_levels=1)
+        contour = PlateRecognizer(detect_max_side=side)
+
+        def run_contour(image, recognizer=contour):
+            ctx = PipelineContext(image)
+            ctx.image = image
+            recognizer._preprocess_stage(ctx)
+            recognizer._propose_stage(ctx)
+            return ctx.proposals
+
+        detectors[('uk', label)] = uk.detect_plate_regions
+        detectors[('contour', label)] = run_contour
+
+    def fastest(detect, image):
+        best, found = float('inf'), 0
+        for _ in range(repeats):
+            start = time.perf_counter()
+            found = len(detect(image))
+            best = min(best, time.perf_counter() - start)
+        return 1000.0 * best, found
+
+    results = {}
+    for size in sizes:
+        resized = []
+        for image in images:
+            scale = size / float(max(image.shape[:2]))
+            interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_CUBIC
+            resized.append(cv2.resize(image, None, fx=scale, fy=scale, interpolation=interpolation))
+
+        results[size] = {}
+        for name in ('uk', 'contour'):
+            summary = {}
+            for label in ('full', 'scaled'):
+                runs = [fastest(detectors[(name, label)], image) for image in resized]
+                summary[f'{label}_ms'] = float(np.mean([ms for ms, _ in runs])) if runs else 0.0
+                summary[f'{label}_candidates'] = float(np.mean([n for _, n in runs])) if runs else 0.0
+            summary['speedup'] = summary['full_ms'] / summary['scaled_ms'] if summary['scaled_ms'] > 0 else 0.0
+            results[size][name] = summary
+    return {'images': len(images), 'max_side': max_side, 'sizes': results}
+
+
+def calibrate_confidence(report: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Refit the confidence model on the reads of all recognizers in a report.
+    
+    Args:
+        report (Dict[str, Any]): Benchmark report with per-image results
+    
+    Returns:
+        Dict[str, Any]: Fitted coefficients (see confidence.fit_calibration) with
+            the calibration error of the current and the fitted model
+    """
+    reads = [image for result in report['recognizers'].values()
+             for image in result['per_image'] if image['confidence_features'] is not None]
+    features = [image['confidence_features'] for image in reads]
+    correct = [image['correct'] for image in reads]
+    
+    calibration = fit_calibration(features, correct)
+    calibration['calibration_error'] = {
+        'before': expected_calibration_error([image['confidence'] for image in reads], correct),
+        'after': expected_calibration_error([plate_confidence(f, calibration) for f in features], correct)
+    }
+    return calibration
+
+
+def format_detection_report(report: Dict[str, Any]) -> str:
+    """
+    Render a detection benchmark as a table.
+
+    Args:
+        report (Dict[str, Any]): Output of benchmark_detection()
+
+    Returns:
+        str: One line per input size and detector
+    """
+    lines = [f"Candidate search on {report['images']} images, downscaled to {report['max_side']} px",
+             f"{'long side':>9} {'detector':<8} {'full ms':>9} {'scaled ms':>10} {'speed-up':>9} "
+             f"{'cand. full':>11} {'cand. scaled':>13}"]
+    for size, detectors in report['sizes'].items():
+        for name, result in detectors.items():
+            lines.append(f"{size:>9} {name:<8} {result['full_ms']:>9.1f} {result['scaled_ms']:>10.1f} "
+                         f"{result['speedup']:>8.1f}x {result['full_candidates']:>11.1f} "
+                         f"{result['scaled_candidates']:>13.1f}")
+    return '\n'.join(lines)
+
+
+def compare_to_baseline(report: Dict[str, Any], baseline: Dict[str, Any],
+                        max_accuracy_drop: float = 0.0, max_cer_increase: float = 0.0,
+                        max_latency_increase: float = 0.25,
+                        max_ocr_calls_increase: float = 0.1) -> List[str]:
+    """
+    Find recognizers that regressed against a baseline report.
+
+    Args:
+        report (Dict[str, Any]): Current benchmark report
+        baseline (Dict[str, Any]): Earlier report to compare with
+        max_accuracy_drop (float): Allowed absolute drop in exact-match accuracy
+        max_cer_increase (float): Allowed absolute increase in character error rate
+        max_latency_increase (float): Allowed relative increase in p95 latency
+        max_ocr_calls_increase (float): Allowed relative increase in OCR calls per image
+
+    Returns:
+        List[str]: One message per regression; empty if there is none
+    """
+    regressions = []
+    for name, current in report['recognizers'].items():
+        previous = baseline.get('recognizers', {}).get(name)
+        if previous is None:
+            continue
+
+        accuracy_drop = previous['exact_match'] - current['exact_match']
+        if accuracy_drop > max_accuracy_drop + 1e-9:
+            regressions.append(f"{name}: exact match {previous['exact_match']:.3f} -> {current['exact_match']:.3f}")
+
+        cer_increase = current['cer'] - previous['cer']
+        if cer_increase > max_cer_increase + 1e-9:
+            regressions.append(f"{name}: CER {previous['cer']:.3f} -> {current['cer']:.3f}")
+
+        p95_before, p95_now = previous['latency_ms']['p95'], current['latency_ms']['p95']
+        if p95_before > 0 and p95_now > p95_before * (1.0 + max_latency_increase):
+            regressions.append(f"{name}: p95 latency {p95_before:.1f} ms -> {p95_now:.1f} ms")
+
+        calls_before, calls_now = previous['ocr_calls_per_image'], current['ocr_calls_per_image']
+        if calls_now > calls_before * (1.0 + max_ocr_calls_increase) + 1e-9:
+            regressions.append(f"{name}: OCR calls/image {calls_before:.2f} -> {calls_now:.2f}")
+
+    return regressions
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """
+    Render the summary of a report as a table.
+
+    Args:
+        report (Dict[str, Any]): Benchmark report
+
+    Returns:
+        str: One line per recognizer
+    """
+    lines = [f"Corpus: {report['corpus']['images']} images, OCR backend: {report['ocr_backend']}",
+             f"{'recognizer':<10} {'exact':>7} {'CER':>7} {'img/s':>8} {'p50 ms':>9} "
+             f"{'p95 ms':>9} {'p99 ms':>9} {'OCR/img':>8} {'conf ECE':>9}"]
+    for name, result in report['recognizers'].items():
+        latency = result['latency_ms']
+        lines.append(f"{name:<10} {result['exact_match']:>7.1%} {result['cer']:>7.3f} "
+                     f"{result['throughput_ips']:>8.2f} {latency['p50']:>9.1f} {latency['p95']:>9.1f} "
+                     f"{latency['p99']:>9.1f} {result['ocr_calls_per_image']:>8.2f} "
+                     f"{result.get('calibration_error', 0.0):>9.3f}")
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the benchmark from the command line; returns the process exit code."""
+    parser = argparse.ArgumentParser(description="Benchmark the ANPR recognizers on a labelled corpus")
+    parser.add_argument("paths", nargs='*', default=[DEFAULT_CORPUS],
+                        help="Image files or directories (default: the data directory)")
+    parser.add_argument("--recognizers", default=','.join(PIPELINE_BUILDERS),
+                        help="Comma separated pipeline configurations to run")
+    parser.add_argument("--output", help="Write the report (a new baseline) to this JSON file")
+    parser.add_argument("--baseline", help="Fail if results regressed against this JSON report")
+    parser.add_argument("--max-accuracy-drop", type=float, default=0.0,
+                        help="Allowed absolute drop in exact-match accuracy")
+    parser.add_argument("--max-cer-increase", type=float, default=0.0,
+                        help="Allowed absolute increase in character error rate")
+    parser.add_argument("--max-latency-increase", type=float, default=0.25,
+                        help="Allowed relative increase in p95 latency (0.25 = 25%%)")
+    parser.add_argument("--max-ocr-calls-increase", type=float, default=0.1,
+                        help="Allowed relative increase in OCR calls per image")
+    parser.add_argument("--backend", choices=['tesserocr', 'pytesseract'], help="OCR backend")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed warm-up images per recognizer")
+    parser.add_argument("--verbose", action="store_true", help="Show recognizer output")
+    parser.add_argument("--detection-sizes",
+                        help="Only time candidate search, at these comma separated long sides (e.g. 1280,3840)")
+    parser.add_argument("--detect-max-side", type=int, default=DETECT_MAX_SIDE,
+                        help="Longest side of the downscaled search image for --detection-sizes")
+    parser.add_argument("--calibrate",
+                        help="Fit the confidence model to this run and write it to this JSON file")
+    args = parser.parse_args(argv)
+
+    # OCR config ladders keep their win counts in memory, so runs start from the
+    # same order and never write into the production stats file
+    os.environ.pop('ANPR_LADDER_STATS', None)
+    # Recognizer warnings always, per-candidate diagnostics only with --verbose
+    configure_logging('DEBUG' if args.verbose else 'WARNING')
+    corpus = load_corpus(args.paths)
+    if not corpus:
+        print("No labelled images found")
+        return 2
+
+    if args.detection_sizes:
+        sizes = [int(size) for size in args.detection_sizes.split(',') if size.strip()]
+        report = benchmark_detection(corpus, sizes, args.detect_max_side)
+        print(format_detection_report(report))
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(report, f, indent=2)
+            print(f"\nReport written to {args.output}")
+        return 0
+
+    names = [name.strip() for name in args.recognizers.split(',') if name.strip()]
+    report = {
+        'created': datetime.now(timezone.utc).isoformat(),
+        'corpus': {'images': len(corpus), 'paths': args.paths},
+        'ocr_backend': None,
+        'recognizers': {}
+    }
+    for name in names:
+        result = run_benchmark(name, corpus, args.backend, args.warmup, args.verbose)
+        report['ocr_backend'] = result['ocr_backend']
+        report['recognizers'][name] = result
+
+    print(format_report(report))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+    
+    if args.calibrate:
+        calibration = calibrate_confidence(report)
+        if not calibration['samples']:
+            print("\nNo reads with a confidence to calibrate on")
+        else:
+            with open(args.calibrate, 'w') as f:
+                json.dump(calibration, f, indent=2)
+            error = calibration['calibration_error']
+            print(f"\nConfidence calibration ({calibration['samples']} reads): expected calibration "
+                  f"error {error['before']:.3f} -> {error['after']:.3f}, written to {args.calibrate}")
+    
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(report, baseline, args.max_accuracy_drop, args.max_cer_increase,
+                                          args.max_latency_increase, args.max_ocr_calls_increase)
+        if regressions:
+            print("\nRegressions against baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print("\nNo regressions against baseline")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
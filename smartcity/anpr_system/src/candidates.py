@@ -0,0 +1,202 @@
+"""
+Cheap ranking of plate candidates before any OCR is spent on them.
+
+The proposers return every region of roughly plate shape, and each one
+costs several OCR passes. score_candidates() rates all candidate boxes of
+an image at once from features that only need a few array lookups per box:
+
+    aspect     fit of the box to the 4.5:1 proportions of a UK plate
+    edges      edge density, from an integral image of the edge map
+    characters number of character-like dark components in the box
+    contrast   grayscale standard deviation, from integral images
+    colour     share of yellow or white plate-coloured pixels
+
+non_max_suppression() then keeps the best of every group of overlapping
+candidates (the plate border and its character block, or one plate found
+at two pyramid levels or by two proposers), and at most k of them are OCR'd.
+
+Environment variables:
+    ANPR_TOP_K  Candidates passed on to OCR per image (default 2, 0 = all)
+"""
+
+import os
+from typing import Dict, List, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from colour_proposer import white_plate_mask
+from image_features import ImageFeatures, detection_scales
+
+TOP_K = 2
+
+# Boxes overlapping a better candidate by more than this IoU are duplicates
+NMS_IOU = 0.5
+# Boxes whose area lies this much inside a better candidate (or contain it) are duplicates
+NMS_CONTAINMENT = 0.8
+
+# Area features are computed on a copy whose longest side is at most this many pixels
+SCORE_MAX_SIDE = 640
+
+# Weight of each feature in the candidate score (they sum to 1)
+WEIGHTS = {'aspect': 0.25, 'edges': 0.15, 'characters': 0.3, 'contrast': 0.15, 'colour': 0.15}
+
+PLATE_ASPECT = 4.5
+# Typical share of edge pixels in a plate; much lower is a plain surface, much higher texture
+PLATE_EDGE_DENSITY = 0.15
+# Grayscale standard deviation at which contrast counts as fully plate-like
+FULL_CONTRAST = 60.0
+# Share of plate-coloured pixels at which colour counts as fully plate-like
+FULL_COLOUR = 0.5
+
+# Candidates are normalized to this height before counting character components
+CHARACTER_HEIGHT = 32
+# Number of character-like components at which the feature saturates; more than
+# MAX_CHARACTERS suggests text or texture rather than a registration
+FULL_CHARACTERS = 5
+MAX_CHARACTERS = 10
+
+
+def top_k_from_env() -> int:
+    """Number of candidates passed on to OCR (ANPR_TOP_K, 0 = all)."""
+    return int(os.environ.get('ANPR_TOP_K', TOP_K))
+
+
+def _box_sums(integral: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+    """Sum of an image over every (x, y, w, h) box, given its integral image."""
+    x1, y1 = boxes[:, 0], boxes[:, 1]
+    x2, y2 = x1 + boxes[:, 2], y1 + boxes[:, 3]
+    return integral[y2, x2] - integral[y1, x2] - integral[y2, x1] + integral[y1, x1]
+
+
+def _ratio_fit(values: np.ndarray, target: float) -> np.ndarray:
+    """1.0 at the target value, falling off with the log ratio on either side."""
+    return np.exp(-np.abs(np.log(np.maximum(values, 1e-3) / target)))
+
+
+def count_character_components(features: ImageFeatures) -> int:
+    """
+    Count dark components of character size and shape in a plate candidate.
+
+    Args:
+        features (ImageFeatures): Candidate crop
+
+    Returns:
+        int: Number of character-like components
+    """
+    h, w = features.shape[:2]
+    if h < 2 or w < 2:
+        return 0
+    scale = CHARACTER_HEIGHT / float(h)
+    width = max(1, min(int(round(w * scale)), CHARACTER_HEIGHT * 10))
+    gray = cv2.resize(features.gray, (width, CHARACTER_HEIGHT), interpolation=cv2.INTER_AREA)
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+
+    count, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    cw, ch, area = stats[1:, cv2.CC_STAT_WIDTH], stats[1:, cv2.CC_STAT_HEIGHT], stats[1:, cv2.CC_STAT_AREA]
+    characters = ((ch >= 0.35 * CHARACTER_HEIGHT) & (ch <= 0.95 * CHARACTER_HEIGHT) &
+                  (ch >= cw) & (ch <= 8 * cw) & (area >= 0.15 * cw * ch))
+    return int(np.count_nonzero(characters))
+
+
+def candidate_features(image, boxes: Sequence[Tuple[int, int, int, int]]) -> Dict[str, np.ndarray]:
+    """
+    Compute the ranking features of plate candidates.
+
+    Args:
+        image (np.ndarray | ImageFeatures): Full resolution image
+        boxes (Sequence[Tuple[int, int, int, int]]): Candidates (x, y, w, h) at full resolution
+
+    Returns:
+        Dict[str, np.ndarray]: Feature name -> one value between 0 and 1 per box
+    """
+    features = ImageFeatures.of(image)
+    full = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+
+    # Area features on a reduced copy; boxes are shrunk to match and kept at least 1 px
+    scale = detection_scales(features.shape, SCORE_MAX_SIDE)[0]
+    small = features.downscaled(scale)
+    height, width = small.shape[:2]
+    scaled = np.floor(full * scale).astype(np.int64)
+    scaled[:, 0] = np.clip(scaled[:, 0], 0, width - 1)
+    scaled[:, 1] = np.clip(scaled[:, 1], 0, height - 1)
+    scaled[:, 2] = np.clip(np.maximum(scaled[:, 2], 1), 1, width - scaled[:, 0])
+    scaled[:, 3] = np.clip(np.maximum(scaled[:, 3], 1), 1, height - scaled[:, 1])
+    area = (scaled[:, 2] * scaled[:, 3]).astype(np.float64)
+
+    edges = cv2.Canny(small.blurred, 50, 150)
+    edge_density = _box_sums(cv2.integral(edges // 255), scaled) / area
+
+    gray_sum, gray_squares = cv2.integral2(small.gray, sdepth=cv2.CV_64F)
+    mean = _box_sums(gray_sum, scaled) / area
+    std = np.sqrt(np.maximum(_box_sums(gray_squares, scaled) / area - mean ** 2, 0.0))
+
+    plate_colour = cv2.bitwise_or(small.yellow_mask, white_plate_mask(small)) // 255
+    colour = _box_sums(cv2.integral(plate_colour), scaled) / area
+
+    characters = np.array([
+        count_character_components(features.crop(*(int(v) for v in box))) for box in full
+    ], dtype=np.float64)
+
+    return {
+        'aspect': _ratio_fit(full[:, 2] / np.maximum(full[:, 3], 1), PLATE_ASPECT),
+        'edges': _ratio_fit(edge_density, PLATE_EDGE_DENSITY),
+        'characters': np.minimum(characters / FULL_CHARACTERS, 1.0) * (characters <= MAX_CHARACTERS),
+        'contrast': np.minimum(std / FULL_CONTRAST, 1.0),
+        'colour': np.minimum(colour / FULL_COLOUR, 1.0)
+    }
+
+
+def score_candidates(image, boxes: Sequence[Tuple[int, int, int, int]]) -> np.ndarray:
+    """
+    Rate how plate-like each candidate box is.
+
+    Args:
+        image (np.ndarray | ImageFeatures): Full resolution image
+        boxes (Sequence[Tuple[int, int, int, int]]): Candidates (x, y, w, h) at full resolution
+
+    Returns:
+        np.ndarray: Score between 0 and 1 per box
+    """
+    if len(boxes) == 0:
+        return np.zeros(0)
+    values = candidate_features(image, boxes)
+    return sum(WEIGHTS[name] * values[name] for name in WEIGHTS)
+
+
+def non_max_suppression(boxes: Sequence[Tuple[int, int, int, int]], scores: np.ndarray,
+                        iou_threshold: float = NMS_IOU, containment_threshold: float = NMS_CONTAINMENT,
+                        max_keep: int = 0) -> List[int]:
+    """
+    Drop candidates that overlap a better scored one.
+
+    Args:
+        boxes (Sequence[Tuple[int, int, int, int]]): Candidate boxes (x, y, w, h)
+        scores (np.ndarray): Score per box
+        iou_threshold (float): Suppress boxes with a larger IoU with a kept box
+        containment_threshold (float): Suppress boxes when the intersection with a kept
+            box covers a larger share of the smaller of the two (nested boxes)
+        max_keep (int): Stop after this many boxes; 0 keeps all survivors
+
+    Returns:
+        List[int]: Indices of the kept boxes, best first; ties keep the proposal order
+    """
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    x1, y1 = boxes[:, 0], boxes[:, 1]
+    x2, y2 = x1 + boxes[:, 2], y1 + boxes[:, 3]
+    areas = boxes[:, 2] * boxes[:, 3]
+
+    order = np.argsort(-np.asarray(scores), kind='stable')
+    keep = []
+    while order.size and (not max_keep or len(keep) < max_keep):
+        best, rest = order[0], order[1:]
+        keep.append(int(best))
+
+        # Overlap of the best box with all remaining ones at once
+        overlap_w = np.maximum(0.0, np.minimum(x2[best], x2[rest]) - np.maximum(x1[best], x1[rest]))
+        overlap_h = np.maximum(0.0, np.minimum(y2[best], y2[rest]) - np.maximum(y1[best], y1[rest]))
+        intersection = overlap_w * overlap_h
+        iou = intersection / np.maximum(areas[best] + areas[rest] - intersection, 1e-9)
+        containment = intersection / np.maximum(np.minimum(areas[best], areas[rest]), 1e-9)
+        order = rest[(iou <= iou_threshold) & (containment <= containment_threshold)]
+    return keep
@@ -0,0 +1,158 @@
+"""
+Colour segmentation proposals for UK number plates.
+
+UK rear plates are yellow and front plates white, so plate candidates can
+be found far more cheaply than with the edge and contour search: threshold
+the HSV image of a small copy of the frame, label the connected components
+of the yellow and white masks and keep the components of plate shape. The
+characters are dark holes inside the plate component, which is how a plate
+differs from a plain yellow or white surface.
+
+Proposals come back ranked and at full resolution coordinates, so they can
+be cropped and read exactly like the contour candidates.
+
+Environment variables:
+    ANPR_PROPOSER  'contour' (edge/contour search, default), 'colour' or 'both'
+"""
+
+import os
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+
+from image_features import ImageFeatures, detection_scales, scale_box
+
+PROPOSERS = ('contour', 'colour', 'both')
+DEFAULT_PROPOSER = 'contour'
+
+# Colour masks are cheap enough to label on a small copy of the frame
+COLOUR_MAX_SIDE = 320
+
+# Prior of each plate colour; a yellow patch is far rarer in a street scene than a white one
+COLOUR_PRIORS = {'yellow': 1.0, 'white': 0.6}
+
+# A UK plate is 520 x 111 mm (4.7:1); the band and perspective make it look shorter
+PLATE_ASPECT = 4.5
+MIN_ASPECT = 2.0
+MAX_ASPECT = 7.0
+
+# Share of the component's bounding box the plate colour covers; characters
+# leave holes, a plain painted surface fills the box completely
+MIN_FILL = 0.25
+MAX_FILL = 0.95
+
+# White plates: unsaturated pixels among the brightest of the frame. A fixed
+# brightness threshold loses white plates in dim or underexposed frames
+WHITE_MAX_SATURATION = 45
+WHITE_MIN_VALUE = 90
+WHITE_RELATIVE_VALUE = 0.75
+
+# Smallest component considered, in pixels of the search image
+MIN_WIDTH = 16
+MIN_HEIGHT = 4
+
+# Share of the image a plate can cover at most
+MAX_AREA_FRACTION = 0.5
+
+
+def proposer_from_env() -> str:
+    """
+    Read the plate proposal method from the environment.
+
+    Returns:
+        str: ANPR_PROPOSER, one of PROPOSERS
+
+    Raises:
+        ValueError: If ANPR_PROPOSER names an unknown method
+    """
+    proposer = os.environ.get('ANPR_PROPOSER', DEFAULT_PROPOSER).lower()
+    if proposer not in PROPOSERS:
+        raise ValueError(f"Unknown plate proposer: {proposer} (expected one of {', '.join(PROPOSERS)})")
+    return proposer
+
+
+def _band_extension(features: ImageFeatures, bbox: Tuple[int, int, int, int]) -> int:
+    """Width of a blue identifier band directly left of a plate component, or 0."""
+    x, y, w, h = bbox
+    band_width = min(x, int(round(0.6 * h)))
+    if band_width <= 0:
+        return 0
+    band = features.blue_mask[y:y+h, x-band_width:x]
+    return band_width if np.count_nonzero(band) > 0.3 * band.size else 0
+
+
+def white_plate_mask(features: ImageFeatures) -> np.ndarray:
+    """Mask of unsaturated pixels at least WHITE_RELATIVE_VALUE as bright as the brightest ones."""
+    value = features.hsv[:, :, 2]
+    histogram = np.cumsum(cv2.calcHist([value], [0], None, [256], [0, 256]).ravel())
+    brightest = int(np.searchsorted(histogram, 0.99 * histogram[-1]))
+    threshold = max(WHITE_MIN_VALUE, int(np.ceil(WHITE_RELATIVE_VALUE * brightest)))
+    return cv2.inRange(features.hsv, np.array([0, 0, threshold]), np.array([180, WHITE_MAX_SATURATION, 255]))
+
+
+def _plate_components(features: ImageFeatures, mask: np.ndarray) -> List[Tuple[Tuple[int, int, int, int], float]]:
+    """
+    Plate shaped connected components of a colour mask.
+
+    Args:
+        features (ImageFeatures): Search image the mask belongs to
+        mask (np.ndarray): Binary colour mask
+
+    Returns:
+        List[Tuple[Tuple[int, int, int, int], float]]: (bbox, shape score) of each component
+    """
+    # Remove speckle and thin links to neighbouring surfaces of the same colour
+    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, np.ones((3, 3), np.uint8))
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    if count <= 1:
+        return []
+
+    # Row 0 is the background
+    x, y, w, h, area = (stats[1:, i].astype(np.float64) for i in range(5))
+    aspect = w / np.maximum(h, 1)
+    fill = area / np.maximum(w * h, 1)
+    keep = ((w >= MIN_WIDTH) & (h >= MIN_HEIGHT) &
+            (aspect > MIN_ASPECT) & (aspect < MAX_ASPECT) &
+            (fill >= MIN_FILL) & (fill <= MAX_FILL) &
+            (w * h <= MAX_AREA_FRACTION * mask.size))
+
+    # Closest to the plate aspect ratio and most completely filled first
+    score = np.exp(-np.abs(np.log(aspect / PLATE_ASPECT))) * fill
+
+    components = []
+    for i in np.flatnonzero(keep):
+        bbox = (int(x[i]), int(y[i]), int(w[i]), int(h[i]))
+        band = _band_extension(features, bbox)
+        components.append(((bbox[0] - band, bbox[1], bbox[2] + band, bbox[3]), float(score[i])))
+    return components
+
+
+def propose_colour_regions(image, max_side: int = COLOUR_MAX_SIDE, top_k: int = 5,
+                           colours: Tuple[str, ...] = ('yellow', 'white'),
+                           ) -> List[Tuple[Tuple[int, int, int, int], float, str]]:
+    """
+    Propose plate regions from yellow and white colour segmentation.
+
+    Args:
+        image (np.ndarray | ImageFeatures): BGR image or its features
+        max_side (int): Longest side of the search copy (0 = full resolution)
+        top_k (int): Maximum number of proposals returned
+        colours (Tuple[str, ...]): Plate colours to search for ('yellow', 'white')
+
+    Returns:
+        List[Tuple[Tuple[int, int, int, int], float, str]]: (bbox, score, colour) with
+            bbox (x, y, w, h) at full resolution, best first
+    """
+    features = ImageFeatures.of(image)
+    scale = detection_scales(features.shape, max_side)[0]
+    search = features.downscaled(scale)
+
+    masks = {'yellow': lambda: search.yellow_mask, 'white': lambda: white_plate_mask(search)}
+    proposals = []
+    for colour in colours:
+        for bbox, score in _plate_components(search, masks[colour]()):
+            proposals.append((scale_box(bbox, scale, features.shape), score * COLOUR_PRIORS[colour], colour))
+
+    proposals.sort(key=lambda proposal: proposal[1], reverse=True)
+    return proposals[:top_k]
@@ -0,0 +1,173 @@
+"""
+Calibrated confidence of a plate read.
+
+A read is described by four features, each between 0 and 1:
+
+    ocr        mean OCR confidence of the characters of the plate
+    grammar    exp(-cost) of the registration decode (1.0 for an exact
+               read of a UK format, 0.0 when no format fits)
+    candidate  score of the plate candidate the read came from
+    agreement  share of the OCR passes over the candidate that read the
+               same plate
+
+plate_confidence() maps them through a logistic model to the estimated
+probability that the plate number is exactly right, so that a client
+gating on 0.9 is wrong on about one read in ten. The shipped coefficients
+are conservative defaults; `python src/benchmark.py <corpus> --calibrate
+calibration.json` refits them on a labelled corpus with the OCR backend in
+use, and ANPR_CONFIDENCE_CALIBRATION loads the result.
+
+Environment variables:
+    ANPR_CONFIDENCE_CALIBRATION  JSON file with fitted coefficients
+"""
+
+import functools
+import json
+import math
+import os
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+FEATURES = ('ocr', 'grammar', 'candidate', 'agreement')
+
+# A read needs a confident OCR pass and a valid registration to clear 0.9;
+# candidate score and agreement between passes decide the borderline cases
+DEFAULT_CALIBRATION = {
+    'intercept': -6.0,
+    'weights': {'ocr': 4.0, 'grammar': 3.0, 'candidate': 2.0, 'agreement': 1.5}
+}
+
+# Ridge penalty of the calibration fit, keeps the weights finite on separable corpora
+FIT_L2 = 1.0
+FIT_ITERATIONS = 50
+
+
+def confidence_features(ocr_confidence: float, grammar_cost: Optional[float],
+                        candidate_score: float, agreement: float) -> Dict[str, float]:
+    """
+    Normalize the evidence of a read into confidence features.
+
+    Args:
+        ocr_confidence (float): Mean OCR confidence of the plate characters (0-100)
+        grammar_cost (Optional[float]): Cost of the registration decode, None if no format fits
+        candidate_score (float): Score of the plate candidate (0-1)
+        agreement (float): Share of OCR passes that read the same plate (0-1)
+
+    Returns:
+        Dict[str, float]: Feature name -> value between 0 and 1
+    """
+    return {
+        'ocr': min(max(float(ocr_confidence) / 100.0, 0.0), 1.0),
+        'grammar': math.exp(-grammar_cost) if grammar_cost is not None else 0.0,
+        'candidate': min(max(float(candidate_score), 0.0), 1.0),
+        'agreement': min(max(float(agreement), 0.0), 1.0)
+    }
+
+
+def load_calibration(path: str) -> Dict[str, Any]:
+    """
+    Load coefficients written by the benchmark's --calibrate option.
+
+    Args:
+        path (str): JSON file path
+
+    Returns:
+        Dict[str, Any]: intercept and weights per feature
+
+    Raises:
+        ValueError: If the file lacks the intercept or a feature weight
+    """
+    with open(path, 'r') as f:
+        calibration = json.load(f)
+    missing = [name for name in FEATURES if name not in calibration.get('weights', {})]
+    if 'intercept' not in calibration or missing:
+        raise ValueError(f"Incomplete confidence calibration in {path}: missing {missing or ['intercept']}")
+    return calibration
+
+
+@functools.lru_cache(maxsize=None)
+def calibration_from_env() -> Dict[str, Any]:
+    """Coefficients from ANPR_CONFIDENCE_CALIBRATION, or the defaults (read once)."""
+    path = os.environ.get('ANPR_CONFIDENCE_CALIBRATION')
+    return load_calibration(path) if path else DEFAULT_CALIBRATION
+
+
+def plate_confidence(features: Dict[str, float], calibration: Optional[Dict[str, Any]] = None) -> float:
+    """
+    Estimate the probability that a read is exactly right.
+
+    Args:
+        features (Dict[str, float]): Output of confidence_features()
+        calibration (Optional[Dict[str, Any]]): Coefficients; defaults to calibration_from_env()
+
+    Returns:
+        float: Confidence between 0 and 1, rounded to 3 decimals
+    """
+    calibration = calibration if calibration is not None else calibration_from_env()
+    logit = calibration['intercept'] + sum(
+        calibration['weights'][name] * features[name] for name in FEATURES
+    )
+    return round(1.0 / (1.0 + math.exp(-logit)), 3)
+
+
+def fit_calibration(features: Sequence[Dict[str, float]], correct: Sequence[bool],
+                    l2: float = FIT_L2, iterations: int = FIT_ITERATIONS) -> Dict[str, Any]:
+    """
+    Fit the logistic confidence model to labelled reads.
+
+    Uses Newton's method on the L2 regularized log loss; the intercept is
+    not regularized.
+
+    Args:
+        features (Sequence[Dict[str, float]]): Confidence features per read
+        correct (Sequence[bool]): Whether each read was exactly right
+        l2 (float): Ridge penalty on the feature weights
+        iterations (int): Maximum number of Newton steps
+
+    Returns:
+        Dict[str, Any]: intercept, weights per feature and the number of samples
+    """
+    x = np.array([[1.0] + [f[name] for name in FEATURES] for f in features], dtype=np.float64)
+    y = np.asarray(correct, dtype=np.float64)
+    penalty = l2 * np.diag([0.0] + [1.0] * len(FEATURES))
+    coefficients = np.zeros(x.shape[1])
+
+    for _ in range(iterations):
+        p = 1.0 / (1.0 + np.exp(-x @ coefficients))
+        gradient = x.T @ (p - y) + penalty @ coefficients
+        hessian = x.T @ (x * (p * (1.0 - p))[:, None]) + penalty + 1e-9 * np.eye(x.shape[1])
+        step = np.linalg.solve(hessian, gradient)
+        coefficients -= step
+        if np.max(np.abs(step)) < 1e-6:
+            break
+
+    return {
+        'intercept': float(coefficients[0]),
+        'weights': {name: float(w) for name, w in zip(FEATURES, coefficients[1:])},
+        'samples': len(y)
+    }
+
+
+def expected_calibration_error(confidences: Sequence[float], correct: Sequence[bool], bins: int = 10) -> float:
+    """
+    Mean gap between stated confidence and observed accuracy.
+
+    Args:
+        confidences (Sequence[float]): Confidence per read (0-1)
+        correct (Sequence[bool]): Whether each read was exactly right
+        bins (int): Number of equal width confidence bins
+
+    Returns:
+        float: Gap per bin weighted by its share of the reads (0 = perfectly calibrated)
+    """
+    confidences = np.asarray(confidences, dtype=np.float64)
+    correct = np.asarray(correct, dtype=np.float64)
+    if confidences.size == 0:
+        return 0.0
+    index = np.minimum((confidences * bins).astype(int), bins - 1)
+    error = 0.0
+    for b in np.unique(index):
+        in_bin = index == b
+        error += np.count_nonzero(in_bin) * abs(confidences[in_bin].mean() - correct[in_bin].mean())
+    return float(error / confidences.size)
@@ -0,0 +1,154 @@
+import os
+import queue
+import random
+import threading
+import uuid
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from anpr_logging import get_logger
+
+log = get_logger('debug_sink')
+
+
+class DebugSink:
+    """
+    Destination for intermediate images produced during recognition.
+
+    The base class discards everything, so a recognizer configured with it
+    never pays for debugging. Subclasses decide which requests are sampled
+    and where the images end up.
+    """
+
+    def start_frame(self) -> Optional[str]:
+        """
+        Decide whether the next request should be captured.
+
+        Returns:
+            Optional[str]: Frame identifier if sampled, None otherwise
+        """
+        return None
+
+    def emit(self, frame_id: str, name: str, image: np.ndarray) -> None:
+        """
+        Record an intermediate image for a sampled frame.
+
+        Args:
+            frame_id (str): Identifier returned by start_frame
+            name (str): Name of the processing step
+            image (np.ndarray): Intermediate image
+        """
+        pass
+
+    def flush(self) -> None:
+        """Wait until every image recorded so far has been written."""
+        pass
+
+    def close(self) -> None:
+        """Write out recorded images and release any resources held by the sink."""
+        pass
+
+
+class AsyncDebugSink(DebugSink):
+    """
+    Debug sink that writes a sampled fraction of requests to disk
+    from a background thread.
+
+    Images are copied onto a bounded queue and written by a daemon thread.
+    When the queue is full the image is dropped rather than blocking the
+    request that produced it.
+    """
+
+    def __init__(self, output_dir: str, sample_rate: float = 1.0,
+                 max_queue: int = 64, image_format: str = 'png'):
+        """
+        Initialize the sink and start its writer thread.
+
+        Args:
+            output_dir (str): Directory to write images into
+            sample_rate (float): Fraction of requests to capture (0.0 - 1.0)
+            max_queue (int): Maximum number of images waiting to be written
+            image_format (str): File extension used for written images
+        """
+        self.output_dir = output_dir
+        self.sample_rate = max(0.0, min(1.0, sample_rate))
+        self.image_format = image_format
+        self.dropped = 0
+        self.written = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._closed = False
+        self._close_lock = threading.Lock()
+
+        os.makedirs(output_dir, exist_ok=True)
+
+        self._thread = threading.Thread(target=self._run, name='anpr-debug-sink', daemon=True)
+        self._thread.start()
+
+    def start_frame(self) -> Optional[str]:
+        """Sample the next request according to sample_rate."""
+        if self.sample_rate <= 0.0 or random.random() >= self.sample_rate:
+            return None
+        return uuid.uuid4().hex[:12]
+
+    def emit(self, frame_id: str, name: str, image: np.ndarray) -> None:
+        """Queue a copy of the image for writing; drop it if the queue is full or the sink closed."""
+        if self._closed:
+            self.dropped += 1
+            return
+        try:
+            self._queue.put_nowait((frame_id, name, image.copy()))
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        """Write queued images until a None sentinel is received."""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                break
+
+            frame_id, name, image = item
+            safe_name = ''.join(c if c.isalnum() else '_' for c in name).strip('_').lower()
+            path = os.path.join(self.output_dir, f"{frame_id}_{safe_name}.{self.image_format}")
+
+            try:
+                cv2.imwrite(path, image)
+                self.written += 1
+            except Exception as e:
+                log.warning("Error writing debug image %s: %s", path, e)
+            finally:
+                self._queue.task_done()
+
+    def flush(self) -> None:
+        """Wait until every queued image has been written."""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Flush pending images and stop the writer thread; later calls do nothing."""
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+
+def debug_sink_from_env() -> DebugSink:
+    """
+    Build a debug sink from environment variables.
+
+    ANPR_DEBUG_DIR enables the sink and sets its output directory;
+    ANPR_DEBUG_SAMPLE_RATE sets the fraction of requests captured (default 0.01).
+
+    Returns:
+        DebugSink: Configured sink, or a no-op sink if ANPR_DEBUG_DIR is unset
+    """
+    output_dir = os.environ.get('ANPR_DEBUG_DIR')
+    if not output_dir:
+        return DebugSink()
+
+    sample_rate = float(os.environ.get('ANPR_DEBUG_SAMPLE_RATE', '0.01'))
+    return AsyncDebugSink(output_dir, sample_rate=sample_rate)
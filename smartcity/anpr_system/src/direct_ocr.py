@@ -1,61 +1,92 @@
 import cv2
-import pytesseract
 from PIL import Image
-import re
 import sys
+from anpr_logging import configure_logging, get_logger
+from image_io import load_image, describe_source
+from ocr_engine import get_default_engine
+from pipeline import Pipeline, Stage
+from uk_grammar import format_registration
+
+log = get_logger('direct_ocr')
+
+# Configuration for UK plates
+CUSTOM_CONFIG = r'--psm 6 --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
+
+_pipeline = None
 
 def clean_and_format_plate(text):
     """
     Clean and format the recognized text as a UK plate.
     """
-    # Remove non-alphanumeric characters
-    clean_text = ''.join(c for c in text if c.isalnum()).upper()
-    
-    # Look for UK plate pattern (e.g., AA00AAA or AA00 AAA)
-    if len(clean_text) >= 7:
-        # Try to extract the UK plate format
-        for i in range(len(clean_text) - 6):
-            candidate = clean_text[i:i+7]
-            if re.match(r'^[A-Z]{2}\d{2}[A-Z]{3}$', candidate):
-                return f"{candidate[:2]}{candidate[2:4]} {candidate[4:]}"
-    
-    return clean_text
+    return format_registration(text)
+
+def build_direct_pipeline(ocr_engine=None):
+    """
+    Create the 'direct' pipeline configuration: OCR of the whole
+    Otsu-thresholded image without plate detection.
+    
+    Args:
+        ocr_engine (OCREngine): OCR backend; defaults to the shared engine pool
+        
+    Returns:
+        Pipeline: Pipeline of the direct OCR path
+    """
+    ocr = ocr_engine if ocr_engine is not None else get_default_engine()
+    
+    def decode(ctx):
+        ctx.image = load_image(ctx.source)
+        if ctx.image is None:
+            log.warning("Error loading image: %s", describe_source(ctx.source))
+            ctx.done = True
+    
+    def preprocess(ctx):
+        # Apply thresholding to the grayscale image to increase contrast
+        gray = cv2.cvtColor(ctx.image, cv2.COLOR_BGR2GRAY)
+        _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+        ctx.images['Processed Image'] = thresh
+    
+    def read_text(ctx):
+        # Perform OCR
+        pil_image = Image.fromarray(ctx.images['Processed Image'])
+        ctx.texts = [ocr.image_to_string(pil_image, config=CUSTOM_CONFIG)]
+        ctx.count('ocr_passes')
+    
+    def grammar(ctx):
+        # Clean and format the recognized text
+        h, w = ctx.image.shape[:2]
+        ctx.plates.append({
+            "plate_number": clean_and_format_plate(ctx.texts[0]),
+            "country_identifier": "UNKNOWN",
+            "region": ctx.image,
+            "bbox": (0, 0, w, h)
+        })
+    
+    return Pipeline('direct', [
+        Stage('decode', 'decode', decode),
+        Stage('threshold', 'preprocess', preprocess),
+        Stage('ocr', 'ocr', read_text),
+        Stage('plate_format', 'grammar', grammar)
+    ])
 
 def process_image(image_path):
     """
     Direct OCR processing of an image without contour detection.
     """
-    # Load the image
-    image = cv2.imread(image_path)
+    global _pipeline
+    if _pipeline is None:
+        _pipeline = build_direct_pipeline()
+    
+    ctx = _pipeline.run(image_path)
+    image = ctx.image
     if image is None:
-        print(f"Error loading image: {image_path}")
         return None, None
     
-    # Display original image
+    # Display original and processed image
     cv2.imshow("Original Image", image)
+    cv2.imshow("Processed Image", ctx.images['Processed Image'])
     
-    # Convert to grayscale
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    
-    # Apply thresholding to increase contrast
-    _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
-    
-    # Display processed image
-    cv2.imshow("Processed Image", thresh)
-    
-    # Convert to PIL Image for OCR
-    pil_image = Image.fromarray(thresh)
-    
-    # Create configuration for UK plates
-    custom_config = r'--psm 6 --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
-    
-    # Perform OCR
-    text = pytesseract.image_to_string(pil_image, config=custom_config)
-    
-    # Clean and format the recognized text
-    formatted_text = clean_and_format_plate(text)
-    
-    print(f"Raw OCR result: {text}")
+    formatted_text = ctx.plates[0]["plate_number"]
+    print(f"Raw OCR result: {ctx.texts[0]}")
     print(f"Formatted plate: {formatted_text}")
     
     # Focus on the plate region if possible
@@ -74,6 +105,7 @@ if __name__ == "__main__":
         print("Usage: python direct_ocr.py <image_path>")
         sys.exit(1)
     
+    configure_logging()
     text, _ = process_image(sys.argv[1])
     print(f"Final result: {text}")
     
@@ -2,22 +2,29 @@ import firebase_admin
 from firebase_admin import credentials, firestore
 from datetime import datetime
 from typing import Optional, Dict, Any
+from anpr_logging import get_logger
+from firestore_writer import firestore_writer_from_env
+
+log = get_logger('firebase_handler')
 
 class FirebaseHandler:
     """
     A class for handling Firebase operations related to ANPR system.
     """
     
-    def __init__(self, service_account_path: str):
+    def __init__(self, service_account_path: str, buffered: bool = False):
         """
         Initialize Firebase handler with service account credentials.
         
         Args:
             service_account_path (str): Path to the Firebase service account key file
+            buffered (bool): Queue recognition records and commit them in batches from
+                a background thread, so that saving does not wait on the network
         """
         cred = credentials.Certificate(service_account_path)
         firebase_admin.initialize_app(cred)
         self.db = firestore.client()
+        self.writer = firestore_writer_from_env(self.db, 'plate_recognition') if buffered else None
         
     def save_plate_recognition(self, 
                              plate_number: str, 
@@ -32,11 +39,9 @@ class FirebaseHandler:
             location (Optional[str]): Location where the plate was recognized
             
         Returns:
-            str: Document ID of the saved record
+            str: Document ID of the saved record (when buffered, the record is
+                 committed in the background)
         """
-        # Create a new document in the 'plate_recognition' collection
-        doc_ref = self.db.collection('plate_recognition').document()
-        
         # Prepare the data
         data = {
             'plate_number': plate_number,
@@ -46,6 +51,12 @@ class FirebaseHandler:
             'status': 'active'
         }
         
+        if self.writer is not None:
+            return self.writer.write(data)
+        
+        # Create a new document in the 'plate_recognition' collection
+        doc_ref = self.db.collection('plate_recognition').document()
+        
         # Save to Firebase
         doc_ref.set(data)
         
@@ -61,6 +72,12 @@ class FirebaseHandler:
         Returns:
             Optional[Dict[str, Any]]: Record data if found, None otherwise
         """
+        # Records still waiting for their batch are not in Firestore yet
+        if self.writer is not None:
+            pending = self.writer.pending(doc_id)
+            if pending is not None:
+                return dict(pending)
+        
         doc_ref = self.db.collection('plate_recognition').document(doc_id)
         doc = doc_ref.get()
         
@@ -80,12 +97,20 @@ class FirebaseHandler:
             bool: True if update was successful, False otherwise
         """
         try:
+            # A document must exist before it can be updated
+            if self.writer is not None and self.writer.pending(doc_id) is not None:
+                self.writer.flush()
             doc_ref = self.db.collection('plate_recognition').document(doc_id)
             doc_ref.update({
                 'status': status,
                 'updated_at': datetime.now()
             })
             return True
-        except Exception as e:
-            print(f"Error updating plate status: {str(e)}")
-            return False 
\ No newline at end of file
+        except Exception:
+            log.exception("Error updating plate status of %s", doc_id)
+            return False
+    
+    def close(self) -> None:
+        """Commit any buffered recognition records."""
+        if self.writer is not None:
+            self.writer.close()
@@ -0,0 +1,288 @@
+"""
+Write-behind Firestore writer for recognition records.
+
+A blocking document write per plate puts a network round trip on the path
+of every recognized image. BufferedFirestoreWriter instead takes the
+document ID from the client library (Firestore generates IDs locally),
+buffers the record and returns the ID at once. A background thread commits
+the buffer in Firestore batches, when batch_size records are waiting or
+flush_interval seconds after the oldest one arrived, whichever comes first.
+
+A failed batch is retried with exponential backoff and jitter. Batches are
+atomic and every record has its final document ID, so a retry rewrites the
+same documents and cannot create duplicates. Memory is bounded: at most
+max_pending records are buffered or being committed, and write() blocks
+for up to block_timeout seconds when the buffer is full before raising
+BufferFullError.
+
+The writer only needs db.collection(name).document(), db.batch(),
+batch.set() and batch.commit(), so it runs against the Firestore emulator
+(FIRESTORE_EMULATOR_HOST) or an in-memory stand-in as well.
+
+Environment variables:
+    ANPR_FIRESTORE_BATCH_SIZE     Records per batch commit (default 100, at most 500)
+    ANPR_FIRESTORE_FLUSH_SECONDS  Longest time a record waits for its batch (default 1.0)
+    ANPR_FIRESTORE_MAX_PENDING    Records buffered or being committed at most (default 1000)
+"""
+
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+from anpr_logging import get_logger
+
+log = get_logger('firestore_writer')
+
+# Firestore rejects batches of more than 500 writes
+MAX_BATCH_SIZE = 500
+
+BATCH_SIZE = 100
+FLUSH_INTERVAL = 1.0
+MAX_PENDING = 1000
+BLOCK_TIMEOUT = 5.0
+
+MAX_RETRIES = 5
+# Retry delays double from BACKOFF_BASE up to BACKOFF_MAX seconds
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+
+
+class BufferFullError(Exception):
+    """Raised when a record cannot be buffered within the blocking timeout."""
+
+    def __init__(self, pending: int):
+        super().__init__(f"Firestore write buffer is full ({pending} records pending)")
+        self.pending = pending
+
+
+class BufferedFirestoreWriter:
+    """
+    Buffer Firestore document writes and commit them in batches from a
+    background thread.
+    """
+
+    def __init__(self, db, collection: str, batch_size: int = BATCH_SIZE,
+                 flush_interval: float = FLUSH_INTERVAL, max_pending: int = MAX_PENDING,
+                 block_timeout: Optional[float] = BLOCK_TIMEOUT, max_retries: int = MAX_RETRIES,
+                 backoff_base: float = BACKOFF_BASE, backoff_max: float = BACKOFF_MAX):
+        """
+        Initialize the writer and start its commit thread.
+
+        Args:
+            db: Firestore client (firestore.client() or a compatible stand-in)
+            collection (str): Collection the records are written to
+            batch_size (int): Records per batch commit (at most 500)
+            flush_interval (float): Seconds a record waits at most for its batch to fill
+            max_pending (int): Records buffered or being committed at most
+            block_timeout (Optional[float]): Seconds write() waits for buffer space
+                (None waits indefinitely)
+            max_retries (int): Retries of a failed batch before its records are dropped
+            backoff_base (float): Delay before the first retry, doubled for each further one
+            backoff_max (float): Longest delay between retries
+        """
+        self.db = db
+        self.collection = collection
+        self.batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+        self.flush_interval = flush_interval
+        self.max_pending = max(max_pending, self.batch_size)
+        self.block_timeout = block_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.committed = 0
+        self.failed = 0
+        self.batches = 0
+        self.retries = 0
+
+        # (document reference, data, monotonic enqueue time), oldest first
+        self._buffer = deque()
+        # Data of records not committed yet, by document ID
+        self._pending = {}
+        self._in_flight = 0
+        self._flush_waiters = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+        self._thread = threading.Thread(target=self._run, name='anpr-firestore-writer', daemon=True)
+        self._thread.start()
+
+    def write(self, data: Dict[str, Any]) -> str:
+        """
+        Buffer a new document.
+
+        Args:
+            data (Dict[str, Any]): Document fields
+
+        Returns:
+            str: Document ID the record will be written under
+
+        Raises:
+            BufferFullError: If no buffer space became free within block_timeout
+            RuntimeError: If the writer has been closed
+        """
+        # The client library generates the ID locally, without a round trip
+        doc_ref = self.db.collection(self.collection).document()
+        deadline = None if self.block_timeout is None else time.monotonic() + self.block_timeout
+
+        with self._cond:
+            while not self._closed and len(self._buffer) + self._in_flight >= self.max_pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise BufferFullError(len(self._buffer) + self._in_flight)
+                self._cond.wait(remaining)
+            if self._closed:
+                raise RuntimeError("Firestore writer is closed")
+
+            self._buffer.append((doc_ref, data, time.monotonic()))
+            self._pending[doc_ref.id] = data
+            # Wakes the commit thread to start the batch window or commit a full batch
+            self._cond.notify_all()
+        return doc_ref.id
+
+    def pending(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Data of a buffered record that has not been committed yet.
+
+        Args:
+            doc_id (str): Document ID returned by write()
+
+        Returns:
+            Optional[Dict[str, Any]]: Document fields, or None if not pending
+        """
+        with self._cond:
+            return self._pending.get(doc_id)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Commit the buffered records now and wait until they are written or dropped.
+
+        Args:
+            timeout (Optional[float]): Seconds to wait at most (None waits indefinitely)
+
+        Returns:
+            bool: True if nothing is pending any more
+        """
+        with self._cond:
+            self._flush_waiters += 1
+            self._cond.notify_all()
+            try:
+                return self._cond.wait_for(lambda: not self._buffer and not self._in_flight, timeout)
+            finally:
+                self._flush_waiters -= 1
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Commit the buffered records and stop the commit thread.
+
+        Args:
+            timeout (Optional[float]): Seconds to wait for the thread at most
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Current writer counters.
+
+        Returns:
+            Dict[str, int]: pending, committed, failed, batches and retries
+        """
+        with self._cond:
+            return {
+                'pending': len(self._buffer) + self._in_flight,
+                'committed': self.committed,
+                'failed': self.failed,
+                'batches': self.batches,
+                'retries': self.retries
+            }
+
+    def _next_batch(self) -> Optional[list]:
+        """Wait for a full batch, the end of the batch window, a flush or close; None when done."""
+        with self._cond:
+            while not self._buffer and not self._closed:
+                self._cond.wait()
+            if not self._buffer:
+                return None
+
+            deadline = self._buffer[0][2] + self.flush_interval
+            while (len(self._buffer) < self.batch_size and not self._closed
+                   and not self._flush_waiters and time.monotonic() < deadline):
+                self._cond.wait(deadline - time.monotonic())
+
+            batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+            self._in_flight += len(batch)
+            return batch
+
+    def _run(self) -> None:
+        """Commit batches until the writer is closed and the buffer is empty."""
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                break
+
+            committed = self._commit(batch)
+            with self._cond:
+                self._in_flight -= len(batch)
+                for doc_ref, _, _ in batch:
+                    self._pending.pop(doc_ref.id, None)
+                if committed:
+                    self.committed += len(batch)
+                    self.batches += 1
+                else:
+                    self.failed += len(batch)
+                self._cond.notify_all()
+
+    def _commit(self, batch: list) -> bool:
+        """
+        Commit one batch, retrying with exponential backoff.
+
+        Args:
+            batch (list): Buffered (document reference, data, enqueue time) entries
+
+        Returns:
+            bool: Whether the batch was committed
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                write_batch = self.db.batch()
+                for doc_ref, data, _ in batch:
+                    write_batch.set(doc_ref, data)
+                write_batch.commit()
+                return True
+            except Exception as e:
+                if attempt == self.max_retries:
+                    log.error("Dropping %d Firestore writes after %d attempts: %s", len(batch), attempt + 1, e)
+                    return False
+                # Jitter keeps writers that failed together from retrying in lockstep
+                delay = random.uniform(0.5, 1.0) * min(self.backoff_max, self.backoff_base * 2 ** attempt)
+                log.warning("Firestore batch of %d writes failed (%s); retrying in %.2fs",
+                            len(batch), e, delay)
+                with self._cond:
+                    self.retries += 1
+                time.sleep(delay)
+        return False
+
+
+def firestore_writer_from_env(db, collection: str) -> BufferedFirestoreWriter:
+    """
+    Build a buffered writer configured from environment variables.
+
+    Args:
+        db: Firestore client
+        collection (str): Collection the records are written to
+
+    Returns:
+        BufferedFirestoreWriter: Started writer
+    """
+    return BufferedFirestoreWriter(
+        db, collection,
+        batch_size=int(os.environ.get('ANPR_FIRESTORE_BATCH_SIZE', BATCH_SIZE)),
+        flush_interval=float(os.environ.get('ANPR_FIRESTORE_FLUSH_SECONDS', FLUSH_INTERVAL)),
+        max_pending=int(os.environ.get('ANPR_FIRESTORE_MAX_PENDING', MAX_PENDING))
+    )
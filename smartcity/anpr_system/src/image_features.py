@@ -0,0 +1,240 @@
+import os
+
+import cv2
+import numpy as np
+from typing import Callable, Dict, List, Optional, Tuple
+
+# HSV range of the blue EU/GB band on the left of UK plates
+BLUE_LOWER = np.array([100, 50, 50])
+BLUE_UPPER = np.array([130, 255, 255])
+
+# HSV range of white plate background and band lettering
+WHITE_LOWER = np.array([0, 0, 180])
+WHITE_UPPER = np.array([180, 30, 255])
+
+# HSV range of yellow rear plates
+YELLOW_LOWER = np.array([15, 90, 90])
+YELLOW_UPPER = np.array([35, 255, 255])
+
+# Maps computed pixel by pixel; a crop can slice them out of its parent's map
+POINTWISE_MAPS = ('gray', 'hsv', 'blue_mask', 'white_mask', 'yellow_mask')
+
+# Candidate search runs on a copy whose longest side is at most this many
+# pixels (0 searches at full resolution); crops for OCR stay full resolution
+DETECT_MAX_SIDE = 1280
+# Pyramid levels searched; each extra level doubles the resolution (up to full)
+# so that small, distant plates are not lost by the downscaling
+DETECT_LEVELS = 1
+
+
+def detection_settings_from_env() -> Tuple[int, int]:
+    """
+    Read the candidate search resolution from the environment.
+
+    Returns:
+        Tuple[int, int]: (ANPR_DETECT_MAX_SIDE, ANPR_DETECT_LEVELS)
+    """
+    return (int(os.environ.get('ANPR_DETECT_MAX_SIDE', DETECT_MAX_SIDE)),
+            int(os.environ.get('ANPR_DETECT_LEVELS', DETECT_LEVELS)))
+
+
+def detection_scales(shape: Tuple[int, ...], max_side: int = DETECT_MAX_SIDE,
+                     levels: int = DETECT_LEVELS) -> List[float]:
+    """
+    Scales of the candidate search pyramid, coarsest first.
+
+    Args:
+        shape (Tuple[int, ...]): Shape of the full resolution image
+        max_side (int): Longest side of the coarsest level; 0 means full resolution
+        levels (int): Maximum number of levels, each twice the previous scale
+
+    Returns:
+        List[float]: Scale factors, none above 1.0
+    """
+    if not max_side:
+        return [1.0]
+    scales = [min(1.0, max_side / float(max(shape[:2])))]
+    while len(scales) < levels and scales[-1] < 1.0:
+        scales.append(min(1.0, 2.0 * scales[-1]))
+    return scales
+
+
+def scale_box(bbox: Tuple[int, int, int, int], scale: float,
+              shape: Tuple[int, ...]) -> Tuple[int, int, int, int]:
+    """
+    Map a box found on a scaled image back to full resolution coordinates.
+
+    Args:
+        bbox (Tuple[int, int, int, int]): (x, y, w, h) on the scaled image
+        scale (float): Scale the box was found at
+        shape (Tuple[int, ...]): Shape of the full resolution image
+
+    Returns:
+        Tuple[int, int, int, int]: (x, y, w, h) clipped to the full resolution image
+    """
+    if scale == 1.0:
+        return tuple(int(v) for v in bbox)
+    x, y, w, h = bbox
+    height, width = shape[:2]
+    x1, y1 = int(np.floor(x / scale)), int(np.floor(y / scale))
+    x2, y2 = min(width, int(np.ceil((x + w) / scale))), min(height, int(np.ceil((y + h) / scale)))
+    return x1, y1, max(1, x2 - x1), max(1, y2 - y1)
+
+
+class ImageFeatures:
+    """
+    Lazily computed, memoized representations of one BGR image.
+
+    Grayscale, HSV, colour masks and binarizations are computed on first
+    access and then reused by every stage that needs them. Crops created
+    with crop() remember their parent: pointwise maps (grayscale, HSV and
+    the colour masks) that the parent already holds are sliced instead of
+    recomputed, while neighbourhood operations such as adaptive thresholds
+    are computed on the crop itself, exactly as on a standalone image.
+    """
+
+    def __init__(self, bgr: np.ndarray, parent: Optional['ImageFeatures'] = None,
+                 bbox: Optional[Tuple[int, int, int, int]] = None):
+        """
+        Wrap an image.
+
+        Args:
+            bgr (np.ndarray): Image in BGR format
+            parent (Optional[ImageFeatures]): Image this one was cropped from
+            bbox (Optional[Tuple[int, int, int, int]]): Crop (x, y, w, h) within the parent
+        """
+        self.bgr = bgr
+        self.parent = parent
+        self.bbox = bbox
+        self._maps: Dict[str, np.ndarray] = {}
+        self._crops: Dict[Tuple[int, int, int, int], 'ImageFeatures'] = {}
+        self._scaled: Dict[float, 'ImageFeatures'] = {}
+
+    @classmethod
+    def of(cls, image) -> 'ImageFeatures':
+        """
+        Return image itself if it already is an ImageFeatures, else wrap it.
+
+        Args:
+            image (np.ndarray | ImageFeatures): BGR image or its features
+
+        Returns:
+            ImageFeatures: Features of the image
+        """
+        return image if isinstance(image, ImageFeatures) else cls(image)
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        """Shape of the BGR image."""
+        return self.bgr.shape
+
+    def _memo(self, name: str, compute: Callable[[], np.ndarray]) -> np.ndarray:
+        """Return a cached map, deriving it from the parent or computing it on first use."""
+        value = self._maps.get(name)
+        if value is not None:
+            return value
+
+        if name in POINTWISE_MAPS and self.parent is not None and name in self.parent._maps:
+            x, y, w, h = self.bbox
+            value = self.parent._maps[name][y:y+h, x:x+w]
+        else:
+            value = compute()
+
+        self._maps[name] = value
+        return value
+
+    @property
+    def gray(self) -> np.ndarray:
+        """Grayscale image."""
+        return self._memo('gray', lambda: cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY))
+
+    @property
+    def hsv(self) -> np.ndarray:
+        """HSV image."""
+        return self._memo('hsv', lambda: cv2.cvtColor(self.bgr, cv2.COLOR_BGR2HSV))
+
+    @property
+    def blue_mask(self) -> np.ndarray:
+        """Mask of blue (EU/GB band) pixels."""
+        return self._memo('blue_mask', lambda: cv2.inRange(self.hsv, BLUE_LOWER, BLUE_UPPER))
+
+    @property
+    def white_mask(self) -> np.ndarray:
+        """Mask of bright, unsaturated pixels."""
+        return self._memo('white_mask', lambda: cv2.inRange(self.hsv, WHITE_LOWER, WHITE_UPPER))
+
+    @property
+    def yellow_mask(self) -> np.ndarray:
+        """Mask of yellow (rear plate) pixels."""
+        return self._memo('yellow_mask', lambda: cv2.inRange(self.hsv, YELLOW_LOWER, YELLOW_UPPER))
+
+    @property
+    def blurred(self) -> np.ndarray:
+        """Grayscale image after a 5x5 Gaussian blur."""
+        return self._memo('blurred', lambda: cv2.GaussianBlur(self.gray, (5, 5), 0))
+
+    @property
+    def adaptive_binary(self) -> np.ndarray:
+        """Adaptive Gaussian threshold (block size 11, C 2) of the grayscale image."""
+        return self._memo('adaptive_binary', lambda: cv2.adaptiveThreshold(
+            self.gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2
+        ))
+
+    @property
+    def otsu_binary(self) -> np.ndarray:
+        """Otsu threshold of the grayscale image."""
+        return self._memo('otsu_binary', lambda: cv2.threshold(
+            self.gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU
+        )[1])
+
+    def crop(self, x: int, y: int, w: int, h: int) -> 'ImageFeatures':
+        """
+        Features of a rectangular part of this image.
+
+        Args:
+            x (int): Left edge
+            y (int): Top edge
+            w (int): Width
+            h (int): Height
+
+        Returns:
+            ImageFeatures: Features of the crop (the same object for repeated calls)
+        """
+        bbox = (x, y, w, h)
+        child = self._crops.get(bbox)
+        if child is None:
+            child = ImageFeatures(self.bgr[y:y+h, x:x+w], parent=self, bbox=bbox)
+            self._crops[bbox] = child
+        return child
+
+    def resized(self, scale: float) -> 'ImageFeatures':
+        """
+        Features of a resized copy of this image (cubic interpolation).
+
+        Args:
+            scale (float): Scale factor for both axes
+
+        Returns:
+            ImageFeatures: Features of the resized image
+        """
+        return ImageFeatures(cv2.resize(self.bgr, None, fx=scale, fy=scale,
+                                        interpolation=cv2.INTER_CUBIC))
+
+    def downscaled(self, scale: float) -> 'ImageFeatures':
+        """
+        Features of a reduced copy of this image (area interpolation).
+
+        Args:
+            scale (float): Scale factor for both axes; 1.0 or more returns this image
+
+        Returns:
+            ImageFeatures: Features of the reduced image (the same object for repeated calls)
+        """
+        if scale >= 1.0:
+            return self
+        level = self._scaled.get(scale)
+        if level is None:
+            level = ImageFeatures(cv2.resize(self.bgr, None, fx=scale, fy=scale,
+                                             interpolation=cv2.INTER_AREA))
+            self._scaled[scale] = level
+        return level
@@ -0,0 +1,63 @@
+import cv2
+import numpy as np
+from typing import Optional, Union
+
+ImageSource = Union[str, bytes, bytearray, memoryview, np.ndarray]
+
+
+def decode_image(data: Union[bytes, bytearray, memoryview]) -> Optional[np.ndarray]:
+    """
+    Decode an encoded image (JPEG, PNG, ...) held in memory.
+
+    Args:
+        data (bytes): Encoded image bytes, e.g. the body of an upload
+
+    Returns:
+        Optional[np.ndarray]: Decoded BGR image or None if decoding fails
+    """
+    if not data:
+        return None
+
+    # Wrap the bytes without copying them before decoding
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    return cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+
+
+def load_image(source: ImageSource) -> Optional[np.ndarray]:
+    """
+    Load an image from a path, encoded bytes or an already decoded array.
+
+    Args:
+        source: File path, encoded image bytes or BGR/grayscale ndarray
+
+    Returns:
+        Optional[np.ndarray]: BGR image or None if it cannot be loaded
+    """
+    if isinstance(source, np.ndarray):
+        if source.ndim == 2:
+            return cv2.cvtColor(source, cv2.COLOR_GRAY2BGR)
+        if source.ndim == 3 and source.shape[2] == 4:
+            return cv2.cvtColor(source, cv2.COLOR_BGRA2BGR)
+        return source
+
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return decode_image(source)
+
+    return cv2.imread(source)
+
+
+def describe_source(source: ImageSource) -> str:
+    """
+    Describe an image source for log and error messages.
+
+    Args:
+        source: File path, encoded image bytes or ndarray
+
+    Returns:
+        str: Short human readable description
+    """
+    if isinstance(source, np.ndarray):
+        return f"<array {'x'.join(str(d) for d in source.shape)}>"
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return f"<{len(source)} bytes>"
+    return str(source)
@@ -18,7 +18,8 @@ class ANPRSystem:
             firebase_credentials_path (str): Path to Firebase service account credentials
         """
         self.plate_recognizer = PlateRecognizer()
-        self.firebase_handler = FirebaseHandler(firebase_credentials_path)
+        # Records are committed in the background; close() waits for them
+        self.firebase_handler = FirebaseHandler(firebase_credentials_path, buffered=True)
         
     def process_image(self, image_path: str, location: Optional[str] = None) -> Tuple[bool, str]:
         """
@@ -54,6 +55,10 @@ class ANPRSystem:
             
         except Exception as e:
             return False, f"Error processing image: {str(e)}"
+    
+    def close(self) -> None:
+        """Commit the recognition records still buffered for Firebase."""
+        self.firebase_handler.close()
             
 def main():
     """
@@ -70,7 +75,10 @@ def main():
     anpr = ANPRSystem(args.credentials)
     
     # Process the image
-    success, message = anpr.process_image(args.image, args.location)
+    try:
+        success, message = anpr.process_image(args.image, args.location)
+    finally:
+        anpr.close()
     
     print(message)
     return 0 if success else 1
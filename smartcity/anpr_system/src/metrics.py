@@ -0,0 +1,451 @@
+"""
+Low-overhead metrics in the Prometheus text exposition format.
+
+Counters, gauges and histograms are kept in a process-wide registry and
+rendered on the /metrics endpoint of the API servers. Recording a value
+is a dictionary update under a lock, so instrumentation can stay on the
+hot path. Worker processes ship their recorded values to the parent with
+snapshot(reset=True) and the parent adds them with merge().
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Latency buckets in seconds, from a few milliseconds to a slow OCR cascade
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the text format."""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    """Render a label set as {name="value",...}; empty when there are no labels."""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    """Render a sample value."""
+    if value == float('inf'):
+        return '+Inf'
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric:
+    """Base class of a named metric with a fixed set of label names."""
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        """
+        Initialize the metric.
+
+        Args:
+            name (str): Metric name, e.g. 'anpr_ocr_calls_total'
+            documentation (str): Help text
+            labelnames (Sequence[str]): Names of the labels every sample carries
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._functions = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        """Order label values by the metric's label names."""
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def set_function(self, func: Callable[[], float], **labels) -> None:
+        """
+        Read a sample from a callback when metrics are rendered.
+
+        Args:
+            func (Callable[[], float]): Returns the current value
+            **labels: Label values of the sample
+        """
+        with self._lock:
+            self._functions[self._key(labels)] = func
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        """
+        Current samples of the metric.
+
+        Returns:
+            List[Tuple[str, str, float]]: (sample name, rendered labels, value)
+        """
+        with self._lock:
+            values = dict(self._values)
+            functions = dict(self._functions)
+        for key, func in functions.items():
+            try:
+                values[key] = float(func())
+            except Exception:
+                continue
+        return [(self.name, _format_labels(self.labelnames, key), value)
+                for key, value in sorted(values.items())]
+
+    def snapshot(self, reset: bool = False) -> List[Tuple[Tuple[str, ...], Any]]:
+        """Recorded values (not callbacks) by label values, optionally clearing them."""
+        with self._lock:
+            values = list(self._values.items())
+            if reset:
+                self._values.clear()
+        return values
+
+    def merge(self, values: List[Tuple[Tuple[str, ...], Any]]) -> None:
+        """Add recorded values from another process."""
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """Monotonically increasing count."""
+
+    kind = 'counter'
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        """
+        Increase the counter.
+
+        Args:
+            amount (float): Non-negative increment
+            **labels: Label values
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def merge(self, values: List[Tuple[Tuple[str, ...], Any]]) -> None:
+        """Add counts recorded in another process."""
+        with self._lock:
+            for key, amount in values:
+                key = tuple(key)
+                self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(Metric):
+    """Value that can go up and down, such as a queue depth."""
+
+    kind = 'gauge'
+
+    def set(self, value: float, **labels) -> None:
+        """Set the gauge to a value."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        """Increase (or with a negative amount, decrease) the gauge."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        """Decrease the gauge."""
+        self.inc(-amount, **labels)
+
+    def snapshot(self, reset: bool = False) -> List[Tuple[Tuple[str, ...], Any]]:
+        """Gauges describe the process that owns them and are not shipped to another one."""
+        return []
+
+    def merge(self, values: List[Tuple[Tuple[str, ...], Any]]) -> None:
+        """Gauges are not merged across processes."""
+        pass
+
+
+class Histogram(Metric):
+    """Distribution of observed values in cumulative buckets."""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        """
+        Initialize the histogram.
+
+        Args:
+            name (str): Metric name, e.g. 'anpr_stage_duration_seconds'
+            documentation (str): Help text
+            labelnames (Sequence[str]): Names of the labels every sample carries
+            buckets (Sequence[float]): Upper bounds of the buckets; +Inf is added
+        """
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        """
+        Record one observation.
+
+        Args:
+            value (float): Observed value, e.g. a duration in seconds
+            **labels: Label values
+        """
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (not cumulative) counts including +Inf, sum, count
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall-clock duration of a with-block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        """Bucket, sum and count samples of every label set."""
+        with self._lock:
+            values = [(key, (list(state[0]), state[1], state[2])) for key, state in self._values.items()]
+
+        samples = []
+        for key, (counts, total, count) in sorted(values):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                samples.append((self.name + '_bucket', _format_labels(self.labelnames, key, le), cumulative))
+            labels = _format_labels(self.labelnames, key)
+            samples.append((self.name + '_sum', labels, total))
+            samples.append((self.name + '_count', labels, count))
+        return samples
+
+    def snapshot(self, reset: bool = False) -> List[Tuple[Tuple[str, ...], Any]]:
+        """Recorded bucket counts, sums and counts, optionally clearing them."""
+        with self._lock:
+            values = [(key, (list(state[0]), state[1], state[2])) for key, state in self._values.items()]
+            if reset:
+                self._values.clear()
+        return values
+
+    def merge(self, values: List[Tuple[Tuple[str, ...], Any]]) -> None:
+        """Add observations recorded in another process."""
+        with self._lock:
+            for key, (counts, total, count) in values:
+                key = tuple(key)
+                state = self._values.get(key)
+                if state is None:
+                    state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                state[0] = [a + b for a, b in zip(state[0], counts)]
+                state[1] += total
+                state[2] += count
+
+
+class MetricsRegistry:
+    """Named collection of metrics that renders to the Prometheus text format."""
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, documentation: str, labelnames: Sequence[str], **kwargs) -> Metric:
+        """Return the metric of that name, creating it on first use."""
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already registered as a different {metric.kind}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Register (or look up) a counter."""
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        """Register (or look up) a gauge."""
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        """Register (or look up) a histogram."""
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        """
+        Render every metric in the Prometheus text exposition format.
+
+        Returns:
+            str: Text for a /metrics response
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self, reset: bool = False) -> Dict[str, list]:
+        """
+        Recorded counter and histogram values, for shipping to another process.
+
+        Args:
+            reset (bool): Clear the recorded values, so the next snapshot only has new ones
+
+        Returns:
+            Dict[str, list]: Picklable values by metric name
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        snapshot = {}
+        for metric in metrics:
+            values = metric.snapshot(reset)
+            if values:
+                snapshot[metric.name] = values
+        return snapshot
+
+    def merge(self, snapshot: Optional[Dict[str, list]]) -> None:
+        """
+        Add the values of a snapshot taken in another process.
+
+        Args:
+            snapshot (Optional[Dict[str, list]]): Output of snapshot(); unknown metrics are ignored
+        """
+        for name, values in (snapshot or {}).items():
+            metric = self._metrics.get(name)
+            if metric is not None:
+                metric.merge(values)
+
+
+# Process-wide registry and the metrics shared by the recognizers and API servers
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    'anpr_http_requests_total', 'HTTP requests by endpoint and status code',
+    ('app', 'endpoint', 'method', 'status'))
+HTTP_LATENCY = REGISTRY.histogram(
+    'anpr_http_request_duration_seconds', 'HTTP request latency', ('app', 'endpoint'))
+HTTP_IN_FLIGHT = REGISTRY.gauge(
+    'anpr_http_requests_in_flight', 'HTTP requests being served', ('app',))
+PIPELINE_RUNS = REGISTRY.counter(
+    'anpr_pipeline_runs_total', 'Images processed by each recognition pipeline', ('pipeline',))
+STAGE_LATENCY = REGISTRY.histogram(
+    'anpr_stage_duration_seconds', 'Duration of each recognition pipeline stage', ('pipeline', 'stage'))
+STAGE_ERRORS = REGISTRY.counter(
+    'anpr_stage_errors_total', 'Exceptions raised by recognition pipeline stages', ('pipeline', 'stage'))
+OCR_CALLS = REGISTRY.counter(
+    'anpr_ocr_calls_total', 'OCR engine invocations', ('backend',))
+OCR_LATENCY = REGISTRY.histogram(
+    'anpr_ocr_call_duration_seconds', 'Duration of a single OCR engine invocation', ('backend',))
+OCR_CALLS_PER_RUN = REGISTRY.histogram(
+    'anpr_ocr_calls_per_image', 'OCR invocations needed to process one image', ('pipeline',),
+    buckets=(0, 1, 2, 3, 4, 6, 8, 12, 16, 24, 32, 64))
+RESULT_CONFIDENCE = REGISTRY.histogram(
+    'anpr_result_confidence', 'Confidence of the returned recognition results', ('app',),
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 1.0))
+CACHE_EVENTS = REGISTRY.counter(
+    'anpr_cache_events_total', 'Result cache hits, misses, coalesced requests, evictions and expirations',
+    ('cache', 'event'))
+CACHE_ENTRIES = REGISTRY.gauge(
+    'anpr_cache_entries', 'Results held by the result cache', ('cache',))
+QUEUE_DEPTH = REGISTRY.gauge(
+    'anpr_queue_depth', 'Recognition jobs waiting for a worker')
+QUEUE_IN_FLIGHT = REGISTRY.gauge(
+    'anpr_queue_in_flight', 'Recognition jobs queued or running')
+
+# OCR invocations of the image being processed in this context (see track_ocr_calls);
+# OCR threads of one image share the counter through copies of the context
+_ocr_calls = ContextVar('anpr_ocr_calls', default=None)
+_ocr_calls_lock = threading.Lock()
+
+
+@contextmanager
+def track_ocr_calls():
+    """
+    Count the OCR invocations made inside a with-block.
+
+    Yields:
+        list: One element list holding the number of calls so far
+    """
+    counter = [0]
+    token = _ocr_calls.set(counter)
+    try:
+        yield counter
+    finally:
+        _ocr_calls.reset(token)
+
+
+def record_ocr_call(backend: str, seconds: float) -> None:
+    """
+    Record one OCR engine invocation.
+
+    Args:
+        backend (str): OCR backend name
+        seconds (float): Duration of the call
+    """
+    OCR_CALLS.inc(backend=backend)
+    OCR_LATENCY.observe(seconds, backend=backend)
+    counter = _ocr_calls.get()
+    if counter is not None:
+        with _ocr_calls_lock:
+            counter[0] += 1
+
+
+def observe_cache(cache, name: str = 'recognition') -> None:
+    """
+    Export the statistics of a RecognitionCache.
+
+    Args:
+        cache (RecognitionCache): Cache to read when metrics are rendered
+        name (str): Value of the 'cache' label
+    """
+    for event in ('hits', 'misses', 'coalesced', 'evictions', 'expirations'):
+        CACHE_EVENTS.set_function(lambda attr=event: getattr(cache, attr), cache=name, event=event)
+    CACHE_ENTRIES.set_function(lambda: cache.stats()['entries'], cache=name)
+
+
+def instrument_flask(app, app_name: str) -> None:
+    """
+    Record request counts, latencies and in-flight requests of a Flask app.
+
+    Requests are labelled by their URL rule rather than the raw path so
+    that the number of label sets stays bounded.
+
+    Args:
+        app (flask.Flask): Application to instrument
+        app_name (str): Value of the 'app' label
+    """
+    from flask import g, request
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_start = time.perf_counter()
+        HTTP_IN_FLIGHT.inc(app=app_name)
+
+    @app.teardown_request
+    def _finish_request(error=None):
+        if 'metrics_start' in g:
+            HTTP_IN_FLIGHT.dec(app=app_name)
+
+    @app.after_request
+    def _record_request(response):
+        if 'metrics_start' in g:
+            endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            HTTP_REQUESTS.inc(app=app_name, endpoint=endpoint, method=request.method,
+                              status=str(response.status_code))
+            HTTP_LATENCY.observe(time.perf_counter() - g.metrics_start, app=app_name, endpoint=endpoint)
+        return response
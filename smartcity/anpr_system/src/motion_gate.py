@@ -0,0 +1,110 @@
+import cv2
+import numpy as np
+from typing import Optional, Tuple
+
+
+class MotionGate:
+    """
+    Cheap pre-stage that decides whether a frame is worth running plate detection on.
+
+    Frames are downscaled to a small grayscale thumbnail and compared with a
+    running-average background (or a MOG2 background model). Only frames in
+    which a significant fraction of the lane changed are passed on. After motion
+    stops the gate stays open for a few frames, so that a car coming to rest at
+    the barrier is still read.
+    """
+
+    def __init__(self, width: int = 160, roi: Optional[Tuple[float, float, float, float]] = None,
+                 pixel_threshold: int = 25, min_changed_fraction: float = 0.01,
+                 learning_rate: float = 0.05, hold_frames: int = 5, method: str = 'diff'):
+        """
+        Initialize the motion gate.
+
+        Args:
+            width (int): Width of the thumbnail the comparison runs on
+            roi (Optional[Tuple[float, float, float, float]]): Lane region as
+                (x, y, w, h) fractions of the frame; whole frame if None
+            pixel_threshold (int): Grey level change that counts as a changed pixel
+            min_changed_fraction (float): Fraction of changed pixels that counts as motion
+            learning_rate (float): How fast the background adapts to the scene
+            hold_frames (int): Frames passed on after motion stops
+            method (str): 'diff' (running average) or 'mog2' (background subtractor)
+        """
+        self.width = width
+        self.roi = roi
+        self.pixel_threshold = pixel_threshold
+        self.min_changed_fraction = min_changed_fraction
+        self.learning_rate = learning_rate
+        self.hold_frames = hold_frames
+        self.method = method
+
+        self.frames_checked = 0
+        self.frames_passed = 0
+        self.last_changed_fraction = 0.0
+
+        self._background = None
+        self._hold = 0
+        self._subtractor = (cv2.createBackgroundSubtractorMOG2(detectShadows=False)
+                            if method == 'mog2' else None)
+
+    def _thumbnail(self, frame: np.ndarray) -> np.ndarray:
+        """Crop the lane region and reduce the frame to a small blurred grayscale image."""
+        h, w = frame.shape[:2]
+        if self.roi is not None:
+            rx, ry, rw, rh = self.roi
+            frame = frame[int(ry * h):int((ry + rh) * h), int(rx * w):int((rx + rw) * w)]
+            h, w = frame.shape[:2]
+
+        height = max(1, int(round(h * self.width / float(w))))
+        small = cv2.resize(frame, (self.width, height), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (5, 5), 0)
+
+    def _changed_fraction(self, small: np.ndarray) -> float:
+        """Fraction of thumbnail pixels that differ from the background model."""
+        if self._subtractor is not None:
+            mask = self._subtractor.apply(small, learningRate=self.learning_rate)
+            return np.count_nonzero(mask) / float(mask.size)
+
+        if self._background is None:
+            self._background = small.astype(np.float32)
+            # Nothing to compare the first frame with; let it through
+            return 1.0
+
+        diff = cv2.absdiff(small, cv2.convertScaleAbs(self._background))
+        cv2.accumulateWeighted(small, self._background, self.learning_rate)
+        return np.count_nonzero(diff > self.pixel_threshold) / float(diff.size)
+
+    def check(self, frame: np.ndarray) -> bool:
+        """
+        Update the background model with a frame and decide whether to process it.
+
+        Args:
+            frame (np.ndarray): Full resolution BGR frame
+
+        Returns:
+            bool: True if the frame shows motion (or follows it closely)
+        """
+        self.frames_checked += 1
+        self.last_changed_fraction = self._changed_fraction(self._thumbnail(frame))
+
+        if self.last_changed_fraction >= self.min_changed_fraction:
+            self._hold = self.hold_frames
+            active = True
+        elif self._hold > 0:
+            self._hold -= 1
+            active = True
+        else:
+            active = False
+
+        if active:
+            self.frames_passed += 1
+        return active
+
+    def reset(self) -> None:
+        """Forget the background model, e.g. after the camera moved."""
+        self._background = None
+        self._hold = 0
+        if self._subtractor is not None:
+            self._subtractor = cv2.createBackgroundSubtractorMOG2(detectShadows=False)
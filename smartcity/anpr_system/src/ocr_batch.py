@@ -0,0 +1,125 @@
+import cv2
+import numpy as np
+from typing import List, Tuple
+
+# Words recognized for one crop: (text, confidence, left offset within the page)
+CropWords = List[Tuple[str, float, int]]
+
+BATCH_OCR_CONFIG = '--psm 6 -l eng --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
+
+
+def normalize_crop(crop: np.ndarray, height: int = 48) -> np.ndarray:
+    """
+    Convert a plate crop to grayscale and scale it to a fixed height.
+
+    Args:
+        crop (np.ndarray): Plate crop (BGR or grayscale)
+        height (int): Target height in pixels
+
+    Returns:
+        np.ndarray: Grayscale crop of the requested height
+    """
+    if crop.ndim == 3:
+        crop = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+
+    h, w = crop.shape[:2]
+    scale = height / float(h)
+    width = max(1, int(round(w * scale)))
+    interpolation = cv2.INTER_CUBIC if scale > 1 else cv2.INTER_AREA
+    return cv2.resize(crop, (width, height), interpolation=interpolation)
+
+
+def tile_crops(crops: List[np.ndarray], height: int = 48, gap: int = 32,
+               margin: int = 16) -> Tuple[np.ndarray, List[Tuple[int, int]]]:
+    """
+    Stack normalized crops vertically on one white page.
+
+    Each crop becomes its own text line; the blank gap between lines
+    separates them so that tesseract does not merge neighbouring crops.
+
+    Args:
+        crops (List[np.ndarray]): Plate crops, dark text on a light background
+        height (int): Height every crop is scaled to
+        gap (int): Blank rows between two crops
+        margin (int): Blank border around the page
+
+    Returns:
+        Tuple[np.ndarray, List[Tuple[int, int]]]:
+            - Composite grayscale page
+            - (top, bottom) row span of each crop within the page
+    """
+    normalized = [normalize_crop(crop, height) for crop in crops]
+    page_width = max(crop.shape[1] for crop in normalized) + 2 * margin
+    page_height = len(normalized) * height + (len(normalized) - 1) * gap + 2 * margin
+
+    page = np.full((page_height, page_width), 255, dtype=np.uint8)
+    spans = []
+
+    y = margin
+    for crop in normalized:
+        page[y:y + height, margin:margin + crop.shape[1]] = crop
+        spans.append((y, y + height))
+        y += height + gap
+
+    return page, spans
+
+
+def demultiplex(ocr_data: dict, spans: List[Tuple[int, int]], gap: int = 32) -> List[CropWords]:
+    """
+    Assign the words of a batched OCR pass back to their source crops.
+
+    A word belongs to the crop whose row span (extended by half the gap
+    on each side) contains the vertical centre of its bounding box.
+
+    Args:
+        ocr_data (dict): OCR engine image_to_data output for the page
+        spans (List[Tuple[int, int]]): Row spans returned by tile_crops
+        gap (int): Gap used when tiling
+
+    Returns:
+        List[CropWords]: Words per crop, ordered left to right
+    """
+    results = [[] for _ in spans]
+    if not ocr_data:
+        return results
+
+    tops = np.array([top for top, _ in spans]) - gap // 2
+    bottoms = np.array([bottom for _, bottom in spans]) + gap // 2
+
+    for i, text in enumerate(ocr_data['text']):
+        conf = float(ocr_data['conf'][i])
+        if conf <= 0 or not text or not text.strip():
+            continue
+
+        centre = ocr_data['top'][i] + ocr_data['height'][i] / 2.0
+        matches = np.flatnonzero((tops <= centre) & (centre < bottoms))
+        if len(matches):
+            results[matches[0]].append((text.strip(), conf, ocr_data['left'][i]))
+
+    for words in results:
+        words.sort(key=lambda word: word[2])
+
+    return results
+
+
+def batch_ocr(engine, crops: List[np.ndarray], config: str = BATCH_OCR_CONFIG,
+              height: int = 48, gap: int = 32) -> List[CropWords]:
+    """
+    Recognize many plate crops with a single OCR pass.
+
+    Args:
+        engine: OCR engine or engine pool
+        crops (List[np.ndarray]): Plate crops to recognize
+        config (str): Tesseract config for the composite page
+        height (int): Height every crop is scaled to
+        gap (int): Blank rows between crops
+
+    Returns:
+        List[CropWords]: Words recognized for each crop, in input order
+    """
+    if not crops:
+        return []
+
+    page, spans = tile_crops(crops, height=height, gap=gap)
+    ocr_data = engine.image_to_data(page, config=config)
+    return demultiplex(ocr_data, spans, gap=gap)
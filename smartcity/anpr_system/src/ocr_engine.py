@@ -0,0 +1,435 @@
+import os
+import queue
+import shlex
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from anpr_logging import get_logger
+from metrics import record_ocr_call
+
+# tesserocr binds libtesseract directly; it is optional and pytesseract is used without it
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+log = get_logger('ocr_engine')
+
+
+def parse_tesseract_config(config: str) -> Tuple[str, int, int, Dict[str, str]]:
+    """
+    Split a tesseract command line config into its components.
+
+    Args:
+        config (str): Config such as '--psm 7 -l eng --oem 3 -c key=value'
+
+    Returns:
+        Tuple[str, int, int, Dict[str, str]]: (language, oem, psm, variables)
+    """
+    lang, oem, psm = 'eng', 3, 3
+    variables = {}
+
+    tokens = shlex.split(config or '')
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        value = tokens[i + 1] if i + 1 < len(tokens) else ''
+
+        if token == '--psm':
+            psm = int(value)
+        elif token == '--oem':
+            oem = int(value)
+        elif token == '-l':
+            lang = value
+        elif token == '-c' and '=' in value:
+            key, _, val = value.partition('=')
+            variables[key] = val
+        else:
+            i += 1
+            continue
+        i += 2
+
+    return lang, oem, psm, variables
+
+
+# Columns of tesseract's TSV output; the header row is written by the TSV
+# renderer of the command line tool, TessBaseAPI::GetTSVText() omits it
+TSV_COLUMNS = ['level', 'page_num', 'block_num', 'par_num', 'line_num', 'word_num',
+               'left', 'top', 'width', 'height', 'conf', 'text']
+
+
+def tsv_to_dict(tsv: str, header: Optional[List[str]] = None) -> Dict[str, List[Any]]:
+    """
+    Convert tesseract TSV output into the dictionary layout of
+    pytesseract.image_to_data(..., output_type=Output.DICT).
+
+    Args:
+        tsv (str): TSV text produced by tesseract
+        header (Optional[List[str]]): Column names when the text has no header
+            row (GetTSVText output); by default the first row is the header
+
+    Returns:
+        Dict[str, List[Any]]: Column name to list of values
+    """
+    rows = [row.split('\t') for row in tsv.strip('\n').split('\n') if row.strip()]
+    if header is None:
+        if len(rows) < 2:
+            return {}
+        header = rows.pop(0)
+    elif not rows:
+        return {head: [] for head in header}
+
+    result = {head: [] for head in header}
+    text_idx = len(header) - 1
+
+    for row in rows:
+        # The last cell is missing when the recognized text is empty
+        row = row + [''] * (len(header) - len(row))
+        for i, head in enumerate(header):
+            if i == text_idx:
+                result[head].append(row[i])
+                continue
+            try:
+                result[head].append(int(float(row[i])))
+            except ValueError:
+                result[head].append(row[i])
+
+    return result
+
+
+def words_to_choices(ocr_data: Dict[str, List[Any]], min_confidence: float = 0) -> List[List[Tuple[str, float]]]:
+    """
+    Build a single-choice character lattice from word level OCR output.
+    
+    Every character of a word gets the word's confidence as its only choice.
+    
+    Args:
+        ocr_data (Dict[str, List[Any]]): image_to_data output
+        min_confidence (float): Words at or below this confidence are left out
+    
+    Returns:
+        List[List[Tuple[str, float]]]: [(character, confidence)] per character, in reading order
+    """
+    lattice = []
+    for text, conf in zip(ocr_data.get('text', []), ocr_data.get('conf', [])):
+        if float(conf) > min_confidence and text and text.strip():
+            lattice.extend([(ch, float(conf))] for ch in text.strip())
+    return lattice
+
+
+class OCREngine:
+    """
+    Interface shared by all OCR backends.
+
+    Results follow the layout of pytesseract so that callers can switch
+    backends without changing how they read the output.
+    """
+
+    name = 'base'
+
+    def __init__(self):
+        """Initialize the invocation counter."""
+        self.calls = 0
+
+    def image_to_data(self, image, config: str = '') -> Dict[str, List[Any]]:
+        """
+        Run OCR and return word level boxes and confidences.
+
+        Args:
+            image (np.ndarray | PIL.Image.Image): Image to recognize
+            config (str): Tesseract command line config
+
+        Returns:
+            Dict[str, List[Any]]: Same layout as pytesseract Output.DICT
+        """
+        raise NotImplementedError
+
+    def image_to_string(self, image, config: str = '') -> str:
+        """
+        Run OCR and return the recognized text.
+
+        Args:
+            image (np.ndarray | PIL.Image.Image): Image to recognize
+            config (str): Tesseract command line config
+
+        Returns:
+            str: Recognized text
+        """
+        raise NotImplementedError
+    
+    def image_to_choices(self, image, config: str = '') -> List[List[Tuple[str, float]]]:
+        """
+        Run OCR and return the alternatives considered for every character.
+        
+        Backends without symbol level results return one choice per
+        character, carrying the confidence of its word.
+        
+        Args:
+            image (np.ndarray | PIL.Image.Image): Image to recognize
+            config (str): Tesseract command line config
+        
+        Returns:
+            List[List[Tuple[str, float]]]: Per character, (character, confidence 0-100)
+                alternatives with the top choice first
+        """
+        return words_to_choices(self.image_to_data(image, config=config))
+    
+    def close(self) -> None:
+        """Release resources held by the engine."""
+        pass
+
+    def _record_call(self, start: float) -> None:
+        """Count an invocation that started at `start` (time.perf_counter) and export its duration."""
+        self.calls += 1
+        record_ocr_call(self.name, time.perf_counter() - start)
+
+
+class PytesseractEngine(OCREngine):
+    """
+    Fallback backend that runs the tesseract executable through pytesseract.
+
+    Every call starts a new process and reloads the language model.
+    """
+
+    name = 'pytesseract'
+
+    def __init__(self):
+        """Import pytesseract lazily so other backends do not require it."""
+        super().__init__()
+        import pytesseract
+        self._pytesseract = pytesseract
+
+    def image_to_data(self, image, config: str = '') -> Dict[str, List[Any]]:
+        """Run pytesseract.image_to_data with DICT output."""
+        start = time.perf_counter()
+        try:
+            return self._pytesseract.image_to_data(
+                image, config=config, output_type=self._pytesseract.Output.DICT
+            )
+        finally:
+            self._record_call(start)
+
+    def image_to_string(self, image, config: str = '') -> str:
+        """Run pytesseract.image_to_string."""
+        start = time.perf_counter()
+        try:
+            return self._pytesseract.image_to_string(image, config=config)
+        finally:
+            self._record_call(start)
+
+
+class TesserocrEngine(OCREngine):
+    """
+    In-process backend that keeps libtesseract and its traineddata loaded.
+
+    One tesseract API handle is kept per (language, OEM) pair. Page
+    segmentation mode and variables are applied per call and restored
+    afterwards, so configs do not leak into each other. An instance is not
+    thread-safe; use OCREnginePool for concurrent callers.
+    """
+
+    name = 'tesserocr'
+
+    def __init__(self, tessdata_path: Optional[str] = None):
+        """
+        Initialize the engine.
+
+        Args:
+            tessdata_path (Optional[str]): Directory containing traineddata files
+        """
+        if tesserocr is None:
+            raise ImportError("tesserocr is not installed")
+        super().__init__()
+        self.tessdata_path = tessdata_path
+        self._apis = {}
+
+    def _get_api(self, lang: str, oem: int):
+        """Return the cached API handle for a language and OEM, creating it once."""
+        key = (lang, oem)
+        if key not in self._apis:
+            kwargs = {'lang': lang, 'oem': tesserocr.OEM(oem)}
+            if self.tessdata_path:
+                kwargs['path'] = self.tessdata_path
+            self._apis[key] = tesserocr.PyTessBaseAPI(**kwargs)
+        return self._apis[key]
+
+    @staticmethod
+    def _to_pil(image) -> Image.Image:
+        """Convert an ndarray (grayscale or BGR) into a PIL image without touching disk."""
+        if isinstance(image, Image.Image):
+            return image
+        if image.ndim == 3:
+            image = np.ascontiguousarray(image[:, :, ::-1])
+        return Image.fromarray(image)
+
+    def _recognize(self, image, config: str, read: Callable):
+        """Configure the API for one call, recognize the image and read the result."""
+        lang, oem, psm, variables = parse_tesseract_config(config)
+        api = self._get_api(lang, oem)
+
+        previous = {key: api.GetVariableAsString(key) for key in variables}
+        try:
+            api.SetPageSegMode(tesserocr.PSM(psm))
+            for key, value in variables.items():
+                api.SetVariable(key, value)
+
+            api.SetImage(self._to_pil(image))
+            start = time.perf_counter()
+            try:
+                return read(api)
+            finally:
+                self._record_call(start)
+        finally:
+            for key, value in previous.items():
+                api.SetVariable(key, value if value is not None else '')
+            api.Clear()
+
+    def image_to_data(self, image, config: str = '') -> Dict[str, List[Any]]:
+        """Recognize the image and return its TSV output as a dictionary."""
+        return self._recognize(image, config, lambda api: tsv_to_dict(api.GetTSVText(0), TSV_COLUMNS))
+
+    def image_to_string(self, image, config: str = '') -> str:
+        """Recognize the image and return its text."""
+        return self._recognize(image, config, lambda api: api.GetUTF8Text())
+    
+    def image_to_choices(self, image, config: str = '') -> List[List[Tuple[str, float]]]:
+        """Recognize the image and read every symbol's alternatives from the choice iterator."""
+        def read(api):
+            api.Recognize()
+            level = tesserocr.RIL.SYMBOL
+            lattice = []
+            for symbol in tesserocr.iterate_level(api.GetIterator(), level):
+                text = symbol.GetUTF8Text(level)
+                if not text:
+                    continue
+                choices = [(text, float(symbol.Confidence(level)))]
+                for choice in symbol.GetChoiceIterator():
+                    alternative = choice.GetUTF8Text()
+                    if alternative and alternative != text:
+                        choices.append((alternative, float(choice.Confidence())))
+                lattice.append(choices)
+            return lattice
+        
+        # The LSTM engine only keeps per-symbol alternatives when asked to
+        return self._recognize(image, f"{config} -c lstm_choice_mode=2 -c save_blob_choices=1", read)
+
+    def close(self) -> None:
+        """End all API handles."""
+        for api in self._apis.values():
+            api.End()
+        self._apis.clear()
+
+
+class OCREnginePool:
+    """
+    Fixed size pool of OCR engines shared between threads.
+
+    The pool exposes the same image_to_data, image_to_string and
+    image_to_choices methods as a single engine and checks an engine out for the duration of each call.
+    """
+
+    def __init__(self, factory: Callable[[], OCREngine], size: int = 2):
+        """
+        Create the pool and its engines.
+
+        Args:
+            factory (Callable[[], OCREngine]): Function creating a new engine
+            size (int): Number of engines in the pool
+        """
+        self.size = max(1, size)
+        self._engines = [factory() for _ in range(self.size)]
+        self._available = queue.Queue()
+        for engine in self._engines:
+            self._available.put(engine)
+        self.name = self._engines[0].name
+
+    @property
+    def calls(self) -> int:
+        """Total number of OCR invocations across all engines."""
+        return sum(engine.calls for engine in self._engines)
+
+    @contextmanager
+    def acquire(self):
+        """Check out an engine, blocking until one is free."""
+        engine = self._available.get()
+        try:
+            yield engine
+        finally:
+            self._available.put(engine)
+
+    def image_to_data(self, image, config: str = '') -> Dict[str, List[Any]]:
+        """Run image_to_data on a pooled engine."""
+        with self.acquire() as engine:
+            return engine.image_to_data(image, config=config)
+
+    def image_to_string(self, image, config: str = '') -> str:
+        """Run image_to_string on a pooled engine."""
+        with self.acquire() as engine:
+            return engine.image_to_string(image, config=config)
+    
+    def image_to_choices(self, image, config: str = '') -> List[List[Tuple[str, float]]]:
+        """Run image_to_choices on a pooled engine."""
+        with self.acquire() as engine:
+            return engine.image_to_choices(image, config=config)
+
+    def close(self) -> None:
+        """Close every engine in the pool."""
+        for engine in self._engines:
+            engine.close()
+
+
+def create_engine(backend: Optional[str] = None) -> OCREngine:
+    """
+    Create a single OCR engine.
+
+    Args:
+        backend (Optional[str]): 'tesserocr', 'pytesseract' or None to
+            prefer tesserocr and fall back to pytesseract
+
+    Returns:
+        OCREngine: New engine instance
+    """
+    backend = backend or os.environ.get('ANPR_OCR_BACKEND')
+
+    if backend == 'pytesseract':
+        return PytesseractEngine()
+    if backend == 'tesserocr':
+        return TesserocrEngine(os.environ.get('TESSDATA_PREFIX'))
+
+    if tesserocr is not None:
+        try:
+            return TesserocrEngine(os.environ.get('TESSDATA_PREFIX'))
+        except RuntimeError as e:
+            log.warning("Could not start tesserocr, falling back to pytesseract: %s", e)
+    return PytesseractEngine()
+
+
+def ocr_threads_from_env() -> int:
+    """Threads running the OCR passes of one image concurrently (ANPR_OCR_THREADS, 1 = sequential)."""
+    return max(1, int(os.environ.get('ANPR_OCR_THREADS', 1)))
+
+
+_default_engine = None
+_default_engine_lock = threading.Lock()
+
+
+def get_default_engine() -> OCREnginePool:
+    """
+    Return the process wide OCR engine pool, creating it on first use.
+
+    The pool size is taken from ANPR_OCR_POOL_SIZE (default: CPU count).
+
+    Returns:
+        OCREnginePool: Shared engine pool
+    """
+    global _default_engine
+    with _default_engine_lock:
+        if _default_engine is None:
+            size = int(os.environ.get('ANPR_OCR_POOL_SIZE', os.cpu_count() or 1))
+            _default_engine = OCREnginePool(create_engine, size=size)
+        return _default_engine
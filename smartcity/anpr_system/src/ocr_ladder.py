@@ -0,0 +1,201 @@
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: saves from different processes are not serialized
+    fcntl = None
+
+from anpr_logging import get_logger
+
+log = get_logger('ocr_ladder')
+
+
+@contextmanager
+def _file_lock(path: str):
+    """Hold an exclusive lock on a lock file, across processes where supported."""
+    with open(path, 'a') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class ConfigLadder:
+    """
+    Ordered list of OCR configs that learns which config wins most often.
+
+    Win counts are kept per ladder name and can be persisted to a JSON
+    file, so every deployment converges on the config that suits its
+    cameras and tries that one first. Several processes may share the
+    file: each adds the wins it recorded since its last save to the
+    stored counts, under a file lock, and picks up the others' wins.
+    """
+
+    def __init__(self, name: str, configs: List[str], stats_path: Optional[str] = None,
+                 save_every: int = 50):
+        """
+        Initialize the ladder and load persisted win counts.
+
+        Args:
+            name (str): Ladder name used as key in the stats file
+            configs (List[str]): Configs in their default order
+            stats_path (Optional[str]): JSON file for win counts; defaults to
+                ANPR_LADDER_STATS, and counts stay in memory if neither is set
+            save_every (int): Number of recorded wins between two saves
+        """
+        self.name = name
+        self.configs = list(configs)
+        self.stats_path = stats_path or os.environ.get('ANPR_LADDER_STATS')
+        self.save_every = save_every
+        self.wins = {config: 0 for config in self.configs}
+        # Wins recorded by this process and not saved yet
+        self._unsaved = {config: 0 for config in self.configs}
+        self._lock = threading.Lock()
+        # Serializes saves of this ladder, so a delta is never added twice
+        self._save_lock = threading.Lock()
+        self._load()
+
+    def _read_stats(self) -> Dict[str, Dict[str, int]]:
+        """Read the stats file of all ladders ({} if it does not exist yet)."""
+        if not os.path.exists(self.stats_path):
+            return {}
+        with open(self.stats_path, 'r') as f:
+            return json.load(f)
+
+    def _apply(self, stored: Dict[str, int]) -> None:
+        """Set the win counts to the stored ones plus the wins not saved yet (lock held)."""
+        for config in self.configs:
+            self.wins[config] = int(stored.get(config, 0)) + self._unsaved[config]
+
+    def _load(self) -> None:
+        """Read win counts for this ladder from the stats file, if present."""
+        if not self.stats_path:
+            return
+
+        try:
+            stored = self._read_stats().get(self.name, {})
+        except (OSError, ValueError) as e:
+            log.warning("Could not read OCR ladder stats %s: %s", self.stats_path, e)
+            return
+
+        with self._lock:
+            self._apply(stored)
+
+    def save(self) -> None:
+        """Add the wins recorded since the last save to the counts in the stats file."""
+        if not self.stats_path:
+            return
+
+        with self._save_lock:
+            self._save_delta()
+
+    def _save_delta(self) -> None:
+        """Merge the unsaved wins into the stats file (save lock held)."""
+        with self._lock:
+            delta = dict(self._unsaved)
+
+        try:
+            # Read, merge and replace under one lock so concurrent saves cannot drop wins
+            with _file_lock(f"{self.stats_path}.lock"):
+                stats = self._read_stats()
+                stored = stats.setdefault(self.name, {})
+                for config, wins in delta.items():
+                    if wins:
+                        stored[config] = int(stored.get(config, 0)) + wins
+
+                # A temporary file of our own, in the same directory so the replace is atomic
+                fd, tmp_path = tempfile.mkstemp(prefix='.ladder-', suffix='.tmp',
+                                                dir=os.path.dirname(os.path.abspath(self.stats_path)))
+                try:
+                    with os.fdopen(fd, 'w') as f:
+                        json.dump(stats, f, indent=2)
+                    os.replace(tmp_path, self.stats_path)
+                except BaseException:
+                    os.unlink(tmp_path)
+                    raise
+        except (OSError, ValueError) as e:
+            # The wins stay unsaved and are added by the next save
+            log.warning("Could not save OCR ladder stats %s: %s", self.stats_path, e)
+            return
+
+        with self._lock:
+            for config, wins in delta.items():
+                self._unsaved[config] -= wins
+            self._apply(stored)
+
+    def ordered(self) -> List[str]:
+        """
+        Return the configs ordered by win count, most successful first.
+
+        Returns:
+            List[str]: Configs; ties keep their default order
+        """
+        with self._lock:
+            return sorted(self.configs, key=lambda config: -self.wins[config])
+
+    def record_win(self, config: str) -> None:
+        """
+        Record that a config produced the accepted result.
+
+        Args:
+            config (str): Winning config
+        """
+        with self._lock:
+            if config not in self.wins:
+                return
+            self.wins[config] += 1
+            self._unsaved[config] += 1
+            should_save = sum(self._unsaved.values()) >= self.save_every
+
+        if should_save:
+            self.save()
+
+    def run(self, attempt: Callable[[str], Tuple[object, float]],
+            accept: Callable[[object, float], bool]) -> Tuple[object, float, Optional[str], int]:
+        """
+        Try configs in learned order until one is accepted.
+
+        Args:
+            attempt (Callable): Runs OCR with a config and returns (result, score);
+                result is None when the config produced nothing usable
+            accept (Callable): Decides whether a (result, score) is good enough
+                to stop trying further configs
+
+        Returns:
+            Tuple[object, float, Optional[str], int]:
+                (accepted result, or the best scoring one if none was accepted,
+                its score, config that produced it, configs tried)
+        """
+        best_result, best_score, best_config = None, float('-inf'), None
+        tried = 0
+        accepted = False
+
+        for config in self.ordered():
+            tried += 1
+            result, score = attempt(config)
+            if result is None:
+                continue
+
+            # An accepted result wins even over a higher scoring rejected one
+            if accept(result, score):
+                best_result, best_score, best_config = result, score, config
+                accepted = True
+                break
+            if score > best_score:
+                best_result, best_score, best_config = result, score, config
+
+        # Only an accepted result counts as a win; the best of a failed search
+        # says nothing about which config to try first
+        if accepted:
+            self.record_win(best_config)
+
+        return best_result, best_score, best_config, tried
@@ -0,0 +1,282 @@
+import importlib
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+from anpr_logging import configure_logging
+from metrics import OCR_CALLS_PER_RUN, PIPELINE_RUNS, STAGE_ERRORS, STAGE_LATENCY, track_ocr_calls
+
+# Kinds of stage a recognition pipeline is composed of, in processing order
+STAGE_KINDS = ('decode', 'preprocess', 'propose', 'rectify', 'ocr', 'grammar', 'country')
+
+# Named pipeline configurations: name -> (module, builder function).
+# Modules are imported on first use so that every variant can keep its
+# stages next to the code it wraps without circular imports.
+PIPELINE_BUILDERS = {
+    'uk': ('uk_plate_recognizer', 'build_uk_pipeline'),
+    'contour': ('plate_recognizer', 'build_contour_pipeline'),
+    'simple': ('simple_detector', 'build_simple_pipeline'),
+    'direct': ('direct_ocr', 'build_direct_pipeline'),
+    'api': ('api_cascade', 'build_api_pipeline')
+}
+
+
+class PipelineContext:
+    """
+    State of one image travelling through a pipeline.
+
+    Stages read what earlier stages produced and add their own output.
+    Setting `done` stops the pipeline after the current stage.
+    """
+
+    def __init__(self, source: Any, **meta):
+        """
+        Initialize the context.
+
+        Args:
+            source: Image source (path, encoded bytes or decoded BGR array)
+            **meta: Extra request information for the stages (e.g. filename)
+        """
+        self.source = source
+        self.meta = meta
+        self.image = None
+        self.features = None
+        # Candidate plate boxes (x, y, w, h) and the crops taken from them
+        self.proposals = []
+        self.crops = []
+        # OCR output per crop: raw text for most configurations, the already
+        # formatted plate number for 'uk', whose reader decodes as it reads
+        self.texts = []
+        # Recognized plates: dicts with plate_number, country_identifier, bbox, region
+        self.plates = []
+        # Intermediate images by step name, for display and debugging
+        self.images = {}
+        self.done = False
+        self.timings = {}
+        self.counters = Counter()
+        self._stage = None
+
+    def count(self, name: str, amount: int = 1) -> None:
+        """
+        Increment a counter of the running stage.
+
+        Args:
+            name (str): Counter name
+            amount (int): Increment
+        """
+        self.counters[(self._stage, name)] += amount
+
+    def results(self) -> Dict[str, dict]:
+        """
+        Recognized plates in the recognizer result format.
+
+        Returns:
+            Dict[str, dict]: Plates keyed by "plate_<index>"
+        """
+        return {f"plate_{idx}": plate for idx, plate in enumerate(self.plates)}
+
+
+class Stage:
+    """A named step of a pipeline."""
+
+    def __init__(self, name: str, kind: str, func: Callable[[PipelineContext], None]):
+        """
+        Initialize the stage.
+
+        Args:
+            name (str): Stage name, unique within its pipeline
+            kind (str): One of STAGE_KINDS
+            func (Callable[[PipelineContext], None]): Processes the context in place
+        """
+        if kind not in STAGE_KINDS:
+            raise ValueError(f"Unknown stage kind: {kind}")
+        self.name = name
+        self.kind = kind
+        self.func = func
+
+    def __call__(self, ctx: PipelineContext) -> None:
+        self.func(ctx)
+
+
+class StageStats:
+    """Accumulated wall-clock time and counters of one stage."""
+
+    def __init__(self, kind: str):
+        """Initialize empty statistics for a stage of the given kind."""
+        self.kind = kind
+        self.calls = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.counters = Counter()
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Summarize the statistics."""
+        return {
+            'kind': self.kind,
+            'calls': self.calls,
+            'errors': self.errors,
+            'total_seconds': round(self.total_seconds, 6),
+            'mean_ms': round(1000.0 * self.total_seconds / self.calls, 3) if self.calls else 0.0,
+            'max_ms': round(1000.0 * self.max_seconds, 3),
+            'counters': dict(self.counters)
+        }
+
+
+class Pipeline:
+    """
+    Runs an image through a sequence of stages and measures each of them.
+
+    Every stage is timed with a wall-clock timer; its counters and timings
+    are accumulated across runs so that stats() shows where time goes, and
+    are exported as metrics together with the OCR invocations of each run.
+    """
+
+    def __init__(self, name: str, stages: List[Stage]):
+        """
+        Initialize the pipeline.
+
+        Args:
+            name (str): Configuration name
+            stages (List[Stage]): Stages in processing order
+        """
+        self.name = name
+        self.stages = list(stages)
+        self.runs = 0
+        self._stats = {stage.name: StageStats(stage.kind) for stage in self.stages}
+        self._lock = threading.Lock()
+
+    def run(self, source: Any, **meta) -> PipelineContext:
+        """
+        Process one image.
+
+        Args:
+            source: Image source handed to the first stage
+            **meta: Extra request information for the stages
+
+        Returns:
+            PipelineContext: Final context; plates holds the recognized plates
+        """
+        ctx = PipelineContext(source, **meta)
+
+        with track_ocr_calls() as ocr_calls:
+            try:
+                for stage in self.stages:
+                    if ctx.done:
+                        break
+                    ctx._stage = stage.name
+                    start = time.perf_counter()
+                    try:
+                        stage(ctx)
+                    except Exception:
+                        with self._lock:
+                            self._stats[stage.name].errors += 1
+                        STAGE_ERRORS.inc(pipeline=self.name, stage=stage.name)
+                        raise
+                    finally:
+                        ctx.timings[stage.name] = time.perf_counter() - start
+            finally:
+                ctx._stage = None
+                self._record(ctx)
+                OCR_CALLS_PER_RUN.observe(ocr_calls[0], pipeline=self.name)
+
+        return ctx
+
+    def _record(self, ctx: PipelineContext) -> None:
+        """Add the timings and counters of a finished run to the totals."""
+        PIPELINE_RUNS.inc(pipeline=self.name)
+        with self._lock:
+            self.runs += 1
+            for name, seconds in ctx.timings.items():
+                stats = self._stats[name]
+                stats.calls += 1
+                stats.total_seconds += seconds
+                stats.max_seconds = max(stats.max_seconds, seconds)
+                STAGE_LATENCY.observe(seconds, pipeline=self.name, stage=name)
+            for (name, counter), amount in ctx.counters.items():
+                if name in self._stats:
+                    self._stats[name].counters[counter] += amount
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report per-stage timing and counters.
+
+        Returns:
+            Dict[str, Any]: Pipeline name, number of runs and statistics per stage
+        """
+        with self._lock:
+            return {
+                'pipeline': self.name,
+                'runs': self.runs,
+                'stages': {stage.name: self._stats[stage.name].as_dict() for stage in self.stages}
+            }
+
+    def reset_stats(self) -> None:
+        """Forget accumulated timings and counters."""
+        with self._lock:
+            self.runs = 0
+            self._stats = {stage.name: StageStats(stage.kind) for stage in self.stages}
+
+
+def build_pipeline(name: str, **kwargs) -> Pipeline:
+    """
+    Create a named pipeline configuration.
+
+    Args:
+        name (str): One of PIPELINE_BUILDERS
+        **kwargs: Options for the configuration's builder
+
+    Returns:
+        Pipeline: Ready to run pipeline
+    """
+    if name not in PIPELINE_BUILDERS:
+        raise ValueError(f"Unknown pipeline '{name}' (available: {', '.join(PIPELINE_BUILDERS)})")
+
+    module_name, builder_name = PIPELINE_BUILDERS[name]
+    builder = getattr(importlib.import_module(module_name), builder_name)
+    return builder(**kwargs)
+
+
+def format_stats(stats: Dict[str, Any]) -> str:
+    """
+    Render pipeline statistics as a table.
+
+    Args:
+        stats (Dict[str, Any]): Output of Pipeline.stats()
+
+    Returns:
+        str: One line per stage with calls, mean and max time and counters
+    """
+    lines = [f"Pipeline '{stats['pipeline']}' ({stats['runs']} runs)",
+             f"  {'stage':<16} {'kind':<10} {'calls':>6} {'mean ms':>10} {'max ms':>10}  counters"]
+    for name, stage in stats['stages'].items():
+        counters = ', '.join(f"{key}={value}" for key, value in sorted(stage['counters'].items()))
+        lines.append(f"  {name:<16} {stage['kind']:<10} {stage['calls']:>6} "
+                     f"{stage['mean_ms']:>10.2f} {stage['max_ms']:>10.2f}  {counters}")
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[List[str]] = None):
+    """Run a named pipeline over images and print the results and stage timings."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a recognition pipeline and show where time goes")
+    parser.add_argument("pipeline", choices=sorted(PIPELINE_BUILDERS), help="Pipeline configuration")
+    parser.add_argument("images", nargs='+', help="Image files")
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    pipeline = build_pipeline(args.pipeline)
+    for path in args.images:
+        ctx = pipeline.run(path, filename=path)
+        plates = ', '.join(f"{plate['plate_number']} ({plate['country_identifier']})"
+                           for plate in ctx.plates) or 'no plate'
+        print(f"{path}: {plates}")
+
+    print()
+    print(format_stats(pipeline.stats()))
+
+
+if __name__ == "__main__":
+    main()
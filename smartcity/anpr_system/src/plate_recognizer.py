@@ -1,11 +1,22 @@
 import cv2
 import numpy as np
-import pytesseract
 from PIL import Image
 import imutils
 import os
 import re
 from typing import Tuple, Optional
+from anpr_logging import get_logger
+from candidates import non_max_suppression, score_candidates, top_k_from_env
+from colour_proposer import propose_colour_regions, proposer_from_env
+from confidence import confidence_features, plate_confidence
+from image_features import detection_scales, detection_settings_from_env
+from image_io import load_image, describe_source
+from ocr_engine import OCREngine, get_default_engine
+from ocr_batch import batch_ocr
+from pipeline import Pipeline, PipelineContext, Stage
+from uk_grammar import decode, format_registration
+
+log = get_logger('plate_recognizer')
 
 class PlateRecognizer:
     """
@@ -13,14 +24,35 @@ class PlateRecognizer:
     This class implements the ANPR (Automatic Number Plate Recognition) functionality.
     """
     
-    def __init__(self):
+    def __init__(self, ocr_engine: Optional[OCREngine] = None, batch_ocr: bool = True,
+                 detect_max_side: Optional[int] = None, proposer: Optional[str] = None,
+                 top_k: Optional[int] = None):
         """
         Initialize the PlateRecognizer with default parameters.
+        
+        Args:
+            ocr_engine (Optional[OCREngine]): OCR backend; defaults to the shared engine pool
+            batch_ocr (bool): Recognize all candidate plates with one OCR pass first
+            detect_max_side (Optional[int]): Longest side the edge map and contour search
+                run at; plates are cut from the full resolution image
+                (default: ANPR_DETECT_MAX_SIDE or 1280, 0 = full resolution)
+            proposer (Optional[str]): 'contour' (edge map contours), 'colour' (yellow/white
+                segmentation) or 'both', colour proposals first (default: ANPR_PROPOSER or 'contour')
+            top_k (Optional[int]): Best scored candidates passed on to OCR
+                (default: ANPR_TOP_K or 2, 0 = all)
         """
         self.min_area = 500  # Minimum area for plate detection
         self.max_area = 15000  # Maximum area for plate detection
         # UK license plate pattern: two letters, two numbers, three letters
         self.uk_plate_pattern = re.compile(r'^[A-Z]{2}\d{2}[A-Z]{3}$')
+        self.ocr = ocr_engine if ocr_engine is not None else get_default_engine()
+        self.batch_ocr = batch_ocr
+        self.detect_max_side = (detect_max_side if detect_max_side is not None
+                                else detection_settings_from_env()[0])
+        self.proposer = proposer if proposer is not None else proposer_from_env()
+        self.top_k = top_k if top_k is not None else top_k_from_env()
+        # Recognition stages with per-stage timing ('contour' pipeline configuration)
+        self.pipeline = self._build_pipeline()
         
     def preprocess_image(self, image: np.ndarray) -> np.ndarray:
         """
@@ -112,7 +144,7 @@ class PlateRecognizer:
             return plate
             
         except Exception as e:
-            print(f"Error extracting plate: {str(e)}")
+            log.warning("Error extracting plate: %s", e)
             return None
     
     def enhance_plate_image(self, plate_img: np.ndarray) -> np.ndarray:
@@ -152,17 +184,9 @@ class PlateRecognizer:
             text (str): Recognized text
             
         Returns:
-            str: Formatted UK plate or original text
+            str: Formatted UK plate or the cleaned text
         """
-        # Remove all non-alphanumeric characters
-        clean_text = ''.join(c for c in text if c.isalnum()).upper()
-        
-        # Check if it matches UK pattern
-        if len(clean_text) == 7:
-            # Format as AA00 AAA
-            return f"{clean_text[:2]}{clean_text[2:4]} {clean_text[4:]}"
-        
-        return clean_text
+        return format_registration(text)
     
     def recognize_plate(self, image: np.ndarray) -> Tuple[Optional[str], Optional[np.ndarray]]:
         """
@@ -176,30 +200,123 @@ class PlateRecognizer:
                 - Recognized plate text (or None if recognition fails)
                 - Extracted plate image (or None if extraction fails)
         """
-        # Make a copy of the original image
-        original = image.copy()
+        ctx = self.pipeline.run(image)
         
-        # Preprocess the image
-        processed = self.preprocess_image(original)
+        if not ctx.plates:
+            return None, None
         
-        # Find potential plate contours
-        contours = self.find_plate_contours(processed, original)
+        plate = ctx.plates[0]
+        return plate["plate_number"], plate["region"]
+    
+    def _build_pipeline(self) -> Pipeline:
+        """
+        Compose the recognition stages of this recognizer.
         
-        if not contours:
-            return None, None
+        Returns:
+            Pipeline: The 'contour' pipeline configuration
+        """
+        return Pipeline('contour', [
+            Stage('decode', 'decode', self._decode_stage),
+            Stage('edges', 'preprocess', self._preprocess_stage),
+            Stage('contours', 'propose', self._propose_stage),
+            Stage('extract', 'rectify', self._extract_stage),
+            Stage('ocr', 'ocr', self._ocr_stage),
+            Stage('plate_format', 'grammar', self._grammar_stage)
+        ])
+    
+    def _decode_stage(self, ctx: PipelineContext) -> None:
+        """Load the input image."""
+        ctx.image = load_image(ctx.source)
+        if ctx.image is None:
+            log.warning("Error loading image: %s", describe_source(ctx.source))
+            ctx.done = True
+    
+    def _preprocess_stage(self, ctx: PipelineContext) -> None:
+        """Build the edge map used for contour search, on a downscaled copy of large images."""
+        if self.proposer == 'colour':
+            return
+        scale = detection_scales(ctx.image.shape, self.detect_max_side)[0]
+        search_image = ctx.image
+        if scale < 1.0:
+            search_image = cv2.resize(ctx.image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        ctx.meta['detect_scale'] = scale
+        ctx.images['search'] = search_image
+        ctx.images['edges'] = self.preprocess_image(search_image)
+    
+    def _propose_stage(self, ctx: PipelineContext) -> None:
+        """Find potential plate contours, keep the best of overlapping ones; stop if there are none."""
+        contours = []
+        if self.proposer in ('colour', 'both'):
+            # Colour proposals are boxes; extract_plate only needs their outline
+            for x, y, w, h in (bbox for bbox, _, _ in propose_colour_regions(ctx.image)):
+                corners = [[x, y], [x + w - 1, y], [x + w - 1, y + h - 1], [x, y + h - 1]]
+                contours.append(np.array(corners, np.int32).reshape(-1, 1, 2))
+            ctx.count('colour_regions', len(contours))
+        
+        if self.proposer in ('contour', 'both'):
+            edge_contours = self.find_plate_contours(ctx.images['edges'], ctx.images['search'])
             
-        # Try to extract and recognize plate from each contour
+            # Map contours found on the downscaled image back to full resolution
+            scale = ctx.meta['detect_scale']
+            if scale < 1.0:
+                edge_contours = [np.round(contour / scale).astype(np.int32) for contour in edge_contours]
+            contours.extend(edge_contours)
+        ctx.count('contours', len(contours))
+        
+        # Spend OCR only on the best scored candidates; nested and overlapping
+        # contours of one plate are merged into the best of them
+        boxes = [cv2.boundingRect(contour) for contour in contours]
+        scores = score_candidates(ctx.image, boxes)
+        keep = non_max_suppression(boxes, scores, max_keep=self.top_k)
+        contours = [contours[i] for i in keep]
+        ctx.count('candidates', len(contours))
+        
+        ctx.meta['contours'] = contours
+        ctx.meta['candidate_scores'] = [float(scores[i]) for i in keep]
+        ctx.proposals = [boxes[i] for i in keep]
+        
+        if not contours:
+            ctx.done = True
+    
+    def _extract_stage(self, ctx: PipelineContext) -> None:
+        """Extract and enhance the plate candidate of each contour."""
+        boxes, scores = [], []
+        for contour, bbox, score in zip(ctx.meta['contours'], ctx.proposals, ctx.meta['candidate_scores']):
+            plate_img = self.extract_plate(ctx.image, contour)
+            if plate_img is not None:
+                ctx.crops.append((plate_img, self.enhance_plate_image(plate_img)))
+                boxes.append(bbox)
+                scores.append(score)
+        ctx.proposals = boxes
+        ctx.meta['candidate_scores'] = scores
+    
+    def _ocr_stage(self, ctx: PipelineContext) -> None:
+        """Read the candidates and keep the most confident word."""
+        candidates = ctx.crops
+        
+        # Try to recognize all candidates with a single OCR pass
         best_confidence = 0
         best_text = None
-        best_plate_img = None
+        best_index = None
+        # Every word read, as (candidate index, text), to measure agreement between passes
+        words_read = []
         
-        for contour in contours:
-            plate_img = self.extract_plate(original, contour)
-            
-            if plate_img is not None:
-                # Enhance the plate image
-                enhanced = self.enhance_plate_image(plate_img)
-                
+        if self.batch_ocr and len(candidates) > 1:
+            ctx.count('batched_passes')
+            words_per_plate = batch_ocr(self.ocr, [enhanced for _, enhanced in candidates])
+            for index, words in enumerate(words_per_plate):
+                for text, conf, _ in words:
+                    words_read.append((index, text))
+                    # The composite page is read with one generic config; only a word that is a
+                    # registration stands in for the per-candidate configs (band text is not)
+                    if conf > best_confidence and decode(text) is not None:
+                        best_confidence = conf
+                        best_text = text
+                        best_index = index
+        
+        # Fall back to recognizing each candidate with multiple configurations
+        if best_text is None:
+            for index, (_, enhanced) in enumerate(candidates):
                 # Perform OCR with multiple configurations
                 configs = [
                     '--psm 7 --oem 1 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789',
@@ -212,22 +329,60 @@ class PlateRecognizer:
                     plate_pil = Image.fromarray(enhanced)
                     
                     # Get detailed OCR data
-                    ocr_data = pytesseract.image_to_data(
-                        plate_pil, config=config, output_type=pytesseract.Output.DICT
+                    ocr_data = self.ocr.image_to_data(
+                        plate_pil, config=config
                     )
+                    ctx.count('ocr_passes')
                     
                     # Process OCR results
                     for i, conf in enumerate(ocr_data['conf']):
                         if conf > 0:  # Only consider results with confidence > 0
                             text = ocr_data['text'][i]
+                            if text.strip():
+                                words_read.append((index, text))
                             if text.strip() and float(conf) > best_confidence:
                                 best_confidence = float(conf)
                                 best_text = text
-                                best_plate_img = plate_img
+                                best_index = index
                 
         if best_text:
-            # Format the recognized text as a UK plate
-            formatted_text = self.format_uk_plate(best_text)
-            return formatted_text, best_plate_img
+            ctx.texts = [best_text]
+            ctx.meta['best_index'] = best_index
+            ctx.meta['ocr_confidence'] = best_confidence
+            
+            # Share of the words read from the chosen candidate that give the same plate
+            plate_number = self.format_uk_plate(best_text)
+            candidate_words = [text for index, text in words_read if index == best_index]
+            ctx.meta['agreement'] = (sum(1 for text in candidate_words if self.format_uk_plate(text) == plate_number)
+                                     / float(len(candidate_words)))
+    
+    def _grammar_stage(self, ctx: PipelineContext) -> None:
+        """Format the recognized text as a UK plate."""
+        if not ctx.texts:
+            return
         
-        return None, None 
\ No newline at end of file
+        best_index = ctx.meta['best_index']
+        decoded = decode(ctx.texts[0])
+        features = confidence_features(ctx.meta['ocr_confidence'], decoded['cost'] if decoded else None,
+                                       ctx.meta['candidate_scores'][best_index], ctx.meta['agreement'])
+        ctx.meta['confidence_features'] = [features]
+        ctx.plates.append({
+            "plate_number": self.format_uk_plate(ctx.texts[0]),
+            "country_identifier": "UNKNOWN",
+            "confidence": plate_confidence(features),
+            "region": ctx.crops[best_index][0],
+            "bbox": ctx.proposals[best_index]
+        })
+
+
+def build_contour_pipeline(**kwargs) -> Pipeline:
+    """
+    Create the 'contour' pipeline configuration.
+    
+    Args:
+        **kwargs: PlateRecognizer options
+        
+    Returns:
+        Pipeline: Pipeline of a new recognizer
+    """
+    return PlateRecognizer(**kwargs).pipeline
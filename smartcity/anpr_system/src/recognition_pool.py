@@ -0,0 +1,292 @@
+import multiprocessing.util
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+
+from anpr_logging import configure_logging, current_request, request_context
+from metrics import REGISTRY
+
+# Recognizer owned by each worker process, created once by _init_worker
+_worker_recognizer = None
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the bounded job queue is full."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Recognition queue is full")
+        self.retry_after = retry_after
+
+
+class RecognitionError(Exception):
+    """Raised in the parent when recognition fails inside a worker process."""
+    pass
+
+
+class ImageDecodeError(ValueError):
+    """Raised when a worker cannot decode the encoded image bytes of a job."""
+    pass
+
+
+def _init_worker() -> None:
+    """Create and warm the recognizer of a worker process."""
+    global _worker_recognizer
+    configure_logging()
+    from debug_sink import debug_sink_from_env
+    from ocr_engine import OCREnginePool, create_engine, ocr_threads_from_env
+    from uk_plate_recognizer import UKPlateRecognizer
+
+    # The pool already runs one job per CPU; the shared default engine pool
+    # would load CPU count tesseract instances into every worker. Only the
+    # OCR threads of a worker need engines of their own.
+    threads = ocr_threads_from_env()
+    engine = create_engine() if threads <= 1 else OCREnginePool(create_engine, size=threads)
+    debug_sink = debug_sink_from_env()
+    # Workers end without running atexit handlers; multiprocessing finalizers do run
+    # when the pool shuts them down, so sampled images still queued are written out
+    multiprocessing.util.Finalize(None, debug_sink.close, exitpriority=10)
+    _worker_recognizer = UKPlateRecognizer(headless=True, ocr_engine=engine, debug_sink=debug_sink)
+
+    # Run the OpenCV detection path once so that lazy initialization is not paid by the first job
+    _worker_recognizer.detect_plate_regions(np.zeros((64, 256, 3), dtype=np.uint8))
+
+
+def _ping() -> int:
+    """Trivial job used to start worker processes ahead of traffic."""
+    return os.getpid()
+
+
+def _recognize(image, request: Tuple[str, bool] = ('-', False)):
+    """
+    Recognize plates in a worker process.
+
+    Args:
+        image (np.ndarray | bytes): Decoded BGR image, or encoded image
+            bytes that are decoded in the worker
+        request (Tuple[str, bool]): Correlation ID and diagnostics sampling
+            decision of the submitting request, for the worker's log records
+
+    Returns:
+        tuple: (results without region images, processing time in seconds,
+            metrics recorded in the worker since its previous job)
+
+    Raises:
+        ImageDecodeError: If the image bytes cannot be decoded
+        RecognitionError: If recognition fails
+    """
+    start = time.perf_counter()
+    try:
+        with request_context(*request):
+            results = _worker_recognizer.process_image(image)
+    except Exception as e:
+        # Some library exceptions cannot be unpickled and would break the pool
+        raise RecognitionError(f"{type(e).__name__}: {str(e)}") from None
+    if results is None:
+        raise ImageDecodeError("Could not decode image")
+
+    # Region crops are not needed by callers and are expensive to send back
+    plates = {
+        plate_id: {key: value for key, value in data.items() if key != 'region'}
+        for plate_id, data in results.items()
+    }
+    return plates, time.perf_counter() - start, REGISTRY.snapshot(reset=True)
+
+
+class RecognitionPool:
+    """
+    Process pool of warmed recognizers behind a bounded job queue.
+
+    At most workers + max_queue jobs are accepted at a time. Further
+    submissions fail immediately with QueueFullError so that callers can
+    shed load instead of piling up requests.
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_queue: Optional[int] = None):
+        """
+        Start the worker processes.
+
+        Args:
+            workers (Optional[int]): Number of worker processes (default: CPU count)
+            max_queue (Optional[int]): Jobs allowed to wait for a worker (default: 2 * workers)
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue if max_queue is not None else 2 * self.workers
+
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        # Exponential moving average of worker processing time in seconds
+        self._avg_job_seconds = 1.0
+
+    def warm(self) -> None:
+        """Start every worker process and run its initializer before traffic arrives."""
+        jobs = [self._executor.submit(_ping) for _ in range(self.workers)]
+        for job in jobs:
+            job.result()
+
+    def retry_after(self) -> int:
+        """
+        Estimate how long a rejected client should wait before retrying.
+
+        Returns:
+            int: Seconds until roughly one queue's worth of jobs has drained
+        """
+        with self._lock:
+            backlog = self._in_flight / float(self.workers)
+            return max(1, int(round(backlog * self._avg_job_seconds)))
+
+    def submit(self, image) -> Future:
+        """
+        Queue an image for recognition.
+
+        Args:
+            image (np.ndarray | bytes): Decoded BGR image or encoded image bytes
+
+        Returns:
+            Future: Resolves to the recognition results dictionary
+
+        Raises:
+            QueueFullError: If the job queue is full
+        """
+        with self._lock:
+            if self._in_flight >= self.workers + self.max_queue:
+                self.rejected += 1
+                full = True
+            else:
+                self._in_flight += 1
+                self.submitted += 1
+                full = False
+
+        if full:
+            raise QueueFullError(self.retry_after())
+
+        result = Future()
+        job = self._executor.submit(_recognize, image, current_request())
+        job.add_done_callback(lambda done: self._finish(done, result))
+        return result
+
+    def _finish(self, job: Future, result: Future) -> None:
+        """Release the job's slot, record its duration and resolve the caller's future."""
+        try:
+            plates, elapsed, worker_metrics = job.result()
+        except BaseException as e:
+            with self._lock:
+                self._in_flight -= 1
+                self.failed += 1
+            result.set_exception(e)
+            return
+
+        with self._lock:
+            self._in_flight -= 1
+            self.completed += 1
+            self._avg_job_seconds = 0.9 * self._avg_job_seconds + 0.1 * elapsed
+        # Stage timings and OCR calls are recorded in the worker; add them to this process's metrics
+        REGISTRY.merge(worker_metrics)
+        result.set_result(plates)
+
+    def recognize(self, image, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Recognize an image and wait for the result.
+
+        Args:
+            image (np.ndarray | bytes): Decoded BGR image or encoded image bytes
+            timeout (Optional[float]): Maximum seconds to wait
+
+        Returns:
+            Dict[str, Any]: Recognition results keyed by plate id
+
+        Raises:
+            QueueFullError: If the job queue is full
+            ImageDecodeError: If the image bytes cannot be decoded
+            concurrent.futures.TimeoutError: If no result arrived within the timeout
+        """
+        return self.submit(image).result(timeout=timeout)
+
+    def recognize_many(self, images: Iterable, window: Optional[int] = None,
+                       timeout: Optional[float] = None) -> Iterator[Tuple[int, Any, Optional[BaseException]]]:
+        """
+        Fan a batch of images out across the workers.
+
+        At most `window` jobs of the batch are in flight at once, so a large
+        batch neither floods the shared queue nor holds every decoded image
+        in memory. When the queue is full because of other clients, the batch
+        waits for its own jobs (or, if it has none, for a free slot).
+
+        Args:
+            images (Iterable): Decoded images or encoded image bytes
+            window (Optional[int]): Maximum jobs of this batch in flight (default: workers)
+            timeout (Optional[float]): Maximum seconds to wait for any single step
+
+        Yields:
+            Tuple[int, Any, Optional[BaseException]]: (input index, results, error)
+                in completion order; results is None when error is set
+
+        Raises:
+            QueueFullError: If no slot became free within the timeout
+            TimeoutError: If no job of the batch finished within the timeout
+        """
+        window = window or self.workers
+        pending = {}
+        items = iter(enumerate(images))
+        next_item = next(items, None)
+
+        while next_item is not None or pending:
+            # Submit while the batch has room in its window
+            deadline = time.monotonic() + timeout if timeout else None
+            while next_item is not None and len(pending) < window:
+                index, image = next_item
+                try:
+                    future = self.submit(image)
+                except QueueFullError:
+                    if pending:
+                        break
+                    if deadline is not None and time.monotonic() > deadline:
+                        raise
+                    time.sleep(0.05)
+                    continue
+                pending[future] = index
+                next_item = next(items, None)
+
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                raise TimeoutError("No batch job finished within the timeout")
+
+            for future in done:
+                index = pending.pop(future)
+                error = future.exception()
+                yield index, (None if error else future.result()), error
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report queue depth and worker utilization.
+
+        Returns:
+            Dict[str, Any]: Pool statistics
+        """
+        with self._lock:
+            busy = min(self._in_flight, self.workers)
+            return {
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'in_flight': self._in_flight,
+                'queue_depth': max(0, self._in_flight - self.workers),
+                'busy_workers': busy,
+                'utilization': busy / float(self.workers),
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'avg_job_seconds': round(self._avg_job_seconds, 4)
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the worker processes."""
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,243 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+def content_hash(data: bytes) -> str:
+    """
+    Hash raw upload bytes for use as a cache key.
+
+    Args:
+        data (bytes): Encoded image bytes exactly as uploaded
+
+    Returns:
+        str: 32 character hex digest (BLAKE2b, 128 bit)
+    """
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class RecognitionCache:
+    """
+    Thread-safe LRU cache of recognition results with a time-to-live.
+
+    Identical requests that arrive while the first one is still being
+    recognized do not start a second recognition: they wait for the result
+    of the first (request coalescing). Failed computations are not cached.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 300.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize an empty cache.
+
+        Args:
+            max_entries (int): Maximum number of cached results; 0 disables caching
+            ttl (float): Seconds a result stays valid; 0 means no expiry
+            clock (Callable[[], float]): Time source, replaceable in tests
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _lookup(self, key: str) -> Tuple[bool, Any]:
+        """Return (found, value) for a key; the caller must hold the lock."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+
+        value, stored_at = entry
+        if self.ttl and self._clock() - stored_at > self.ttl:
+            del self._entries[key]
+            self.expirations += 1
+            return False, None
+
+        # Most recently used entries live at the end
+        self._entries.move_to_end(key)
+        return True, value
+
+    def _store(self, key: str, value: Any) -> None:
+        """Insert a value and evict the least recently used entries; the caller must hold the lock."""
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (value, self._clock())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """
+        Look up a cached result.
+
+        Args:
+            key (str): Cache key, usually content_hash() of the upload
+
+        Returns:
+            Tuple[bool, Any]: (True, value) on a hit, (False, None) on a miss
+        """
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return found, value
+
+    def put(self, key: str, value: Any) -> None:
+        """
+        Store a result.
+
+        Args:
+            key (str): Cache key
+            value (Any): Recognition result
+        """
+        with self._lock:
+            self._store(key, value)
+
+    def claim(self, key: str) -> Tuple[bool, Any, Optional[Future]]:
+        """
+        Look up a result, registering the caller as its computation on a miss.
+
+        For callers that compute results themselves, e.g. many at once on a
+        worker pool. A caller that becomes the owner of a key must finish it
+        with complete() or fail(), or requests waiting on it hang until they
+        time out.
+
+        Args:
+            key (str): Cache key
+
+        Returns:
+            Tuple[bool, Any, Optional[Future]]: (True, value, None) on a hit;
+                (False, None, future) if another caller is computing the key,
+                the future resolving to its result; (False, None, None) if the
+                caller now owns the computation
+        """
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                self.hits += 1
+                return True, value, None
+
+            pending = self._in_flight.get(key)
+            if pending is not None:
+                self.coalesced += 1
+                return False, None, pending
+
+            self.misses += 1
+            self._in_flight[key] = Future()
+            return False, None, None
+
+    def complete(self, key: str, value: Any) -> None:
+        """
+        Store the result of a claimed key and hand it to the requests waiting for it.
+
+        Args:
+            key (str): Key claimed with claim()
+            value (Any): Recognition result
+        """
+        with self._lock:
+            self._store(key, value)
+            pending = self._in_flight.pop(key)
+        pending.set_result(value)
+
+    def fail(self, key: str, error: BaseException) -> None:
+        """
+        Release a claimed key without caching anything; waiting requests get the error.
+
+        Args:
+            key (str): Key claimed with claim()
+            error (BaseException): Why the computation failed
+        """
+        with self._lock:
+            pending = self._in_flight.pop(key)
+        pending.set_exception(error)
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any],
+                       timeout: Optional[float] = None) -> Any:
+        """
+        Return the cached result for a key, computing it at most once.
+
+        If another thread is already computing the same key, this call waits
+        for that result instead of computing it again.
+
+        Args:
+            key (str): Cache key
+            compute (Callable[[], Any]): Produces the result on a miss
+            timeout (Optional[float]): Maximum seconds to wait for a coalesced computation
+
+        Returns:
+            Any: Cached or freshly computed result
+
+        Raises:
+            Exception: Whatever compute raised (for this call and any coalesced waiters)
+        """
+        found, value, pending = self.claim(key)
+        if found:
+            return value
+        if pending is not None:
+            return pending.result(timeout=timeout)
+
+        try:
+            value = compute()
+        except BaseException as e:
+            self.fail(key, e)
+            raise
+
+        self.complete(key, value)
+        return value
+
+    def clear(self) -> None:
+        """Drop all cached results (computations in flight are unaffected)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report cache size and hit/miss counters.
+
+        Returns:
+            Dict[str, Any]: Cache statistics
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'in_flight': len(self._in_flight),
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': self.hits / float(lookups) if lookups else 0.0
+            }
+
+
+def recognition_cache_from_env() -> RecognitionCache:
+    """
+    Create the recognition cache configured by environment variables.
+
+    ANPR_CACHE_SIZE sets the maximum number of entries (0 disables the cache)
+    and ANPR_CACHE_TTL the time-to-live in seconds.
+
+    Returns:
+        RecognitionCache: Configured cache
+    """
+    return RecognitionCache(
+        max_entries=int(os.environ.get('ANPR_CACHE_SIZE', 1024)),
+        ttl=float(os.environ.get('ANPR_CACHE_TTL', 300))
+    )
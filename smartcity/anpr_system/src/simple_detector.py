@@ -1,114 +1,116 @@
 import cv2
 import numpy as np
-import pytesseract
-import re
 import sys
 from PIL import Image
+from anpr_logging import configure_logging, diagnostic, get_logger
+from image_io import load_image, describe_source
+from ocr_engine import get_default_engine
+from pipeline import Pipeline, Stage
+from uk_grammar import format_registration, is_uk_registration
 
-def detect_and_recognize_plate(image_path):
-    """
-    Simple approach to detect and recognize a UK license plate.
+log = get_logger('simple_detector')
+
+# OCR configs tried on the detected plate, stopping at the first valid UK plate
+PLATE_CONFIGS = [
+    '--psm 7 --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789',
+    '--psm 8 --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789',
+    '--psm 6 --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
+]
+
+_pipeline = None
+
+def build_simple_pipeline(ocr_engine=None):
     """
-    # Load the image
-    image = cv2.imread(image_path)
-    if image is None:
-        print(f"Error loading image: {image_path}")
-        return None, None
-    
-    # Show original image
-    cv2.imshow("Original Image", image)
-    
-    # Convert to grayscale
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    
-    # Apply Gaussian blur to reduce noise
-    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-    
-    # Apply binary thresholding
-    _, thresh = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-    
-    # Show thresholded image
-    cv2.imshow("Thresholded Image", thresh)
+    Create the 'simple' pipeline configuration.
     
-    # Find edges
-    edges = cv2.Canny(thresh, 50, 150)
+    Otsu threshold and edge contours propose a single plate; if none is
+    found the whole thresholded image is read instead.
     
-    # Show edges
-    cv2.imshow("Edges", edges)
-    
-    # Find contours
-    contours, _ = cv2.findContours(edges.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    
-    # Create a copy of the original image to draw on
-    image_with_contours = image.copy()
-    cv2.drawContours(image_with_contours, contours, -1, (0, 255, 0), 2)
-    cv2.imshow("All Contours", image_with_contours)
-    
-    # Sort contours by area, largest first
-    contours = sorted(contours, key=cv2.contourArea, reverse=True)[:10]
+    Args:
+        ocr_engine (OCREngine): OCR backend; defaults to the shared engine pool
+        
+    Returns:
+        Pipeline: Pipeline of the simple detector
+    """
+    ocr = ocr_engine if ocr_engine is not None else get_default_engine()
     
-    plate_contour = None
-    plate_image = None
+    def decode(ctx):
+        ctx.image = load_image(ctx.source)
+        if ctx.image is None:
+            log.warning("Error loading image: %s", describe_source(ctx.source))
+            ctx.done = True
     
-    # Loop through contours to find the license plate
-    for contour in contours:
-        # Get perimeter of contour
-        perimeter = cv2.arcLength(contour, True)
+    def preprocess(ctx):
+        # Convert to grayscale
+        gray = cv2.cvtColor(ctx.image, cv2.COLOR_BGR2GRAY)
+        
+        # Apply Gaussian blur to reduce noise
+        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
         
-        # Approximate the contour shape
-        approx = cv2.approxPolyDP(contour, 0.02 * perimeter, True)
+        # Apply binary thresholding
+        _, thresh = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
         
-        # If the shape has 4 vertices, it could be a rectangle (license plate)
-        if len(approx) >= 4 and len(approx) <= 6:
-            x, y, w, h = cv2.boundingRect(contour)
+        # Find edges
+        ctx.images['Thresholded Image'] = thresh
+        ctx.images['Edges'] = cv2.Canny(thresh, 50, 150)
+    
+    def propose(ctx):
+        # Find contours
+        contours, _ = cv2.findContours(ctx.images['Edges'].copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        ctx.meta['contours'] = contours
+        ctx.count('contours', len(contours))
+        
+        # Sort contours by area, largest first
+        contours = sorted(contours, key=cv2.contourArea, reverse=True)[:10]
+        
+        # Loop through contours to find the license plate
+        for contour in contours:
+            # Get perimeter of contour
+            perimeter = cv2.arcLength(contour, True)
             
-            # Check aspect ratio for UK license plate
-            aspect_ratio = float(w) / h
-            if 2.0 < aspect_ratio < 7.0:
-                plate_contour = contour
-                plate_image = image[y:y+h, x:x+w]
-                
-                # Draw the contour on the original image
-                cv2.rectangle(image, (x, y), (x + w, y + h), (0, 255, 0), 2)
+            # Approximate the contour shape
+            approx = cv2.approxPolyDP(contour, 0.02 * perimeter, True)
+            
+            # If the shape has 4 vertices, it could be a rectangle (license plate)
+            if len(approx) >= 4 and len(approx) <= 6:
+                x, y, w, h = cv2.boundingRect(contour)
                 
-                # Display the detected plate region
-                cv2.imshow("Plate Region", image[y:y+h, x:x+w])
-                break
-    
-    # If no contour matched our criteria, try direct OCR on the whole image
-    if plate_image is None:
-        print("No plate contour found, attempting direct OCR...")
-        # Convert the thresholded image to PIL format
-        pil_image = Image.fromarray(thresh)
-        
-        # Perform OCR with Tesseract
-        text = pytesseract.image_to_string(pil_image, config='--psm 11 --oem 3')
-        plate_text = clean_and_format_plate(text)
+                # Check aspect ratio for UK license plate
+                aspect_ratio = float(w) / h
+                if 2.0 < aspect_ratio < 7.0:
+                    ctx.proposals = [(x, y, w, h)]
+                    break
+    
+    def rectify(ctx):
+        # If no contour matched our criteria, the whole thresholded image is read
+        if not ctx.proposals:
+            diagnostic(log, "No plate contour found, attempting direct OCR...")
+            ctx.crops = [ctx.images['Thresholded Image']]
+            return
         
-        return plate_text, image
-    
-    # Process the detected plate
-    if plate_image is not None:
-        # Convert to grayscale
-        plate_gray = cv2.cvtColor(plate_image, cv2.COLOR_BGR2GRAY)
+        x, y, w, h = ctx.proposals[0]
+        plate_image = ctx.image[y:y+h, x:x+w]
+        ctx.images['Plate Region'] = plate_image
         
         # Thresholding to make the text clearer
+        plate_gray = cv2.cvtColor(plate_image, cv2.COLOR_BGR2GRAY)
         _, plate_thresh = cv2.threshold(plate_gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        ctx.crops = [plate_thresh]
+    
+    def read_text(ctx):
+        pil_image = Image.fromarray(ctx.crops[0])
         
-        # Convert to PIL Image for OCR
-        plate_pil = Image.fromarray(plate_thresh)
+        if not ctx.proposals:
+            ctx.texts = [ocr.image_to_string(pil_image, config='--psm 11 --oem 3')]
+            ctx.count('ocr_passes')
+            return
         
         # Try multiple OCR configurations
-        configs = [
-            '--psm 7 --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789',
-            '--psm 8 --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789',
-            '--psm 6 --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
-        ]
-        
         best_text = ""
-        for config in configs:
-            text = pytesseract.image_to_string(plate_pil, config=config)
-            print(f"OCR with {config}: {text}")
+        for config in PLATE_CONFIGS:
+            text = ocr.image_to_string(pil_image, config=config)
+            ctx.count('ocr_passes')
+            diagnostic(log, "OCR with %s: %s", config, text)
             
             cleaned = clean_and_format_plate(text)
             if is_valid_uk_plate(cleaned):
@@ -118,47 +120,80 @@ def detect_and_recognize_plate(image_path):
             if not best_text and cleaned:
                 best_text = cleaned
         
-        if best_text:
-            return best_text, image
+        ctx.texts = [best_text]
+    
+    def grammar(ctx):
+        plate_text = clean_and_format_plate(ctx.texts[0])
+        # The direct OCR result is reported even when empty
+        if plate_text or not ctx.proposals:
+            ctx.plates.append({
+                "plate_number": plate_text,
+                "country_identifier": "UNKNOWN",
+                "region": ctx.images.get('Plate Region', ctx.image),
+                "bbox": ctx.proposals[0] if ctx.proposals else None
+            })
+    
+    return Pipeline('simple', [
+        Stage('decode', 'decode', decode),
+        Stage('threshold', 'preprocess', preprocess),
+        Stage('contours', 'propose', propose),
+        Stage('plate_crop', 'rectify', rectify),
+        Stage('ocr', 'ocr', read_text),
+        Stage('plate_format', 'grammar', grammar)
+    ])
+
+def detect_and_recognize_plate(image_path):
+    """
+    Simple approach to detect and recognize a UK license plate.
+    """
+    global _pipeline
+    if _pipeline is None:
+        _pipeline = build_simple_pipeline()
+    
+    ctx = _pipeline.run(image_path)
+    image = ctx.image
+    if image is None:
+        return None, None
     
-    return None, image
+    # Show original image and the intermediate steps
+    cv2.imshow("Original Image", image)
+    cv2.imshow("Thresholded Image", ctx.images['Thresholded Image'])
+    cv2.imshow("Edges", ctx.images['Edges'])
+    
+    # Create a copy of the original image to draw on
+    image_with_contours = image.copy()
+    cv2.drawContours(image_with_contours, ctx.meta['contours'], -1, (0, 255, 0), 2)
+    cv2.imshow("All Contours", image_with_contours)
+    
+    if ctx.proposals:
+        # Display the detected plate region, then draw it on the original image
+        cv2.imshow("Plate Region", ctx.images['Plate Region'].copy())
+        x, y, w, h = ctx.proposals[0]
+        cv2.rectangle(image, (x, y), (x + w, y + h), (0, 255, 0), 2)
+    
+    if not ctx.plates:
+        return None, image
+    
+    return ctx.plates[0]["plate_number"], image
 
 def clean_and_format_plate(text):
     """
     Clean and format the recognized text as a UK plate.
     """
-    # Remove non-alphanumeric characters
-    clean_text = ''.join(c for c in text if c.isalnum()).upper()
-    
-    # Look for UK plate pattern (e.g., AA00AAA or AA00 AAA)
-    if len(clean_text) >= 7:
-        # Try to extract the UK plate format
-        for i in range(len(clean_text) - 6):
-            candidate = clean_text[i:i+7]
-            if re.match(r'^[A-Z]{2}\d{2}[A-Z]{3}$', candidate):
-                return f"{candidate[:2]}{candidate[2:4]} {candidate[4:]}"
-    
-    # If specific pattern not found but length is 7, still format as UK plate
-    if len(clean_text) == 7:
-        return f"{clean_text[:2]}{clean_text[2:4]} {clean_text[4:]}"
-    
-    return clean_text
+    return format_registration(text)
 
 def is_valid_uk_plate(text):
     """
     Check if the text matches a UK license plate format.
     """
-    # Remove spaces
-    text = text.replace(" ", "")
-    
-    # Check format: two letters, two digits, three letters
-    return bool(re.match(r'^[A-Z]{2}\d{2}[A-Z]{3}$', text))
+    return is_uk_registration(text)
 
 if __name__ == "__main__":
     if len(sys.argv) != 2:
         print("Usage: python simple_detector.py <image_path>")
         sys.exit(1)
     
+    configure_logging()
     plate_text, _ = detect_and_recognize_plate(sys.argv[1])
     
     if plate_text:
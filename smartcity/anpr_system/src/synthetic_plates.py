@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Synthetic UK number plate corpus for scale and stress benchmarks.
+
+Each sample is a scene with one plate carrying a valid UK registration in
+the current (AB12 CDE), prefix (A123 BCD), suffix (ABC 123D) or dateless
+(ABC 123) format. Plate size, position, rotation, perspective, blur, noise,
+lighting and the yellow (rear) or white (front) background are varied, and
+a GB/EU band is added to part of the plates.
+
+Every sample is drawn from its own random generator seeded with
+(seed, index), so a corpus is identical for the same seed whatever the
+number of worker processes. Files are named <LABEL>_<index>.png, which is
+the labelling convention of benchmark.py, and a labels.csv manifest
+records the registration, format and plate corners of every sample.
+
+    python src/synthetic_plates.py data/synthetic --count 5000 --seed 7
+    python src/benchmark.py data/synthetic --recognizers uk,contour
+"""
+
+import argparse
+import csv
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Letters never issued in the parts of a registration (DVLA rules)
+CURRENT_AREA_FIRST = 'ABCDEFGHJKLMNOPRSTUVWXY'
+CURRENT_AREA_SECOND = 'ABCDEFGHJKLMNOPRSTUVWXYZ'
+CURRENT_RANDOM = 'ABCDEFGHJKLMNOPRSTUVWXYZ'
+YEAR_LETTERS = 'ABCDEFGHJKLMNPRSTVWXY'
+SERIAL_LETTERS = 'ABCDEFGHJKLMNOPRSTUVWXYZ'
+
+PLATE_FORMATS = ('current', 'prefix', 'suffix', 'dateless')
+
+# Plate colours (BGR)
+YELLOW_PLATE = (0, 210, 255)
+WHITE_PLATE = (245, 245, 245)
+BAND_BLUE = (153, 51, 0)
+CHARACTER_COLOUR = (20, 20, 20)
+
+# A UK plate is 520 x 111 mm; plates are drawn at this size and then warped
+PLATE_WIDTH = 520
+PLATE_HEIGHT = 111
+
+MANIFEST_NAME = 'labels.csv'
+MANIFEST_FIELDS = ['file', 'label', 'format', 'background', 'band',
+                   'x1', 'y1', 'x2', 'y2', 'x3', 'y3', 'x4', 'y4']
+
+
+def _letters(rng: np.random.Generator, alphabet: str, count: int) -> str:
+    """Draw `count` letters from an alphabet."""
+    return ''.join(alphabet[i] for i in rng.integers(0, len(alphabet), count))
+
+
+def _digits(rng: np.random.Generator, count: int, leading_zero: bool = False) -> str:
+    """Draw a number of `count` digits, without a leading zero unless allowed."""
+    first = rng.integers(0 if leading_zero else 1, 10)
+    return str(first) + ''.join(str(d) for d in rng.integers(0, 10, count - 1))
+
+
+def random_registration(rng: np.random.Generator, plate_format: str) -> str:
+    """
+    Draw a valid UK registration as it is displayed on the plate.
+
+    Args:
+        rng (np.random.Generator): Random generator
+        plate_format (str): One of PLATE_FORMATS
+
+    Returns:
+        str: Registration with its display space, e.g. 'AB12 CDE'
+    """
+    if plate_format == 'current':
+        # Age identifier: year of March registrations, year + 50 for September
+        year = int(rng.integers(1, 26))
+        age = year + 50 if rng.random() < 0.5 and year < 25 else year
+        area = _letters(rng, CURRENT_AREA_FIRST, 1) + _letters(rng, CURRENT_AREA_SECOND, 1)
+        return f"{area}{age:02d} {_letters(rng, CURRENT_RANDOM, 3)}"
+    if plate_format == 'prefix':
+        number = _digits(rng, int(rng.integers(1, 4)))
+        return f"{_letters(rng, YEAR_LETTERS, 1)}{number} {_letters(rng, SERIAL_LETTERS, 3)}"
+    if plate_format == 'suffix':
+        number = _digits(rng, int(rng.integers(1, 4)))
+        return f"{_letters(rng, SERIAL_LETTERS, 3)} {number}{_letters(rng, YEAR_LETTERS, 1)}"
+    if plate_format == 'dateless':
+        letters = _letters(rng, SERIAL_LETTERS, int(rng.integers(1, 4)))
+        number = _digits(rng, int(rng.integers(1, 5)))
+        return f"{letters} {number}" if rng.random() < 0.5 else f"{number} {letters}"
+    raise ValueError(f"Unknown plate format: {plate_format}")
+
+
+def render_plate(registration: str, background: Tuple[int, int, int], band: Optional[str]) -> np.ndarray:
+    """
+    Draw a flat, front-on plate.
+
+    Args:
+        registration (str): Text to print
+        background (Tuple[int, int, int]): Plate colour (BGR)
+        band (Optional[str]): Identifier printed on a blue band at the left ('GB', 'UK'), or None
+
+    Returns:
+        np.ndarray: PLATE_HEIGHT x PLATE_WIDTH BGR image
+    """
+    plate = np.full((PLATE_HEIGHT, PLATE_WIDTH, 3), background, dtype=np.uint8)
+    cv2.rectangle(plate, (2, 2), (PLATE_WIDTH - 3, PLATE_HEIGHT - 3), CHARACTER_COLOUR, 2)
+
+    left = 8
+    if band:
+        band_width = 50
+        cv2.rectangle(plate, (4, 4), (4 + band_width, PLATE_HEIGHT - 5), BAND_BLUE, -1)
+        (tw, th), _ = cv2.getTextSize(band, cv2.FONT_HERSHEY_SIMPLEX, 0.9, 2)
+        cv2.putText(plate, band, (4 + (band_width - tw) // 2, PLATE_HEIGHT - 16),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.9, (255, 255, 255), 2, cv2.LINE_AA)
+        left = 4 + band_width
+
+    # Fit the characters into the space right of the band
+    font, thickness = cv2.FONT_HERSHEY_DUPLEX, 7
+    (tw, th), _ = cv2.getTextSize(registration, font, 1.0, thickness)
+    scale = min((PLATE_WIDTH - left - 24) / float(tw), (PLATE_HEIGHT - 30) / float(th))
+    (tw, th), _ = cv2.getTextSize(registration, font, scale, thickness)
+    origin = (left + (PLATE_WIDTH - left - tw) // 2, (PLATE_HEIGHT + th) // 2)
+    cv2.putText(plate, registration, origin, font, scale, CHARACTER_COLOUR, thickness, cv2.LINE_AA)
+    return plate
+
+
+def _scene_background(rng: np.random.Generator, height: int, width: int) -> np.ndarray:
+    """Draw a cluttered background: a colour gradient with random car-body and road shapes."""
+    top, bottom = rng.integers(30, 220, 3), rng.integers(30, 220, 3)
+    ramp = np.linspace(0.0, 1.0, height, dtype=np.float32)[:, None, None]
+    scene = (top * (1.0 - ramp) + bottom * ramp) * np.ones((1, width, 1), np.float32)
+    scene = scene.astype(np.uint8)
+
+    for _ in range(int(rng.integers(3, 9))):
+        x1, y1 = int(rng.integers(0, width)), int(rng.integers(0, height))
+        x2, y2 = int(rng.integers(0, width)), int(rng.integers(0, height))
+        colour = tuple(int(c) for c in rng.integers(0, 256, 3))
+        if rng.random() < 0.6:
+            cv2.rectangle(scene, (x1, y1), (x2, y2), colour, -1)
+        else:
+            cv2.line(scene, (x1, y1), (x2, y2), colour, int(rng.integers(1, 6)))
+    return scene
+
+
+def _plate_corners(rng: np.random.Generator, height: int, width: int,
+                   min_width: float, max_width: float) -> np.ndarray:
+    """Choose where the plate lands: size, position, rotation and perspective skew."""
+    plate_width = width * rng.uniform(min_width, max_width)
+    plate_height = plate_width * PLATE_HEIGHT / PLATE_WIDTH
+    angle = np.deg2rad(rng.uniform(-12.0, 12.0))
+
+    corners = np.array([[0, 0], [plate_width, 0], [plate_width, plate_height], [0, plate_height]],
+                       dtype=np.float32)
+    corners -= corners.mean(axis=0)
+    # Perspective: shrink one side as if the plate were turned away from the camera
+    skew = rng.uniform(-0.15, 0.15)
+    corners[:, 1] *= 1.0 + skew * np.sign(corners[:, 0])
+    corners += rng.normal(0.0, 0.015 * plate_width, corners.shape).astype(np.float32)
+
+    rotation = np.array([[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]], np.float32)
+    corners = corners @ rotation.T
+
+    low = -corners.min(axis=0)
+    high = np.array([width, height], np.float32) - corners.max(axis=0)
+    centre = rng.uniform(low, np.maximum(high, low + 1))
+    return (corners + centre).astype(np.float32)
+
+
+def generate_sample(seed: int, index: int, size: Tuple[int, int] = (640, 480),
+                    formats: Tuple[str, ...] = PLATE_FORMATS, band_probability: float = 0.5,
+                    min_plate_width: float = 0.2, max_plate_width: float = 0.6) -> Dict[str, Any]:
+    """
+    Generate one labelled scene.
+
+    Args:
+        seed (int): Corpus seed
+        index (int): Sample number; (seed, index) fully determines the sample
+        size (Tuple[int, int]): Scene width and height in pixels
+        formats (Tuple[str, ...]): Registration formats to draw from
+        band_probability (float): Probability of a GB/UK identifier band
+        min_plate_width (float): Smallest plate width as a fraction of the scene width
+        max_plate_width (float): Largest plate width as a fraction of the scene width
+
+    Returns:
+        Dict[str, Any]: image (BGR), label (without spaces), registration, format,
+            background, band and corners (4 x 2 plate corners in the scene)
+    """
+    rng = np.random.default_rng([seed, index])
+    width, height = size
+
+    plate_format = formats[int(rng.integers(0, len(formats)))]
+    registration = random_registration(rng, plate_format)
+    background = 'yellow' if rng.random() < 0.5 else 'white'
+    band = ('GB' if rng.random() < 0.5 else 'UK') if rng.random() < band_probability else None
+    plate = render_plate(registration, YELLOW_PLATE if background == 'yellow' else WHITE_PLATE, band)
+
+    scene = _scene_background(rng, height, width)
+    corners = _plate_corners(rng, height, width, min_plate_width, max_plate_width)
+    source = np.array([[0, 0], [PLATE_WIDTH, 0], [PLATE_WIDTH, PLATE_HEIGHT], [0, PLATE_HEIGHT]], np.float32)
+    transform = cv2.getPerspectiveTransform(source, corners)
+    warped = cv2.warpPerspective(plate, transform, (width, height), flags=cv2.INTER_LINEAR)
+    mask = cv2.warpPerspective(np.full(plate.shape[:2], 255, np.uint8), transform, (width, height))
+    scene[mask > 0] = warped[mask > 0]
+
+    # Lighting: global gain and offset plus a soft horizontal light gradient
+    image = scene.astype(np.float32)
+    gain, offset = rng.uniform(0.5, 1.3), rng.uniform(-30.0, 30.0)
+    gradient = np.linspace(1.0 - rng.uniform(0, 0.4), 1.0, width, dtype=np.float32)
+    if rng.random() < 0.5:
+        gradient = gradient[::-1]
+    image = image * gain * gradient[None, :, None] + offset
+
+    # Camera: defocus blur and sensor noise
+    sigma = rng.uniform(0.0, 2.0)
+    if sigma > 0.3:
+        image = cv2.GaussianBlur(image, (0, 0), sigma)
+    image += rng.uniform(0.0, 12.0) * rng.standard_normal(image.shape, dtype=np.float32)
+
+    return {
+        'image': np.clip(image, 0, 255).astype(np.uint8),
+        'label': registration.replace(' ', ''),
+        'registration': registration,
+        'format': plate_format,
+        'background': background,
+        'band': band or '',
+        'corners': corners
+    }
+
+
+def _write_sample(task: Tuple[str, int, int, Dict[str, Any]]) -> Dict[str, Any]:
+    """Generate one sample, save it and return its manifest row (runs in a worker)."""
+    output_dir, seed, index, options = task
+    sample = generate_sample(seed, index, **options)
+    filename = f"{sample['label']}_{index:05d}.png"
+    cv2.imwrite(os.path.join(output_dir, filename), sample['image'])
+
+    row = {'file': filename, 'label': sample['label'], 'format': sample['format'],
+           'background': sample['background'], 'band': sample['band']}
+    for i, (x, y) in enumerate(sample['corners'], 1):
+        row[f'x{i}'], row[f'y{i}'] = round(float(x), 1), round(float(y), 1)
+    return row
+
+
+def generate_corpus(output_dir: str, count: int, seed: int = 0, workers: Optional[int] = None,
+                    **options) -> List[Dict[str, Any]]:
+    """
+    Generate a labelled corpus on disk.
+
+    Args:
+        output_dir (str): Directory for the images and the manifest
+        count (int): Number of samples
+        seed (int): Corpus seed
+        workers (Optional[int]): Worker processes (default: CPU count); 1 generates in-process
+        **options: generate_sample() options
+
+    Returns:
+        List[Dict[str, Any]]: Manifest rows in sample order
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    tasks = [(output_dir, seed, index, options) for index in range(count)]
+
+    if workers == 1:
+        rows = [_write_sample(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            rows = list(executor.map(_write_sample, tasks, chunksize=max(1, count // 64)))
+
+    with open(os.path.join(output_dir, MANIFEST_NAME), 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=MANIFEST_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Generate a corpus from the command line; returns the process exit code."""
+    parser = argparse.ArgumentParser(description="Generate labelled synthetic UK plate images")
+    parser.add_argument("output", help="Output directory")
+    parser.add_argument("--count", type=int, default=1000, help="Number of images")
+    parser.add_argument("--seed", type=int, default=0, help="Corpus seed")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("--size", default="640x480", help="Scene size WIDTHxHEIGHT")
+    parser.add_argument("--formats", default=','.join(PLATE_FORMATS),
+                        help="Comma separated registration formats")
+    parser.add_argument("--band-probability", type=float, default=0.5,
+                        help="Fraction of plates with a GB/UK identifier band")
+    parser.add_argument("--min-plate-width", type=float, default=0.2,
+                        help="Smallest plate width as a fraction of the image width")
+    parser.add_argument("--max-plate-width", type=float, default=0.6,
+                        help="Largest plate width as a fraction of the image width")
+    args = parser.parse_args(argv)
+
+    width, height = (int(value) for value in args.size.lower().split('x'))
+    formats = tuple(name.strip() for name in args.formats.split(',') if name.strip())
+    for name in formats:
+        if name not in PLATE_FORMATS:
+            parser.error(f"unknown format '{name}' (available: {', '.join(PLATE_FORMATS)})")
+
+    rows = generate_corpus(args.output, args.count, args.seed, args.workers,
+                           size=(width, height), formats=formats,
+                           band_probability=args.band_probability,
+                           min_plate_width=args.min_plate_width,
+                           max_plate_width=args.max_plate_width)
+    print(f"Wrote {len(rows)} images and {MANIFEST_NAME} to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,237 @@
+"""
+Position-aware decoding of OCR output into UK registrations.
+
+A registration is a sequence of letter (L) and digit (D) positions. The
+formats in use are compiled into templates once:
+
+    current   LLDD LLL        AB12 CDE
+    prefix    LD{1,3} LLL     A123 BCD
+    suffix    LLL D{1,3}L     ABC 123D
+    dateless  L{1,3} D{1,4}   ABC 123   (or the digits first: 123 ABC),
+                              3 characters at least
+
+decode() tries every template against every window of the cleaned OCR
+text. A character that does not fit its position may still be read as
+its usual OCR confusion (O/0, I/1, S/5, B/8, Z/2 and a few weaker ones)
+at a cost, characters left over at the ends cost a little each, and the
+rarer formats carry a small prior cost. At most two characters may be
+left over. Short registrations fit inside almost any noise (a GB band
+read, a partial read of a longer plate), so dateless ones are only
+decoded from the whole text, and those shorter than 7 characters only
+from the whole text read without corrections. The valid registration
+with the lowest total cost wins, so a letter O in a letter position
+stays an O while the same glyph in a digit position becomes a 0.
+
+decode_lattice() does the same over per-character OCR alternatives with
+their confidences, so a character OCR got wrong can be taken from its
+second choice instead of from another OCR pass.
+"""
+
+import math
+import re
+import string
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# OCR confusions: character read -> character meant in a digit or letter position
+DIGIT_CONFUSIONS = {'O': '0', 'I': '1', 'S': '5', 'B': '8', 'Z': '2'}
+LETTER_CONFUSIONS = {'0': 'O', '1': 'I', '5': 'S', '8': 'B', '2': 'Z'}
+# Less frequent confusions, tried at a higher cost
+WEAK_DIGIT_CONFUSIONS = {'D': '0', 'Q': '0', 'G': '6', 'T': '7', 'A': '4', 'L': '1'}
+WEAK_LETTER_CONFUSIONS = {'6': 'G', '7': 'T', '4': 'A'}
+
+CONFUSION_COST = 0.5
+WEAK_CONFUSION_COST = 0.8
+# Cost of each character dropped from the ends of the text (border bars, band letters)
+SKIP_COST = 0.75
+# Most characters dropped in total: a GB/UK band, or a border bar on either side
+MAX_SKIPPED = 2
+# Formats that must account for every character of the text
+WHOLE_TEXT_FORMATS = ('dateless',)
+# Registrations shorter than this fit inside almost any noise or partial read
+# of a longer plate: they must be the whole text, read without corrections
+SHORT_LENGTH = 7
+# Shortest dateless registration decoded; two characters are too easily noise
+MIN_DATELESS_LENGTH = 3
+# Decodes costing more than this are not trusted
+MAX_COST = 2.5
+# Cost per unit of log confidence ratio of taking an OCR alternative over its top choice
+CHOICE_WEIGHT = 0.3
+
+# Prior cost of each format: current registrations (since 2001) are by far the
+# most common on the road, suffix (1963-83) and dateless ones the rarest. The
+# priors only break ties; an exact read of any format beats a corrected one
+FORMAT_COSTS = {'current': 0.0, 'prefix': 0.1, 'suffix': 0.2, 'dateless': 0.3}
+
+
+def _class_table(native: str, confusions: Dict[str, str],
+                 weak_confusions: Dict[str, str]) -> Dict[str, Tuple[str, float]]:
+    """Map every character to (character in this position, cost) for one position class."""
+    table = {ch: (ch, 0.0) for ch in native}
+    table.update({ch: (meant, WEAK_CONFUSION_COST) for ch, meant in weak_confusions.items()})
+    table.update({ch: (meant, CONFUSION_COST) for ch, meant in confusions.items()})
+    return table
+
+
+CLASS_TABLES = {
+    'L': _class_table(string.ascii_uppercase, LETTER_CONFUSIONS, WEAK_LETTER_CONFUSIONS),
+    'D': _class_table(string.digits, DIGIT_CONFUSIONS, WEAK_DIGIT_CONFUSIONS)
+}
+
+
+def _compile_templates() -> List[Tuple[str, str, int]]:
+    """
+    Expand the UK formats into fixed templates.
+
+    Returns:
+        List[Tuple[str, str, int]]: (format, position classes, display space index),
+            most common format first
+    """
+    templates = [('current', 'LLDDLLL', 4)]
+    templates += [('prefix', 'L' + 'D' * n + 'LLL', 1 + n) for n in range(1, 4)]
+    templates += [('suffix', 'LLL' + 'D' * n + 'L', 3) for n in range(1, 4)]
+    for letters in range(1, 4):
+        for digits in range(1, 5):
+            if letters + digits < MIN_DATELESS_LENGTH:
+                continue
+            templates.append(('dateless', 'L' * letters + 'D' * digits, letters))
+            templates.append(('dateless', 'D' * digits + 'L' * letters, digits))
+    return templates
+
+
+TEMPLATES = _compile_templates()
+
+# Exact match of any format, with or without the display space
+_REGISTRATION_PATTERN = re.compile('^(?:{})$'.format('|'.join(
+    classes[:split].replace('L', '[A-Z]').replace('D', r'\d') + ' ?' +
+    classes[split:].replace('L', '[A-Z]').replace('D', r'\d')
+    for _, classes, split in TEMPLATES
+)))
+
+
+def clean_text(text: str) -> str:
+    """Upper-case alphanumeric characters of an OCR output."""
+    return ''.join(c for c in text if c.isalnum()).upper()
+
+
+def _position_options(choices: Sequence[Tuple[str, float]]) -> Dict[str, Tuple[str, float, float, bool]]:
+    """
+    Cheapest reading of one lattice position as a letter and as a digit.
+
+    Returns:
+        Dict[str, Tuple[str, float, float, bool]]: Class -> (character, cost,
+            OCR confidence, whether it differs from the top choice)
+    """
+    choices = [(clean_text(text), float(conf)) for text, conf in choices]
+    choices = [(text, max(conf, 1e-3)) for text, conf in choices if len(text) == 1]
+    options = {}
+    if not choices:
+        return options
+    top_text, top_conf = choices[0]
+    for position, table in CLASS_TABLES.items():
+        for text, conf in choices:
+            entry = table.get(text)
+            if entry is None:
+                continue
+            # Alternatives cost by how much less confident OCR was in them than in its top choice
+            cost = entry[1] + CHOICE_WEIGHT * max(0.0, math.log(top_conf / conf))
+            if position not in options or cost < options[position][1]:
+                options[position] = (entry[0], cost, conf, entry[0] != top_text)
+    return options
+
+
+def decode_lattice(lattice: Sequence[Sequence[Tuple[str, float]]],
+                   max_cost: float = MAX_COST) -> Optional[Dict[str, Any]]:
+    """
+    Find the most plausible UK registration among per-character OCR alternatives.
+
+    Every template is fitted to every window of the lattice. As positions
+    are independent given the template, the best path through a window is
+    the cheapest letter or digit reading of each of its positions.
+
+    Args:
+        lattice (Sequence[Sequence[Tuple[str, float]]]): Per character position,
+            (character, confidence 0-100) alternatives with OCR's top choice first
+        max_cost (float): Reject decodes costing more than this
+
+    Returns:
+        Optional[Dict[str, Any]]: plate_number (with its display space), format,
+            cost, corrections (characters differing from OCR's top choices) and
+            confidence (mean OCR confidence of the chosen characters), or None if
+            no format fits within max_cost
+    """
+    options = [_position_options(choices) for choices in lattice]
+    options = [option for option in options if option]
+    best, best_cost = None, max_cost
+
+    for plate_format, classes, split in TEMPLATES:
+        length = len(classes)
+        skipped = len(options) - length
+        short = length < SHORT_LENGTH
+        whole_text = short or plate_format in WHOLE_TEXT_FORMATS
+        if skipped < 0 or skipped > MAX_SKIPPED or (whole_text and skipped):
+            continue
+        base_cost = FORMAT_COSTS[plate_format] + skipped * SKIP_COST
+        if base_cost > best_cost:
+            continue
+
+        for start in range(len(options) - length + 1):
+            cost, chosen = base_cost, []
+            for option, position in zip(options[start:start + length], classes):
+                entry = option.get(position)
+                if entry is None or (short and entry[3]):
+                    break
+                chosen.append(entry)
+                cost += entry[1]
+                if cost > best_cost:
+                    break
+            else:
+                # Strictly cheaper only: ties keep the more common format and the earlier window
+                if best is None or cost < best_cost:
+                    plate = ''.join(entry[0] for entry in chosen)
+                    best = {'plate_number': f"{plate[:split]} {plate[split:]}", 'format': plate_format,
+                            'cost': cost, 'corrections': sum(entry[3] for entry in chosen),
+                            'confidence': sum(entry[2] for entry in chosen) / len(chosen)}
+                    best_cost = cost
+    return best
+
+
+def decode(text: str, max_cost: float = MAX_COST) -> Optional[Dict[str, Any]]:
+    """
+    Find the most plausible UK registration in an OCR output.
+
+    Args:
+        text (str): Raw OCR text
+        max_cost (float): Reject decodes costing more than this
+
+    Returns:
+        Optional[Dict[str, Any]]: As decode_lattice(), with every character
+            read at confidence 100
+    """
+    return decode_lattice([[(ch, 100.0)] for ch in clean_text(text)], max_cost)
+
+
+def format_registration(text: str) -> str:
+    """
+    Format OCR output as a UK registration if one can be decoded from it.
+
+    Args:
+        text (str): Raw OCR text
+
+    Returns:
+        str: Registration with its display space, or the cleaned text
+    """
+    decoded = decode(text)
+    return decoded['plate_number'] if decoded else clean_text(text)
+
+
+def is_uk_registration(text: str) -> bool:
+    """
+    Check whether a text is exactly a registration in one of the UK formats.
+
+    Args:
+        text (str): Plate number, with or without its display space
+
+    Returns:
+        bool: Whether the text matches a format without any correction
+    """
+    return bool(_REGISTRATION_PATTERN.match(text.strip().upper()))
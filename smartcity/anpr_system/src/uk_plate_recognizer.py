@@ -1,9 +1,35 @@
+import contextvars
 import cv2
 import numpy as np
-import pytesseract
-import re
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
+from anpr_logging import configure_logging, diagnostic, get_logger
+from candidates import non_max_suppression, score_candidates, top_k_from_env
+from colour_proposer import propose_colour_regions, proposer_from_env
+from confidence import confidence_features, plate_confidence
+from debug_sink import DebugSink
+from image_features import ImageFeatures, detection_scales, detection_settings_from_env, scale_box
+from image_io import load_image, describe_source
+from ocr_engine import get_default_engine, ocr_threads_from_env
+from ocr_batch import batch_ocr
+from ocr_ladder import ConfigLadder
+from pipeline import Pipeline, Stage
+from uk_grammar import decode, decode_lattice, format_registration, is_uk_registration
+
+log = get_logger('uk_recognizer')
+
+# OCR configs tried on a plate crop, in default order
+PLATE_OCR_CONFIGS = [
+    '--psm 7 -l eng --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789',
+    '--psm 8 -l eng --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789',
+    '--psm 6 -l eng --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789',
+    '--psm 13 -l eng --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
+]
+
+# OCR configs tried on a whole image when no plate region was found
+DIRECT_OCR_CONFIGS = PLATE_OCR_CONFIGS[:3]
 
 class UKPlateRecognizer:
     """
@@ -11,205 +37,392 @@ class UKPlateRecognizer:
     including plate numbers and country/region identifiers.
     """
     
-    def __init__(self):
-        """Initialize the UK plate recognizer with default parameters."""
-        # UK license plate pattern: two letters, two numbers, three letters
-        self.uk_plate_pattern = re.compile(r'^[A-Z]{2}\d{2}[A-Z]{3}$')
+    def __init__(self, headless=False, debug_sink=None, ocr_engine=None, batch_ocr=True,
+                 early_exit_confidence=80.0, detect_max_side=None, detect_levels=None,
+                 proposer=None, top_k=None, ocr_threads=None):
+        """
+        Initialize the UK plate recognizer with default parameters.
         
-    def process_image(self, image_path):
+        Args:
+            headless (bool): Never open HighGUI windows (for servers without a display)
+            debug_sink (DebugSink): Destination for intermediate images; disabled by default
+            ocr_engine (OCREngine): OCR backend; defaults to the shared engine pool
+            batch_ocr (bool): Recognize all detected regions with one OCR pass first
+            early_exit_confidence (float): OCR confidence (0-100) at which a valid
+                UK plate is accepted without trying the remaining configs
+            detect_max_side (int): Longest side plate regions are searched at; crops
+                and OCR use full resolution (default: ANPR_DETECT_MAX_SIDE or 1280, 0 = full)
+            detect_levels (int): Search pyramid levels, each doubling the resolution
+                (default: ANPR_DETECT_LEVELS or 1)
+            proposer (str): How plate regions are proposed: 'contour' (edge and contour
+                search), 'colour' (yellow/white segmentation) or 'both', colour
+                proposals first (default: ANPR_PROPOSER or 'contour')
+            top_k (int): Best scored plate regions passed on to OCR
+                (default: ANPR_TOP_K or 2, 0 = all)
+            ocr_threads (int): Threads running the OCR passes of an image's regions
+                and configs concurrently (default: ANPR_OCR_THREADS or 1, sequential)
+        """
+        self.headless = headless
+        self.debug_sink = debug_sink if debug_sink is not None else DebugSink()
+        self.ocr = ocr_engine if ocr_engine is not None else get_default_engine()
+        self.batch_ocr = batch_ocr
+        self.early_exit_confidence = early_exit_confidence
+        env_max_side, env_levels = detection_settings_from_env()
+        self.detect_max_side = detect_max_side if detect_max_side is not None else env_max_side
+        self.detect_levels = detect_levels if detect_levels is not None else env_levels
+        self.proposer = proposer if proposer is not None else proposer_from_env()
+        self.top_k = top_k if top_k is not None else top_k_from_env()
+        self.ocr_threads = ocr_threads if ocr_threads is not None else ocr_threads_from_env()
+        self._ocr_executor = None
+        self._ocr_executor_lock = threading.Lock()
+        # Config ladders learn which config wins most often in this deployment
+        self.plate_ladder = ConfigLadder('uk_plate_number', PLATE_OCR_CONFIGS)
+        self.direct_ladder = ConfigLadder('uk_direct_ocr', DIRECT_OCR_CONFIGS)
+        # Per-thread id of the frame being captured by the debug sink
+        self._debug_state = threading.local()
+        # Recognition stages with per-stage timing ('uk' pipeline configuration)
+        self.pipeline = self._build_pipeline()
+        
+    def _is_confident_plate(self, plate_number, confidence):
+        """
+        Decide whether an OCR result is good enough to stop trying configs.
+        
+        Args:
+            plate_number (str): Formatted plate number
+            confidence (float): OCR confidence (0-100)
+            
+        Returns:
+            bool: Whether the result is a confident, valid UK plate
+        """
+        return confidence >= self.early_exit_confidence and is_uk_registration(plate_number)
+    
+    def _best_word(self, ocr_data, min_confidence):
+        """
+        Pick the most confident word of one OCR pass.
+        
+        Args:
+            ocr_data (dict): OCR engine image_to_data output
+            min_confidence (float): Words at or below this confidence are ignored
+            
+        Returns:
+            tuple: (text, confidence), or (None, 0.0) if no word qualifies
+        """
+        best_text, best_confidence = None, 0.0
+        for i, conf in enumerate(ocr_data['conf']):
+            if conf > min_confidence:
+                text = ocr_data['text'][i]
+                if text and text.strip() and float(conf) > best_confidence:
+                    best_text, best_confidence = text, float(conf)
+        return best_text, best_confidence
+    
+    def _decode_choices(self, lattice):
+        """
+        Pick the best UK registration from per-character OCR alternatives.
+        
+        Args:
+            lattice (list): Per character, (character, confidence) alternatives
+                with the OCR engine's top choice first
+        
+        Returns:
+            dict: Plate read (see _text_read), with plate_number None if nothing was read
+        """
+        decoded = decode_lattice(lattice)
+        if decoded:
+            return {'plate_number': decoded['plate_number'], 'ocr_confidence': decoded['confidence'],
+                    'grammar_cost': decoded['cost'], 'agreement': 1.0}
+        if not lattice:
+            return {'plate_number': None, 'ocr_confidence': 0.0, 'grammar_cost': None, 'agreement': 0.0}
+        
+        # No registration fits: keep the top choices as they were read
+        text = self.format_uk_plate(''.join(choices[0][0] for choices in lattice))
+        confidence = sum(choices[0][1] for choices in lattice) / len(lattice)
+        return {'plate_number': text or None, 'ocr_confidence': confidence, 'grammar_cost': None, 'agreement': 1.0}
+    
+    def _text_read(self, text, ocr_confidence):
+        """
+        Describe a plain OCR text as a plate read.
+        
+        Args:
+            text (str): Raw OCR text
+            ocr_confidence (float): OCR confidence of the text (0-100)
+        
+        Returns:
+            dict: plate_number, ocr_confidence, grammar_cost (None if no UK
+                format fits) and agreement (share of OCR passes that read the
+                same plate; 1.0 for a single pass)
+        """
+        decoded = decode(text)
+        return {'plate_number': self.format_uk_plate(text), 'ocr_confidence': ocr_confidence,
+                'grammar_cost': decoded['cost'] if decoded else None, 'agreement': 1.0}
+    
+    def _agreement(self, plate_numbers, plate_number):
+        """Share of the OCR passes that produced something which read plate_number."""
+        plate_numbers = [number for number in plate_numbers if number]
+        if not plate_numbers:
+            return 0.0
+        return sum(1 for number in plate_numbers if number == plate_number) / float(len(plate_numbers))
+    
+    def _show(self, name, image):
+        """
+        Display an intermediate image and hand it to the debug sink.
+        
+        Args:
+            name (str): Name of the processing step
+            image (np.ndarray): Intermediate image
+        """
+        frame_id = getattr(self._debug_state, 'frame_id', None)
+        if frame_id is not None:
+            self.debug_sink.emit(frame_id, name, image)
+        
+        if not self.headless:
+            cv2.imshow(name, image)
+        
+    def process_image(self, image_source):
         """
         Process an image to detect and recognize UK license plates.
         
         Args:
-            image_path (str): Path to the image file
+            image_source (str | bytes | np.ndarray): Path to the image file,
+                encoded image bytes or an already decoded BGR image
             
         Returns:
             dict: Recognition results including plate number and country identifier
         """
-        # Load the image
-        image = cv2.imread(image_path)
-        if image is None:
-            print(f"Error loading image: {image_path}")
-            return None
-        
-        # Make a copy for display
-        display_image = image.copy()
+        self._debug_state.frame_id = self.debug_sink.start_frame()
+        try:
+            ctx = self.pipeline.run(image_source)
+            if ctx.image is None:
+                return None
+            
+            # Annotated copy is only needed when someone will look at it
+            if not self.headless or self._debug_state.frame_id is not None:
+                self._show("UK License Plate Detection", self._annotate(ctx))
+            
+            return ctx.results()
+        finally:
+            self._debug_state.frame_id = None
+    
+    def _build_pipeline(self):
+        """
+        Compose the recognition stages of this recognizer.
         
-        # If the image is clearly a license plate (not a scene containing a plate), process directly
-        h, w = image.shape[:2]
+        Returns:
+            Pipeline: The 'uk' pipeline configuration
+        """
+        return Pipeline('uk', [
+            Stage('decode', 'decode', self._decode_stage),
+            Stage('features', 'preprocess', self._features_stage),
+            Stage('regions', 'propose', self._propose_stage),
+            Stage('crop', 'rectify', self._crop_stage),
+            Stage('ocr', 'ocr', self._ocr_stage),
+            Stage('plate_format', 'grammar', self._grammar_stage),
+            Stage('country', 'country', self._country_stage)
+        ])
+    
+    def _decode_stage(self, ctx):
+        """Load the image (decoded arrays are used as-is, without a disk round-trip)."""
+        ctx.image = load_image(ctx.source)
+        if ctx.image is None:
+            log.warning("Error loading image: %s", describe_source(ctx.source))
+            ctx.done = True
+    
+    def _features_stage(self, ctx):
+        """Share grayscale, HSV and threshold maps between all later stages."""
+        ctx.features = ImageFeatures(ctx.image)
+    
+    def _propose_stage(self, ctx):
+        """Find plate regions, or treat the whole image as one plate."""
+        h, w = ctx.image.shape[:2]
         aspect_ratio = w / h
         
-        results = {}
-        
-        # If aspect ratio is close to typical UK plate (approx 4.5:1)
+        # If aspect ratio is close to typical UK plate (approx 4.5:1),
+        # the image is a plate rather than a scene containing a plate
         if 3.5 < aspect_ratio < 5.5:
-            print("Direct plate processing - image appears to be a plate")
-            # Process the entire image as a plate
-            plate_number = self.recognize_plate_number(image)
-            country_id = self.detect_country_identifier(image)
+            diagnostic(log, "Direct plate processing - image appears to be a plate", width=w, height=h)
+            ctx.meta['mode'] = 'plate'
+            ctx.proposals = [(0, 0, w, h)]
+            ctx.meta['candidate_scores'] = list(score_candidates(ctx.features, ctx.proposals))
+            return
+        
+        ranked = self._rank_plate_boxes(ctx.features)
+        ctx.proposals = [bbox for bbox, _ in ranked]
+        ctx.meta['candidate_scores'] = [score for _, score in ranked]
+        ctx.count('regions', len(ctx.proposals))
+        
+        if ctx.proposals:
+            ctx.meta['mode'] = 'regions'
+        else:
+            diagnostic(log, "No plate regions detected - trying direct OCR")
+            ctx.meta['mode'] = 'direct'
+            ctx.proposals = [(0, 0, w, h)]
+            ctx.meta['candidate_scores'] = list(score_candidates(ctx.features, ctx.proposals))
+    
+    def _crop_stage(self, ctx):
+        """Cut the proposed regions out of the frame, sharing its feature maps."""
+        ctx.crops = [ctx.features.crop(*bbox) for bbox in ctx.proposals]
+    
+    def _ocr_stage(self, ctx):
+        """Read the plate number of every crop."""
+        if ctx.meta['mode'] == 'direct':
+            ctx.meta['reads'] = [self.read_direct_ocr(ctx.crops[0])]
+        else:
+            # Read all regions with a single OCR pass; regions it cannot
+            # resolve fall back to per-region recognition
+            if self.batch_ocr and len(ctx.crops) > 1:
+                batched_reads = self.batch_read_plates(ctx.crops)
+                ctx.count('batched', sum(1 for read in batched_reads if read))
+            else:
+                batched_reads = [None] * len(ctx.crops)
             
-            results["plate_0"] = {
+            unresolved = [idx for idx, read in enumerate(batched_reads) if not read]
+            reads = dict(zip(unresolved, self.read_plate_numbers([ctx.crops[idx] for idx in unresolved])))
+            ctx.meta['reads'] = [batched_reads[idx] or reads[idx] for idx in range(len(ctx.crops))]
+        ctx.texts = [read['plate_number'] for read in ctx.meta['reads']]
+    
+    def _grammar_stage(self, ctx):
+        """Turn the OCR output into plate entries with a calibrated confidence, dropping failed direct reads."""
+        kept = []
+        ctx.meta['confidence_features'] = []
+        for bbox, crop, read, candidate_score in zip(ctx.proposals, ctx.crops, ctx.meta['reads'],
+                                                     ctx.meta['candidate_scores']):
+            plate_number = read['plate_number']
+            if ctx.meta['mode'] == 'direct' and plate_number == "UNKNOWN":
+                continue
+            if is_uk_registration(plate_number):
+                ctx.count('valid')
+            features = confidence_features(read['ocr_confidence'], read['grammar_cost'],
+                                           candidate_score, read['agreement'])
+            ctx.meta['confidence_features'].append(features)
+            kept.append(crop)
+            ctx.plates.append({
                 "plate_number": plate_number,
-                "country_identifier": country_id,
-                "region": image,
-                "bbox": (0, 0, w, h)
-            }
-            
-            # Display results on image
-            label = f"{plate_number} ({country_id})"
-            cv2.putText(display_image, label, (10, 30), 
-                        cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 255, 0), 2)
-        else:
-            # Normal plate detection process
-            plate_regions = self.detect_plate_regions(image)
+                "country_identifier": "UNKNOWN",
+                "confidence": plate_confidence(features),
+                "region": crop.bgr,
+                "bbox": bbox
+            })
+        ctx.crops = kept
+    
+    def _country_stage(self, ctx):
+        """Detect the country identifier of every recognized plate."""
+        for plate, crop in zip(ctx.plates, ctx.crops):
+            plate["country_identifier"] = self.detect_country_identifier(crop)
+    
+    def _annotate(self, ctx):
+        """
+        Draw the recognized plates onto a copy of the frame.
+        
+        Args:
+            ctx (PipelineContext): Finished pipeline context
             
-            if not plate_regions:
-                print("No plate regions detected - trying direct OCR")
-                # If no plate regions detected, try direct OCR
-                plate_number = self.direct_ocr_plate(image)
-                country_id = self.detect_country_identifier(image)
-                
-                if plate_number != "UNKNOWN":
-                    results["plate_0"] = {
-                        "plate_number": plate_number,
-                        "country_identifier": country_id,
-                        "region": image,
-                        "bbox": (0, 0, w, h)
-                    }
-                    
-                    # Display results on image
-                    label = f"{plate_number} ({country_id})"
-                    cv2.putText(display_image, label, (10, 30), 
-                                cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 255, 0), 2)
+        Returns:
+            np.ndarray: Annotated image
+        """
+        display_image = ctx.image.copy()
+        
+        for plate in ctx.plates:
+            label = f"{plate['plate_number']} ({plate['country_identifier']})"
+            if ctx.meta.get('mode') == 'regions':
+                x, y, w, h = plate['bbox']
+                cv2.rectangle(display_image, (x, y), (x+w, y+h), (0, 255, 0), 2)
+                cv2.putText(display_image, label, (x, y-10), 
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
             else:
-                # Process each detected plate region
-                for idx, (region, bbox) in enumerate(plate_regions):
-                    x, y, w, h = bbox
-                    cv2.rectangle(display_image, (x, y), (x+w, y+h), (0, 255, 0), 2)
-                    
-                    # Recognize plate number
-                    plate_number = self.recognize_plate_number(region)
-                    
-                    # Detect country identifier
-                    country_id = self.detect_country_identifier(region)
-                    
-                    results[f"plate_{idx}"] = {
-                        "plate_number": plate_number,
-                        "country_identifier": country_id,
-                        "region": region,
-                        "bbox": bbox
-                    }
-                    
-                    # Display results on image
-                    label = f"{plate_number} ({country_id})"
-                    cv2.putText(display_image, label, (x, y-10), 
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
-        
-        # Display processed image
-        cv2.imshow("UK License Plate Detection", display_image)
-        
-        return results
+                cv2.putText(display_image, label, (10, 30), 
+                            cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 255, 0), 2)
+            
+        return display_image
     
     def direct_ocr_plate(self, image):
         """
         Directly perform OCR on the entire image to recognize license plate.
         
         Args:
-            image (np.ndarray): Input image
-            
+            image (np.ndarray | ImageFeatures): Input image
+        
         Returns:
             str: Recognized plate number
         """
-        # Convert to grayscale
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        return self.read_direct_ocr(image)['plate_number']
+    
+    def read_direct_ocr(self, image):
+        """
+        Read a plate from the entire image, with the evidence for its confidence.
         
-        # Apply adaptive thresholding
-        thresh = cv2.adaptiveThreshold(
-            gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-            cv2.THRESH_BINARY, 11, 2
-        )
+        Args:
+            image (np.ndarray | ImageFeatures): Input image
+        
+        Returns:
+            dict: Plate read (see _text_read); plate_number is "UNKNOWN" if nothing was read
+        """
+        features = ImageFeatures.of(image)
+        
+        # Adaptive threshold of the grayscale image
+        thresh = features.adaptive_binary
         
         # Display preprocessed image
-        cv2.imshow("Preprocessed for OCR", thresh)
+        self._show("Preprocessed for OCR", thresh)
         
         # Convert to PIL format for OCR
         pil_image = Image.fromarray(thresh)
         
-        # Try multiple OCR configurations
-        configs = [
-            '--psm 7 -l eng --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789',
-            '--psm 8 -l eng --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789',
-            '--psm 6 -l eng --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
-        ]
-        
-        best_text = ""
-        best_confidence = 0
-        
-        for config in configs:
-            ocr_data = pytesseract.image_to_data(
-                pil_image, config=config, output_type=pytesseract.Output.DICT
-            )
-            
-            for i, conf in enumerate(ocr_data['conf']):
-                if conf > 10:  # Only consider results with confidence > 10
-                    text = ocr_data['text'][i]
-                    if text and float(conf) > best_confidence:
-                        best_confidence = float(conf)
-                        best_text = text
+        # Try OCR configurations in learned order, stopping at the first confident plate
+        plate_numbers = []
+        def attempt(config):
+            ocr_data = self.ocr.image_to_data(pil_image, config=config)
+            # Only consider results with confidence > 10
+            text, conf = self._best_word(ocr_data, 10)
+            plate_numbers.append(self.format_uk_plate(text) if text else None)
+            return text, conf
+        
+        best_text, best_confidence, _, _ = self.direct_ladder.run(
+            attempt, lambda text, conf: self._is_confident_plate(self.format_uk_plate(text), conf)
+        )
         
         # Clean and format recognized text
         if best_text:
-            return self.format_uk_plate(best_text)
+            read = self._text_read(best_text, best_confidence)
+            read['agreement'] = self._agreement(plate_numbers, read['plate_number'])
+            return read
         
         # If above methods fail, try more targeted OCR on specific regions
-        h, w = image.shape[:2]
+        h, w = features.shape[:2]
         
         # Assume plate number is in the right part (removing left country identifier)
-        plate_part = image[:, int(w*0.2):w]
-        gray_plate = cv2.cvtColor(plate_part, cv2.COLOR_BGR2GRAY)
-        _, plate_thresh = cv2.threshold(gray_plate, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        plate_part = features.crop(int(w*0.2), 0, w - int(w*0.2), h)
+        plate_thresh = plate_part.otsu_binary
         
-        cv2.imshow("Plate Number Part", plate_thresh)
+        self._show("Plate Number Part", plate_thresh)
         
         # Try OCR directly on this part
-        text = pytesseract.image_to_string(
+        text = self.ocr.image_to_string(
             plate_thresh, 
             config='--psm 7 -l eng --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
         ).strip()
         
+        # image_to_string reports no confidence
         if text:
-            return self.format_uk_plate(text)
-        
-        # Last attempt: handle specific patterns for UK plates
-        # Preset value for "AA03 BOJ" as a fallback when image is clearly a UK plate with good quality
-        if self.is_clearly_uk_plate(image):
-            return "AA03 BOJ"
+            return self._text_read(text, 0.0)
         
-        return "UNKNOWN"
+        return {'plate_number': "UNKNOWN", 'ocr_confidence': 0.0, 'grammar_cost': None, 'agreement': 0.0}
     
     def is_clearly_uk_plate(self, image):
         """
         Determine if the image is clearly a UK license plate.
         
         Args:
-            image (np.ndarray): Input image
+            image (np.ndarray | ImageFeatures): Input image
             
         Returns:
             bool: Whether it's clearly a UK plate
         """
-        # Check if left side has blue area (EU flag)
-        h, w = image.shape[:2]
-        left_part = image[:, 0:int(w*0.15)]
-        
-        # Convert to HSV color space
-        hsv = cv2.cvtColor(left_part, cv2.COLOR_BGR2HSV)
+        features = ImageFeatures.of(image)
         
-        # HSV range for blue
-        lower_blue = np.array([100, 50, 50])
-        upper_blue = np.array([130, 255, 255])
+        # Check if left side has blue area (EU flag)
+        h, w = features.shape[:2]
         
-        # Blue mask
-        blue_mask = cv2.inRange(hsv, lower_blue, upper_blue)
+        # Blue mask of the left part, sliced from the mask of the whole image
+        blue_mask = features.blue_mask[:, 0:int(w*0.15)]
         
         # Calculate percentage of blue pixels
         blue_percentage = (np.sum(blue_mask > 0) / (blue_mask.size)) * 100
@@ -224,17 +437,65 @@ class UKPlateRecognizer:
         """
         Detect potential license plate regions in the image.
         
+        Large images are searched on a downscaled copy (or a short pyramid of
+        them); the boxes are mapped back so regions are cut at full resolution.
+        Depending on the proposer, regions come from colour segmentation, the
+        contour search, or both with the ranked colour proposals first.
+        Overlapping regions are merged into the most plate-like one, and only
+        the top_k best regions are returned, best first.
+        
         Args:
-            image (np.ndarray): Input image
+            image (np.ndarray | ImageFeatures): Input image
             
         Returns:
             list: List of tuples (region_image, bounding_box)
         """
-        # Convert to grayscale
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        features = ImageFeatures.of(image)
+        image = features.bgr
+        
+        plate_regions = []
+        for (x, y, w, h), _ in self._rank_plate_boxes(features):
+            # Extract the region
+            plate_region = image[y:y+h, x:x+w]
+            plate_regions.append((plate_region, (x, y, w, h)))
+        
+        return plate_regions
+    
+    def _rank_plate_boxes(self, features):
+        """
+        Propose plate boxes, merge overlapping ones and keep the top_k best.
         
-        # Apply Gaussian blur to reduce noise
-        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+        Args:
+            features (ImageFeatures): Input image
+        
+        Returns:
+            list: (bounding_box, candidate score) tuples, best first
+        """
+        boxes = []
+        if self.proposer in ('colour', 'both'):
+            boxes.extend(bbox for bbox, _, _ in propose_colour_regions(features))
+        if self.proposer in ('contour', 'both'):
+            for scale in detection_scales(features.shape, self.detect_max_side, self.detect_levels):
+                boxes.extend(scale_box(bbox, scale, features.shape)
+                             for bbox in self._find_plate_boxes(features.downscaled(scale)))
+        
+        # Spend OCR only on the most plate-like regions; a plate found on several
+        # levels, by both proposers or as border and character block is read once
+        scores = score_candidates(features, boxes)
+        return [(boxes[i], float(scores[i])) for i in non_max_suppression(boxes, scores, max_keep=self.top_k)]
+    
+    def _find_plate_boxes(self, features):
+        """
+        Find plate shaped contours at the resolution of the given image.
+        
+        Args:
+            features (ImageFeatures): Image to search
+            
+        Returns:
+            list: Bounding boxes (x, y, w, h), largest contours first
+        """
+        # Grayscale image with Gaussian blur to reduce noise
+        blurred = features.blurred
         
         # Adaptive binary thresholding
         binary = cv2.adaptiveThreshold(
@@ -256,7 +517,7 @@ class UKPlateRecognizer:
         contours, _ = cv2.findContours(dilated.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         
         # Filter and sort contours
-        plate_regions = []
+        boxes = []
         
         # Sort contours by area, largest first
         contours = sorted(contours, key=cv2.contourArea, reverse=True)[:15]
@@ -275,30 +536,22 @@ class UKPlateRecognizer:
                 # Check aspect ratio for UK license plate
                 aspect_ratio = float(w) / h
                 if 2.0 < aspect_ratio < 7.0:
-                    # Extract the region
-                    plate_region = image[y:y+h, x:x+w]
-                    plate_regions.append((plate_region, (x, y, w, h)))
+                    boxes.append((x, y, w, h))
         
-        return plate_regions
+        return boxes
     
-    def recognize_plate_number(self, plate_image):
+    def prepare_plate_for_ocr(self, plate_image):
         """
-        Recognize the plate number from a plate image.
+        Binarize a plate image and cut away the country identifier section.
         
         Args:
-            plate_image (np.ndarray): License plate image
+            plate_image (np.ndarray | ImageFeatures): License plate image
             
         Returns:
-            str: Recognized plate number
+            np.ndarray: Binary image of the main plate number part
         """
-        # Convert to grayscale
-        gray = cv2.cvtColor(plate_image, cv2.COLOR_BGR2GRAY)
-        
-        # Apply adaptive thresholding
-        binary = cv2.adaptiveThreshold(
-            gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-            cv2.THRESH_BINARY, 11, 2
-        )
+        # Adaptive threshold of the grayscale plate
+        binary = ImageFeatures.of(plate_image).adaptive_binary
         
         h, w = binary.shape
         
@@ -309,58 +562,192 @@ class UKPlateRecognizer:
         kernel = np.ones((2, 2), np.uint8)
         main_plate_part = cv2.morphologyEx(main_plate_part, cv2.MORPH_OPEN, kernel)
         
+        return main_plate_part
+    
+    def batch_recognize_plate_numbers(self, plate_images):
+        """
+        Recognize several plate images with one OCR pass over a tiled page.
+        
+        Args:
+            plate_images (list): License plate images (np.ndarray or ImageFeatures)
+            
+        Returns:
+            list: Formatted plate number per image, or None where the batched
+                  pass did not produce a valid UK plate
+        """
+        return [read['plate_number'] if read else None for read in self.batch_read_plates(plate_images)]
+    
+    def batch_read_plates(self, plate_images):
+        """
+        Read several plate images with one OCR pass, with the evidence for their confidence.
+        
+        Args:
+            plate_images (list): License plate images (np.ndarray or ImageFeatures)
+        
+        Returns:
+            list: Plate read (see _text_read) per image, or None where the batched
+                  pass did not produce a valid UK plate
+        """
+        parts = [self.prepare_plate_for_ocr(plate_image) for plate_image in plate_images]
+        words_per_plate = batch_ocr(self.ocr, parts)
+        
+        reads = []
+        for words in words_per_plate:
+            confidence = sum(float(conf) for _, conf, _ in words) / len(words) if words else 0.0
+            read = self._text_read(''.join(text for text, _, _ in words), confidence)
+            reads.append(read if is_uk_registration(read['plate_number']) else None)
+        
+        return reads
+    
+    def recognize_plate_number(self, plate_image):
+        """
+        Recognize the plate number from a plate image.
+        
+        Args:
+            plate_image (np.ndarray | ImageFeatures): License plate image
+            
+        Returns:
+            str: Recognized plate number
+        """
+        return self.read_plate_number(plate_image)['plate_number']
+    
+    def read_plate_number(self, plate_image):
+        """
+        Read the plate number of a plate image, with the evidence for its confidence.
+        
+        Args:
+            plate_image (np.ndarray | ImageFeatures): License plate image
+        
+        Returns:
+            dict: Plate read (see _text_read); plate_number is "UNKNOWN" if nothing was read
+        """
+        pil_image = self._plate_ocr_image(plate_image)
+        return self._ladder_read(pil_image, lambda config: self._read_choices(pil_image, config))
+    
+    def read_plate_numbers(self, plate_images):
+        """
+        Read several plate images, running their OCR passes concurrently.
+        
+        With ocr_threads > 1, every config of every image is submitted to a
+        bounded thread pool up front, each image's preferred configs first.
+        The results are then taken in the learned config order of each image,
+        exactly as read_plate_number() would, so the outcome does not depend on
+        which pass finishes first. Once an image has a confident plate, its
+        passes that have not started yet are cancelled.
+        
+        Args:
+            plate_images (list): License plate images (np.ndarray or ImageFeatures)
+        
+        Returns:
+            list: Plate read (see _text_read) per image, in input order
+        """
+        if self.ocr_threads <= 1 or len(plate_images) == 0:
+            return [self.read_plate_number(plate_image) for plate_image in plate_images]
+        
+        # Preprocessing and display stay on the calling thread
+        pil_images = [self._plate_ocr_image(plate_image) for plate_image in plate_images]
+        executor = self._get_ocr_executor()
+        
+        passes = [{} for _ in pil_images]
+        for config in self.plate_ladder.ordered():
+            for image_passes, pil_image in zip(passes, pil_images):
+                # Each pass runs in a copy of the caller's context, so its OCR calls
+                # and log records are attributed to the request being processed
+                image_passes[config] = executor.submit(
+                    contextvars.copy_context().run, self._read_choices, pil_image, config
+                )
+        
+        reads = []
+        try:
+            for pil_image, image_passes in zip(pil_images, passes):
+                reads.append(self._ladder_read(pil_image, lambda config, p=image_passes: p[config].result()))
+                # Configs after the accepted one are not needed
+                for future in image_passes.values():
+                    future.cancel()
+        finally:
+            for image_passes in passes:
+                for future in image_passes.values():
+                    future.cancel()
+        return reads
+    
+    def _get_ocr_executor(self):
+        """Return the OCR thread pool, starting it on first use."""
+        with self._ocr_executor_lock:
+            if self._ocr_executor is None:
+                self._ocr_executor = ThreadPoolExecutor(max_workers=self.ocr_threads,
+                                                        thread_name_prefix='anpr-ocr')
+            return self._ocr_executor
+    
+    def close(self):
+        """Stop the OCR threads, cancelling the passes that have not started yet."""
+        with self._ocr_executor_lock:
+            executor, self._ocr_executor = self._ocr_executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+    
+    def _plate_ocr_image(self, plate_image):
+        """
+        Prepare a plate image for OCR.
+        
+        Args:
+            plate_image (np.ndarray | ImageFeatures): License plate image
+        
+        Returns:
+            PIL.Image.Image: Binarized main plate part
+        """
+        plate_image = ImageFeatures.of(plate_image)
+        main_plate_part = self.prepare_plate_for_ocr(plate_image)
+        
         # Display processed plate part
-        cv2.imshow("Main Plate Part", main_plate_part)
+        self._show("Main Plate Part", main_plate_part)
         
         # Convert to PIL image for OCR
-        pil_image = Image.fromarray(main_plate_part)
-        
-        # Try multiple OCR configurations
-        configs = [
-            '--psm 7 -l eng --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789',
-            '--psm 8 -l eng --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789',
-            '--psm 6 -l eng --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789',
-            '--psm 13 -l eng --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
-        ]
-        
-        all_texts = []
-        confidences = []
-        
-        for config in configs:
-            # Get detailed OCR data
-            ocr_data = pytesseract.image_to_data(
-                pil_image, config=config, output_type=pytesseract.Output.DICT
-            )
-            
-            # Process OCR results
-            for i, conf in enumerate(ocr_data['conf']):
-                if conf > 0:  # Only consider results with confidence > 0
-                    text = ocr_data['text'][i]
-                    if text and text.strip():
-                        formatted = self.format_uk_plate(text)
-                        all_texts.append(formatted)
-                        confidences.append(float(conf))
+        return Image.fromarray(main_plate_part)
+    
+    def _read_choices(self, pil_image, config):
+        """Run one OCR pass over a prepared plate image and decode its character alternatives."""
+        return self._decode_choices(self.ocr.image_to_choices(pil_image, config=config))
+    
+    def _ladder_read(self, pil_image, read_config):
+        """
+        Pick the plate of a prepared plate image from its OCR passes.
+        
+        Args:
+            pil_image (PIL.Image.Image): Output of _plate_ocr_image()
+            read_config (callable): Returns the plate read of one OCR config
+        
+        Returns:
+            dict: Plate read (see _text_read); plate_number is "UNKNOWN" if nothing was read
+        """
+        # Try OCR configurations in learned order, stopping at the first confident plate;
+        # each pass is decoded over its per-character alternatives, so a single wrong
+        # character is corrected from the same pass instead of by the next config
+        reads = []
+        def attempt(config):
+            read = read_config(config)
+            reads.append(read)
+            return read['plate_number'], read['ocr_confidence']
+        
+        best_text, best_confidence, _, _ = self.plate_ladder.run(attempt, self._is_confident_plate)
         
         # Check if there are any results
-        if not all_texts:
+        if best_text is None:
             # If none, try direct OCR
-            text = pytesseract.image_to_string(
+            text = self.ocr.image_to_string(
                 pil_image, 
                 config='--psm 7 -l eng --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
             ).strip()
             
+            # image_to_string reports no confidence
             if text:
-                return self.format_uk_plate(text)
-                
-            # If it looks clearly like a UK plate, use preset value
-            if self.is_clearly_uk_plate(plate_image):
-                return "AA03 BOJ"
-                
-            return "UNKNOWN"
+                return self._text_read(text, 0.0)
+            
+            return {'plate_number': "UNKNOWN", 'ocr_confidence': 0.0, 'grammar_cost': None, 'agreement': 0.0}
         
-        # Get best text based on confidence
-        max_idx = confidences.index(max(confidences))
-        return all_texts[max_idx]
+        # Best text based on confidence
+        best = next(read for read in reads
+                    if read['plate_number'] == best_text and read['ocr_confidence'] == best_confidence)
+        return dict(best, agreement=self._agreement([read['plate_number'] for read in reads], best_text))
     
     def detect_country_identifier(self, plate_image):
         """
@@ -368,48 +755,42 @@ class UKPlateRecognizer:
         Specifically looking for blue EU flag section and GB text.
         
         Args:
-            plate_image (np.ndarray): License plate image
+            plate_image (np.ndarray | ImageFeatures): License plate image
             
         Returns:
             str: Detected country identifier (e.g., "GB", "EU", "UNKNOWN")
         """
-        h, w = plate_image.shape[:2]
+        features = ImageFeatures.of(plate_image)
+        h, w = features.shape[:2]
         
         # If image is too small, resize it
         if w < 100:
-            scale_factor = 200.0 / w
-            plate_image = cv2.resize(plate_image, None, fx=scale_factor, fy=scale_factor, interpolation=cv2.INTER_CUBIC)
-            h, w = plate_image.shape[:2]
+            features = features.resized(200.0 / w)
+            h, w = features.shape[:2]
         
         # Extract left part (country identifier section)
         # Usually leftmost ~15% of a UK plate
-        left_part = plate_image[:, 0:int(w*0.18)]
+        band_width = int(w*0.18)
+        left_part = features.bgr[:, 0:band_width]
         
         # Display country identifier part
-        cv2.imshow("Country Identifier Part", left_part)
-        
-        # Look for blue color (EU flag background)
-        hsv = cv2.cvtColor(left_part, cv2.COLOR_BGR2HSV)
+        self._show("Country Identifier Part", left_part)
         
-        # Define HSV range for blue
-        # Adjust these ranges based on the specific blue of EU flag
-        lower_blue = np.array([100, 50, 50])
-        upper_blue = np.array([130, 255, 255])
-        
-        # Threshold HSV image to get only blue colors
-        blue_mask = cv2.inRange(hsv, lower_blue, upper_blue)
+        # Look for blue color (EU flag background); masks are sliced from
+        # the plate's own maps, which other stages reuse
+        blue_mask = features.blue_mask[:, 0:band_width]
         
         # Calculate percentage of blue pixels
         blue_percentage = (np.sum(blue_mask > 0) / (blue_mask.size)) * 100
         
         # Display blue mask
-        cv2.imshow("Blue Mask", blue_mask)
+        self._show("Blue Mask", blue_mask)
         
         # If significant blue area detected, likely an EU flag
         if blue_percentage > 10:  # At least 10% blue
             # Now look for "GB" text
-            # Convert to grayscale for text detection
-            gray = cv2.cvtColor(left_part, cv2.COLOR_BGR2GRAY)
+            # Grayscale for text detection
+            gray = features.gray[:, 0:band_width]
             
             # Threshold to isolate text
             _, thresh = cv2.threshold(gray, 180, 255, cv2.THRESH_BINARY)
@@ -418,38 +799,36 @@ class UKPlateRecognizer:
             kernel = np.ones((2, 2), np.uint8)
             text_enhanced = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel)
             
-            cv2.imshow("GB Text Detection", text_enhanced)
+            self._show("GB Text Detection", text_enhanced)
             
             # Use OCR to find GB text
-            text = pytesseract.image_to_string(
+            text = self.ocr.image_to_string(
                 text_enhanced, 
                 config='--psm 10 -l eng --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ'
             )
             
             # If "GB" detected
             if 'GB' in text:
-                print("GB identifier detected!")
+                diagnostic(log, "GB identifier detected", method='band_ocr')
                 return "GB"
             
             # Extra attempt: use simpler OCR config on original image
-            simple_text = pytesseract.image_to_string(
+            simple_text = self.ocr.image_to_string(
                 left_part,
                 config='--psm 10 -l eng --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ'
             )
             
             if 'GB' in simple_text:
-                print("GB identifier detected with simple OCR!")
+                diagnostic(log, "GB identifier detected", method='simple_ocr')
                 return "GB"
             
             # If sample is typical UK plate with bright "GB", preset to GB
             # Threshold for white text areas
-            lower_white = np.array([0, 0, 180])
-            upper_white = np.array([180, 30, 255])
-            white_mask = cv2.inRange(hsv, lower_white, upper_white)
+            white_mask = features.white_mask[:, 0:band_width]
             white_percentage = (np.sum(white_mask > 0) / (white_mask.size)) * 100
             
             if white_percentage > 5 and blue_percentage > 20:
-                print("Visual pattern suggests GB identifier!")
+                diagnostic(log, "GB identifier detected", method='visual_pattern')
                 return "GB"
                 
             # EU flag detected but no GB text
@@ -462,36 +841,29 @@ class UKPlateRecognizer:
         """
         Format recognized text as a UK license plate if possible.
         
+        The registration grammar decides per position whether an ambiguous
+        glyph (O/0, I/1, S/5, B/8, Z/2) is a letter or a digit.
+        
         Args:
             text (str): Recognized text
             
         Returns:
-            str: Formatted UK plate or original text
+            str: Formatted UK plate or the cleaned text
         """
-        # Remove non-alphanumeric characters
-        clean_text = ''.join(c for c in text if c.isalnum()).upper()
-        
-        # Some potential OCR error corrections
-        clean_text = clean_text.replace('O', '0')  # Often letter O is misrecognized as number 0
-        clean_text = clean_text.replace('I', '1')  # Often letter I is misrecognized as number 1
-        
-        # Specific conversion for AA03 BOJ
-        if re.search(r'AA[O0]3.*B[O0]J', clean_text):
-            return "AA03 BOJ"
-        
-        # Look for UK plate pattern (e.g., AA00AAA or AA00 AAA)
-        if len(clean_text) >= 7:
-            # Try to extract UK plate format
-            for i in range(len(clean_text) - 6):
-                candidate = clean_text[i:i+7]
-                if re.match(r'^[A-Z]{2}\d{2}[A-Z]{3}$', candidate):
-                    return f"{candidate[:2]}{candidate[2:4]} {candidate[4:]}"
-        
-        # If specific pattern not found but length is 7, still format as UK plate
-        if len(clean_text) == 7:
-            return f"{clean_text[:2]}{clean_text[2:4]} {clean_text[4:]}"
-        
-        return clean_text
+        return format_registration(text)
+
+def build_uk_pipeline(**kwargs):
+    """
+    Create the 'uk' pipeline configuration.
+    
+    Args:
+        **kwargs: UKPlateRecognizer options (headless by default)
+    
+    Returns:
+        Pipeline: Pipeline of a new recognizer
+    """
+    kwargs.setdefault('headless', True)
+    return UKPlateRecognizer(**kwargs).pipeline
 
 def main():
     """Main function to test the UK plate recognizer."""
@@ -499,10 +871,12 @@ def main():
         print("Usage: python uk_plate_recognizer.py <image_path>")
         sys.exit(1)
     
+    configure_logging()
     image_path = sys.argv[1]
     recognizer = UKPlateRecognizer()
     
     results = recognizer.process_image(image_path)
+    recognizer.close()
     
     if results:
         print("\nRecognition Results:")
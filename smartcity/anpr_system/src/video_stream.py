@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Continuous ANPR on video files and camera feeds.
+
+Frames are read from a cv2.VideoCapture source, filtered by an optional
+motion gate and passed to a UKPlateRecognizer. When recognition is slower
+than the source frame rate, frames are skipped (grabbed without decoding)
+so that the stream keeps up in real time.
+"""
+
+import argparse
+import time
+from typing import Callable, Dict, Iterator, Optional, Union
+
+import cv2
+
+from motion_gate import MotionGate
+from uk_plate_recognizer import UKPlateRecognizer
+
+
+class StreamStats:
+    """Throughput and dropped-frame counters of one stream."""
+
+    def __init__(self):
+        """Initialize all counters to zero."""
+        self.frames_read = 0
+        self.frames_processed = 0
+        self.frames_dropped = 0
+        self.frames_static = 0
+        self.plates_emitted = 0
+        self.processing_seconds = 0.0
+        self.started_at = time.monotonic()
+
+    def as_dict(self) -> Dict[str, float]:
+        """
+        Summarize the counters.
+
+        Returns:
+            Dict[str, float]: Counters plus processed frames per second
+                and mean processing time per frame
+        """
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        processed = max(self.frames_processed, 1)
+        return {
+            'frames_read': self.frames_read,
+            'frames_processed': self.frames_processed,
+            'frames_dropped': self.frames_dropped,
+            'frames_static': self.frames_static,
+            'plates_emitted': self.plates_emitted,
+            'processed_fps': self.frames_processed / elapsed,
+            'mean_processing_ms': 1000.0 * self.processing_seconds / processed
+        }
+
+
+class VideoStreamRecognizer:
+    """
+    Runs plate recognition over a video stream and emits plate events.
+
+    Each event is a dictionary with the plate number, country identifier,
+    bounding box, frame index and stream timestamp. The same plate is only
+    reported again after `repeat_after` seconds, so a car waiting at a gate
+    produces one event instead of one per frame.
+    """
+
+    def __init__(self, source: Union[int, str, cv2.VideoCapture],
+                 recognizer: Optional[UKPlateRecognizer] = None,
+                 realtime: bool = True, frame_stride: int = 1, max_skip: int = 30,
+                 repeat_after: float = 10.0, motion_gate: Optional[MotionGate] = None):
+        """
+        Initialize the stream recognizer.
+
+        Args:
+            source: Camera index, video file path / stream URL, or an open VideoCapture
+                (or any object with its read, grab, get and release methods)
+            recognizer (Optional[UKPlateRecognizer]): Recognizer to use (headless by default)
+            realtime (bool): Skip frames to keep up with the source frame rate
+            frame_stride (int): Process at most every n-th frame
+            max_skip (int): Maximum frames skipped after one processed frame
+            repeat_after (float): Seconds before the same plate is reported again
+            motion_gate (Optional[MotionGate]): Gate that skips frames without
+                motion in the lane; every frame is processed if None
+        """
+        self.capture = cv2.VideoCapture(source) if isinstance(source, (int, str)) else source
+        self.recognizer = recognizer or UKPlateRecognizer(headless=True)
+        self._owns_recognizer = recognizer is None
+        self.realtime = realtime
+        self.frame_stride = max(1, frame_stride)
+        self.max_skip = max_skip
+        self.repeat_after = repeat_after
+        self.motion_gate = motion_gate
+        self.stats = StreamStats()
+        self._running = False
+        # Stream timestamp each plate was last seen at, least recently seen first
+        self._last_seen = {}
+
+        # Files report their frame rate; live sources may report 0
+        fps = self.capture.get(cv2.CAP_PROP_FPS)
+        self.source_fps = fps if fps and fps > 0 else 25.0
+
+    def _frames_to_skip(self, processing_seconds: float) -> int:
+        """
+        Work out how many frames to drop after a processed frame.
+
+        Args:
+            processing_seconds (float): Time spent on the processed frame
+
+        Returns:
+            int: Number of frames to skip
+        """
+        skip = self.frame_stride - 1
+        if self.realtime:
+            # Frames that arrived while this one was being processed
+            behind = int(processing_seconds * self.source_fps) - 1
+            skip = max(skip, behind)
+        return min(skip, self.max_skip)
+
+    def _new_events(self, results: Optional[dict], frame_index: int) -> list:
+        """Convert recognition results into events, suppressing recent repeats."""
+        events = []
+        timestamp = frame_index / self.source_fps
+
+        # Plates not seen within the window would be reported anew anyway; dropping them
+        # keeps the table to the plates in view on a stream that runs for weeks
+        while self._last_seen:
+            plate_number, last = next(iter(self._last_seen.items()))
+            if timestamp - last < self.repeat_after:
+                break
+            del self._last_seen[plate_number]
+
+        for data in (results or {}).values():
+            plate_number = data['plate_number']
+            if not plate_number or plate_number == "UNKNOWN":
+                continue
+
+            # Re-inserted so the table stays ordered by last sighting
+            last = self._last_seen.pop(plate_number, None)
+            self._last_seen[plate_number] = timestamp
+            if last is not None and timestamp - last < self.repeat_after:
+                continue
+
+            events.append({
+                'plate_number': plate_number,
+                'country_identifier': data['country_identifier'],
+                'bbox': data['bbox'],
+                'frame_index': frame_index,
+                'timestamp': timestamp
+            })
+
+        return events
+
+    def events(self) -> Iterator[dict]:
+        """
+        Read the stream and yield plate events until it ends or stop() is called.
+
+        Yields:
+            dict: Plate event
+        """
+        self._running = True
+        frame_index = -1
+
+        while self._running:
+            ok, frame = self.capture.read()
+            if not ok:
+                break
+            frame_index += 1
+            self.stats.frames_read += 1
+
+            # Static frames skip detection entirely
+            if self.motion_gate is not None and not self.motion_gate.check(frame):
+                self.stats.frames_static += 1
+                continue
+
+            start = time.perf_counter()
+            results = self.recognizer.process_image(frame)
+            elapsed = time.perf_counter() - start
+
+            self.stats.frames_processed += 1
+            self.stats.processing_seconds += elapsed
+
+            for event in self._new_events(results, frame_index):
+                self.stats.plates_emitted += 1
+                yield event
+
+            # Drop frames without decoding them to catch up with the source
+            for _ in range(self._frames_to_skip(elapsed)):
+                if not self.capture.grab():
+                    self._running = False
+                    break
+                frame_index += 1
+                self.stats.frames_read += 1
+                self.stats.frames_dropped += 1
+
+        self._running = False
+
+    def run(self, callback: Callable[[dict], None]) -> Dict[str, float]:
+        """
+        Process the whole stream, calling callback for every plate event.
+
+        Args:
+            callback (Callable[[dict], None]): Function receiving each event
+
+        Returns:
+            Dict[str, float]: Final stream statistics
+        """
+        for event in self.events():
+            callback(event)
+        return self.stats.as_dict()
+
+    def stop(self) -> None:
+        """Stop reading after the current frame."""
+        self._running = False
+
+    def release(self) -> None:
+        """Release the capture source, and the recognizer if the stream created it."""
+        self.capture.release()
+        if self._owns_recognizer:
+            self.recognizer.close()
+
+
+def main():
+    """Run stream recognition from the command line and print plate events."""
+    parser = argparse.ArgumentParser(description="Continuous ANPR on a video file or camera")
+    parser.add_argument("source", help="Video file, stream URL or camera index")
+    parser.add_argument("--stride", type=int, default=1, help="Process at most every n-th frame")
+    parser.add_argument("--max-skip", type=int, default=30, help="Maximum frames skipped in a row")
+    parser.add_argument("--no-realtime", action="store_true", help="Do not skip frames to keep up")
+    parser.add_argument("--no-motion-gate", action="store_true", help="Run detection on static frames too")
+    args = parser.parse_args()
+
+    source = int(args.source) if args.source.isdigit() else args.source
+    stream = VideoStreamRecognizer(source, realtime=not args.no_realtime,
+                                   frame_stride=args.stride, max_skip=args.max_skip,
+                                   motion_gate=None if args.no_motion_gate else MotionGate())
+
+    def print_event(event):
+        print(f"[{event['timestamp']:8.2f}s] frame {event['frame_index']}: "
+              f"{event['plate_number']} ({event['country_identifier']})")
+
+    try:
+        stats = stream.run(print_event)
+    except KeyboardInterrupt:
+        stats = stream.stats.as_dict()
+    finally:
+        stream.release()
+
+    print("\nStream statistics:")
+    for key, value in stats.items():
+        print(f"  {key}: {value:.2f}" if isinstance(value, float) else f"  {key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
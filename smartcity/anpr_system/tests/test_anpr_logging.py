@@ -0,0 +1,21 @@
+import io
+import json
+from src.anpr_logging import configure_logging, diagnostic, get_logger, request_context, shutdown_logging
+
+def test_records_carry_request_id_and_diagnostics_are_sampled():
+    """Test correlation IDs in JSON records and that diagnostics only appear for sampled requests."""
+    stream = io.StringIO()
+    configure_logging('INFO', 'json', stream=stream)
+    log = get_logger('test')
+
+    with request_context('req-1', sampled=False):
+        log.info("Recognized %s", 'AB12 CDE', extra={'confidence': 0.9})
+        diagnostic(log, "OCR text %s", 'AB12CDE')
+    with request_context('req-2', sampled=True):
+        diagnostic(log, "OCR text %s", 'XY34ZZZ')
+    shutdown_logging()
+
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [(r['request_id'], r['message']) for r in records] == [
+        ('req-1', 'Recognized AB12 CDE'), ('req-2', 'OCR text XY34ZZZ')]
+    assert records[0]['confidence'] == 0.9
@@ -0,0 +1,173 @@
+import io
+import json
+import os
+import sys
+import threading
+import zipfile
+from concurrent.futures import TimeoutError
+
+import pytest
+from src.recognition_pool import ImageDecodeError
+from src.result_cache import RecognitionCache, content_hash
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'web_interface'))
+import api_server
+
+def read_plate(image):
+    """Recognition result of a fake image whose bytes are its plate number."""
+    return {'plate_0': {'plate_number': image.decode(), 'country_identifier': 'UK', 'confidence': 0.9}}
+
+class FakePool:
+    """Recognition pool reading fake images, finishing batch jobs in reverse order."""
+
+    def __init__(self):
+        self.images = []
+
+    def recognize(self, image, timeout=None):
+        self.images.append(image)
+        if image == b'SLOW':
+            raise TimeoutError()
+        if image == b'BAD':
+            raise ImageDecodeError("Could not decode image")
+        return read_plate(image)
+
+    def recognize_many(self, images, timeout=None):
+        images = list(images)
+        self.images.extend(images)
+        for index in reversed(range(len(images))):
+            if images[index] == b'BAD':
+                yield index, None, ImageDecodeError("Could not decode image")
+            else:
+                yield index, read_plate(images[index]), None
+
+@pytest.fixture
+def client(monkeypatch):
+    """Test client of the API server with a fake pool and an empty cache."""
+    pool = FakePool()
+    monkeypatch.setattr(api_server, '_pool', pool)
+    monkeypatch.setattr(api_server, 'recognition_cache', RecognitionCache())
+    test_client = api_server.app.test_client()
+    test_client.pool = pool
+    return test_client
+
+def post_images(client, images, query=''):
+    """Post images as repeated multipart 'images' fields."""
+    files = [(io.BytesIO(data), f"{i}.jpg") for i, data in enumerate(images)]
+    return client.post('/api/anpr-process-batch' + query, data={'images': files},
+                       content_type='multipart/form-data')
+
+def make_archive(members):
+    """Zip (name, bytes) members in order."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, data in members:
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+def test_single_image_errors(client):
+    """Test that undecodable images answer 400 and recognition timeouts 504."""
+    def post(data):
+        return client.post('/api/anpr-process', data={'image': (io.BytesIO(data), 'plate.jpg')},
+                           content_type='multipart/form-data')
+
+    assert post(b'AB12 CDE').get_json()['plate_number'] == 'AB12 CDE'
+    assert post(b'BAD').status_code == 400
+    assert post(b'SLOW').status_code == 504
+    # The encoded upload is sent to the pool as it is
+    assert client.pool.images == [b'AB12 CDE', b'BAD', b'SLOW']
+
+def test_batch_results_are_in_upload_order_and_cached(client):
+    """Test that duplicates are recognized once and a repeated batch is answered from the cache."""
+    response = post_images(client, [b'AB12 CDE', b'ZK09 KXO', b'AB12 CDE', b'BAD'])
+    results = response.get_json()['results']
+    assert [item['plate_number'] for item in results] == ['AB12 CDE', 'ZK09 KXO', 'AB12 CDE', 'ERROR']
+    assert [item['filename'] for item in results] == ['0.jpg', '1.jpg', '2.jpg', '3.jpg']
+    assert client.pool.images == [b'AB12 CDE', b'ZK09 KXO', b'BAD']
+
+    client.pool.images = []
+    response = post_images(client, [b'ZK09 KXO', b'AB12 CDE'])
+    assert [item['plate_number'] for item in response.get_json()['results']] == ['ZK09 KXO', 'AB12 CDE']
+    assert client.pool.images == []
+
+def test_batch_archive_takes_images_in_archive_order(client):
+    """Test that the image members of a zip archive are recognized and other members skipped."""
+    archive = make_archive([('cars/', b''), ('cars/b.png', b'ZK09 KXO'), ('notes.txt', b'AB12 CDF'),
+                            ('cars/a.JPG', b'AB12 CDE')])
+    response = client.post('/api/anpr-process-batch', data={'archive': (io.BytesIO(archive), 'cars.zip')},
+                           content_type='multipart/form-data')
+    results = response.get_json()['results']
+    assert [(item['filename'], item['plate_number']) for item in results] == [
+        ('cars/b.png', 'ZK09 KXO'), ('cars/a.JPG', 'AB12 CDE')
+    ]
+
+def test_oversized_uploads_are_rejected(client, monkeypatch):
+    """Test that large bodies, expanding archives and too many images answer 413."""
+    monkeypatch.setitem(api_server.app.config, 'MAX_CONTENT_LENGTH', 1024)
+    response = post_images(client, [b'A' * 2048])
+    assert response.status_code == 413 and 'error' in response.get_json()
+    monkeypatch.setitem(api_server.app.config, 'MAX_CONTENT_LENGTH', 1024 * 1024)
+
+    # Compresses to a few hundred bytes, expands past the archive limit
+    monkeypatch.setattr(api_server, 'BATCH_MAX_ARCHIVE_BYTES', 100000)
+    archive = make_archive([(f"{i}.jpg", b'\0' * 60000) for i in range(2)])
+    response = client.post('/api/anpr-process-batch', data={'archive': (io.BytesIO(archive), 'bomb.zip')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 413
+    assert client.pool.images == []
+
+    monkeypatch.setattr(api_server, 'BATCH_MAX_IMAGES', 2)
+    assert post_images(client, [b'AB12 CDE', b'AB12 CDF', b'AB12 CDG']).status_code == 413
+
+def test_batch_streams_ndjson_in_completion_order(client):
+    """Test that ?stream=1 writes one JSON line per image as it completes."""
+    response = post_images(client, [b'AB12 CDE', b'ZK09 KXO', b'AB12 CDF'], query='?stream=1')
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [(line['index'], line['plate_number']) for line in lines] == [
+        (2, 'AB12 CDF'), (1, 'ZK09 KXO'), (0, 'AB12 CDE')
+    ]
+
+def test_batch_of_cached_images_does_not_start_the_pool(client, monkeypatch):
+    """Test that a batch answered entirely from the cache never asks for the recognition pool."""
+    for data in (b'AB12 CDE', b'ZK09 KXO'):
+        api_server.recognition_cache.put(content_hash(data), read_plate(data))
+
+    def no_pool():
+        raise AssertionError("pool started")
+
+    monkeypatch.setattr(api_server, 'get_recognition_pool', no_pool)
+    response = post_images(client, [b'ZK09 KXO', b'AB12 CDE'])
+    assert [item['plate_number'] for item in response.get_json()['results']] == ['ZK09 KXO', 'AB12 CDE']
+
+class ObservedCache(RecognitionCache):
+    """Recognition cache signalling every claim."""
+
+    def __init__(self):
+        super().__init__()
+        self.claimed = threading.Event()
+
+    def claim(self, key):
+        outcome = super().claim(key)
+        self.claimed.set()
+        return outcome
+
+def test_batch_waits_for_images_in_flight_elsewhere(client, monkeypatch):
+    """Test that an image another request is recognizing is waited for instead of recognized again."""
+    cache = ObservedCache()
+    monkeypatch.setattr(api_server, 'recognition_cache', cache)
+    key = content_hash(b'AB12 CDE')
+    # Another request owns the image
+    assert cache.claim(key) == (False, None, None)
+    cache.claimed.clear()
+
+    responses = []
+    thread = threading.Thread(target=lambda: responses.append(post_images(client, [b'AB12 CDE', b'ZK09 KXO'])))
+    thread.start()
+    assert cache.claimed.wait(5)
+    cache.complete(key, read_plate(b'AB12 CDE'))
+    thread.join(5)
+
+    results = responses[0].get_json()['results']
+    assert [item['plate_number'] for item in results] == ['AB12 CDE', 'ZK09 KXO']
+    assert client.pool.images == [b'ZK09 KXO']
+    assert cache.stats()['coalesced'] == 1
@@ -0,0 +1,22 @@
+from src.benchmark import character_error_rate, compare_to_baseline, label_from_filename, levenshtein
+
+def make_report(exact_match, cer, p95, ocr_calls):
+    """Create a one-recognizer benchmark report."""
+    return {'recognizers': {'uk': {'exact_match': exact_match, 'cer': cer,
+                                   'latency_ms': {'p95': p95}, 'ocr_calls_per_image': ocr_calls}}}
+
+def test_labels_and_error_rate():
+    """Test label parsing from filenames and the character error rate."""
+    assert label_from_filename('data/AA03BOJ.png') == 'AA03BOJ'
+    assert label_from_filename('/tmp/AB12CDE_00042.png') == 'AB12CDE'
+    assert levenshtein('ZK09KX0', 'ZK09KXO') == 1
+    assert character_error_rate('', 'AB12CDE') == 1.0
+
+def test_regressions_against_baseline():
+    """Test that drops beyond the thresholds are reported and others are not."""
+    baseline = make_report(0.9, 0.05, 100.0, 4.0)
+
+    assert compare_to_baseline(make_report(0.9, 0.05, 110.0, 4.0), baseline) == []
+    regressions = compare_to_baseline(make_report(0.8, 0.10, 200.0, 6.0), baseline,
+                                      max_accuracy_drop=0.05)
+    assert len(regressions) == 4
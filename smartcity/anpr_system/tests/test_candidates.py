@@ -0,0 +1,43 @@
+import numpy as np
+from src.candidates import count_character_components, non_max_suppression, score_candidates
+from src.image_features import ImageFeatures
+from src.synthetic_plates import PLATE_HEIGHT, PLATE_WIDTH, WHITE_PLATE, render_plate
+
+PLATE = (400, 600, PLATE_WIDTH, PLATE_HEIGHT)
+PANEL = (100, 100, 450, 100)
+NOISE = (800, 100, 400, 90)
+
+def make_scene():
+    """Create a scene with a white plate, a plain panel and a patch of noise, all of plate shape."""
+    rng = np.random.default_rng(0)
+    scene = np.full((960, 1280, 3), 90, dtype=np.uint8)
+    scene[600:600+PLATE_HEIGHT, 400:400+PLATE_WIDTH] = render_plate('AB12 CDE', WHITE_PLATE, None)
+    scene[100:200, 100:550] = 200
+    scene[100:190, 800:1200] = rng.integers(0, 256, size=(90, 400, 3), dtype=np.uint8)
+    return scene
+
+def test_plate_outscores_plate_shaped_distractors():
+    """Test that the plate ranks first among candidates of plate shape."""
+    scene = make_scene()
+    scores = score_candidates(scene, [PANEL, NOISE, PLATE])
+
+    assert count_character_components(ImageFeatures(scene).crop(*PLATE)) == 7
+    assert non_max_suppression([PANEL, NOISE, PLATE], scores, max_keep=1) == [2]
+    assert non_max_suppression([PANEL, NOISE, PLATE], scores)[0] == 2
+    assert len(score_candidates(scene, [])) == 0
+
+def test_non_max_suppression_merges_duplicates():
+    """Test that overlapping and nested boxes of one plate collapse onto the best scored one."""
+    boxes = [
+        (100, 100, 200, 44),    # plate border
+        (110, 104, 200, 40),    # same plate found at another pyramid level
+        (140, 110, 110, 26),    # character block inside the border
+        (500, 300, 200, 44),    # second plate
+        (290, 100, 100, 44)     # touches the first plate only slightly
+    ]
+    scores = np.array([0.7, 0.9, 0.6, 0.5, 0.4])
+
+    assert non_max_suppression(boxes, scores) == [1, 3, 4]
+    assert non_max_suppression(boxes, scores, max_keep=2) == [1, 3]
+    assert non_max_suppression(boxes, scores, containment_threshold=1.0) == [1, 2, 3, 4]
+    assert non_max_suppression([], np.zeros(0)) == []
@@ -0,0 +1,29 @@
+import numpy as np
+from src.colour_proposer import propose_colour_regions
+from src.synthetic_plates import PLATE_HEIGHT, PLATE_WIDTH, YELLOW_PLATE, render_plate
+
+def box_iou(a, b):
+    """Intersection over union of two (x, y, w, h) boxes."""
+    ix = max(0, min(a[0] + a[2], b[0] + b[2]) - max(a[0], b[0]))
+    iy = max(0, min(a[1] + a[3], b[1] + b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    return inter / float(a[2] * a[3] + b[2] * b[3] - inter)
+
+def make_scene():
+    """Create a 1280 x 960 grey scene with a yellow plate and a plain yellow panel."""
+    scene = np.full((960, 1280, 3), 90, dtype=np.uint8)
+    scene[600:600+PLATE_HEIGHT, 400:400+PLATE_WIDTH] = render_plate('AB12 CDE', YELLOW_PLATE, 'GB')
+    # Plate shaped but without characters, e.g. a painted bumper strip
+    scene[100:200, 100:550] = YELLOW_PLATE
+    return scene
+
+def test_yellow_plate_is_proposed_first():
+    """Test that the plate is the best proposal, band included, at full resolution."""
+    proposals = propose_colour_regions(make_scene())
+
+    assert proposals
+    bbox, score, colour = proposals[0]
+    assert colour == 'yellow'
+    assert box_iou(bbox, (400, 600, PLATE_WIDTH, PLATE_HEIGHT)) > 0.8
+    assert all(box_iou(other, (100, 100, 450, 100)) < 0.5 for other, _, _ in proposals)
+    assert [p[1] for p in proposals] == sorted((p[1] for p in proposals), reverse=True)
@@ -0,0 +1,51 @@
+import json
+
+import numpy as np
+import pytest
+from src.confidence import (DEFAULT_CALIBRATION, confidence_features, expected_calibration_error,
+                            fit_calibration, load_calibration, plate_confidence)
+
+def test_confidence_follows_the_evidence():
+    """Test that each kind of evidence raises the confidence of a read."""
+    strong = confidence_features(92.0, 0.0, 0.9, 1.0)
+    assert strong == {'ocr': 0.92, 'grammar': 1.0, 'candidate': 0.9, 'agreement': 1.0}
+    assert plate_confidence(strong, DEFAULT_CALIBRATION) > 0.9
+
+    weaker = [
+        confidence_features(40.0, 0.0, 0.9, 1.0),
+        confidence_features(92.0, 1.0, 0.9, 1.0),
+        confidence_features(92.0, None, 0.9, 1.0),
+        confidence_features(92.0, 0.0, 0.2, 1.0),
+        confidence_features(92.0, 0.0, 0.9, 0.5)
+    ]
+    for features in weaker:
+        assert plate_confidence(features, DEFAULT_CALIBRATION) < plate_confidence(strong, DEFAULT_CALIBRATION)
+
+    # A filename guess: valid grammar but no OCR pass behind it
+    assert plate_confidence(confidence_features(0.0, 0.0, 0.5, 0.0), DEFAULT_CALIBRATION) < 0.2
+
+def test_fit_calibration_matches_observed_accuracy():
+    """Test that a fitted model states the accuracy it is observed to have."""
+    rng = np.random.default_rng(0)
+    features = [confidence_features(rng.uniform(20, 100), rng.choice([0.0, 0.5, None]),
+                                    rng.uniform(), rng.choice([0.5, 1.0])) for _ in range(2000)]
+    true_model = {'intercept': -4.0, 'weights': {'ocr': 3.0, 'grammar': 2.5, 'candidate': 1.0, 'agreement': 1.0}}
+    correct = [rng.uniform() < plate_confidence(f, true_model) for f in features]
+
+    calibration = fit_calibration(features, correct)
+    assert calibration['samples'] == 2000
+    assert calibration['weights']['ocr'] > 1.0 and calibration['weights']['grammar'] > 1.0
+
+    before = expected_calibration_error([plate_confidence(f, DEFAULT_CALIBRATION) for f in features], correct)
+    after = expected_calibration_error([plate_confidence(f, calibration) for f in features], correct)
+    assert after < 0.05 < before
+
+def test_load_calibration(tmp_path):
+    """Test that fitted coefficients load from JSON and incomplete ones are rejected."""
+    path = tmp_path / 'calibration.json'
+    path.write_text(json.dumps(DEFAULT_CALIBRATION))
+    assert load_calibration(str(path)) == DEFAULT_CALIBRATION
+
+    path.write_text(json.dumps({'intercept': 0.0, 'weights': {'ocr': 1.0}}))
+    with pytest.raises(ValueError):
+        load_calibration(str(path))
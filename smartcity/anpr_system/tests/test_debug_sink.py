@@ -0,0 +1,43 @@
+import random
+
+import cv2
+import numpy as np
+from src.debug_sink import AsyncDebugSink, DebugSink
+
+def test_sample_rate_sets_the_share_of_captured_requests(tmp_path):
+    """Test that about sample_rate of the requests are captured, none at 0 and all at 1."""
+    random.seed(0)
+    sink = AsyncDebugSink(str(tmp_path), sample_rate=0.25)
+    captured = [sink.start_frame() for _ in range(4000)]
+    assert 900 < sum(frame_id is not None for frame_id in captured) < 1100
+    sink.close()
+
+    never, always = AsyncDebugSink(str(tmp_path), sample_rate=0.0), AsyncDebugSink(str(tmp_path), sample_rate=1.0)
+    assert all(never.start_frame() is None for _ in range(100))
+    assert len({always.start_frame() for _ in range(100)}) == 100
+    never.close()
+    always.close()
+    assert DebugSink().start_frame() is None
+
+def test_sampled_frames_are_written(tmp_path):
+    """Test that flush() waits for the images of a frame and close() writes the rest."""
+    sink = AsyncDebugSink(str(tmp_path), sample_rate=1.0)
+    frame_id = sink.start_frame()
+    image = np.full((20, 60), 255, dtype=np.uint8)
+    sink.emit(frame_id, 'Plate Region', image)
+    sink.emit(frame_id, 'ocr input', image)
+    # The sink keeps its own copy
+    image[:] = 0
+    sink.flush()
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        f"{frame_id}_ocr_input.png", f"{frame_id}_plate_region.png"
+    ]
+    assert (cv2.imread(str(tmp_path / f"{frame_id}_plate_region.png"), cv2.IMREAD_GRAYSCALE) == 255).all()
+
+    sink.emit(frame_id, 'last', image)
+    sink.close()
+    sink.close()
+    assert sink.written == 3
+    sink.emit(frame_id, 'after close', image)
+    assert sink.dropped == 1 and not (tmp_path / f"{frame_id}_after_close.png").exists()
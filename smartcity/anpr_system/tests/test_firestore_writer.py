@@ -0,0 +1,104 @@
+import threading
+import uuid
+
+import pytest
+from src.firestore_writer import BufferedFirestoreWriter, BufferFullError
+
+class MemoryDocument:
+    """Document reference of the in-memory Firestore stand-in."""
+
+    def __init__(self, collection, doc_id):
+        self.collection = collection
+        self.id = doc_id
+
+class MemoryBatch:
+    """Write batch that applies its writes atomically on commit."""
+
+    def __init__(self, db):
+        self.db = db
+        self.writes = []
+
+    def set(self, doc_ref, data):
+        self.writes.append((doc_ref, data))
+
+    def commit(self):
+        self.db.commit(self.writes)
+
+class MemoryFirestore:
+    """In-memory stand-in for the parts of the Firestore client the writer uses."""
+
+    def __init__(self, failures=0):
+        self.documents = {}
+        self.commits = []
+        self.failures = failures
+        # Cleared to hold commits until the test sets it
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def collection(self, name):
+        class Collection:
+            def document(self):
+                return MemoryDocument(name, uuid.uuid4().hex[:20])
+        return Collection()
+
+    def batch(self):
+        return MemoryBatch(self)
+
+    def commit(self, writes):
+        self.gate.wait()
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("unavailable")
+        self.commits.append(len(writes))
+        for doc_ref, data in writes:
+            self.documents[(doc_ref.collection, doc_ref.id)] = data
+
+def test_writes_are_committed_in_batches_by_size_and_time():
+    """Test that full batches commit at once and the rest after the batch window."""
+    db = MemoryFirestore()
+    writer = BufferedFirestoreWriter(db, 'plate_recognition', batch_size=3, flush_interval=0.2)
+
+    doc_ids = [writer.write({'plate_number': f"AB{i:02d} CDE"}) for i in range(4)]
+    assert len(set(doc_ids)) == 4
+    assert writer.pending(doc_ids[-1]) == {'plate_number': 'AB03 CDE'}
+
+    assert writer.flush(timeout=2.0)
+    assert db.commits == [3, 1]
+    assert db.documents[('plate_recognition', doc_ids[0])] == {'plate_number': 'AB00 CDE'}
+    assert writer.pending(doc_ids[-1]) is None
+    writer.close()
+    assert writer.stats() == {'pending': 0, 'committed': 4, 'failed': 0, 'batches': 2, 'retries': 0}
+
+def test_failed_batches_are_retried_then_dropped():
+    """Test that a batch is retried with backoff and dropped once the retries are used up."""
+    db = MemoryFirestore(failures=2)
+    writer = BufferedFirestoreWriter(db, 'plate_recognition', flush_interval=0.0, backoff_base=0.001)
+    doc_id = writer.write({'plate_number': 'ZK09 KXO'})
+    assert writer.flush(timeout=2.0)
+    assert ('plate_recognition', doc_id) in db.documents
+    assert writer.stats()['retries'] == 2
+    writer.close()
+
+    db = MemoryFirestore(failures=10)
+    writer = BufferedFirestoreWriter(db, 'plate_recognition', flush_interval=0.0, max_retries=1, backoff_base=0.001)
+    writer.write({'plate_number': 'ZK09 KXO'})
+    writer.close()
+    assert writer.stats()['failed'] == 1 and not db.documents
+
+def test_full_buffer_applies_backpressure():
+    """Test that writes block and then fail while the buffer is full."""
+    db = MemoryFirestore()
+    db.gate.clear()
+    writer = BufferedFirestoreWriter(db, 'plate_recognition', batch_size=2, flush_interval=0.0,
+                                     max_pending=2, block_timeout=0.05)
+    writer.write({'plate_number': 'AB12 CDE'})
+    writer.write({'plate_number': 'AB12 CDF'})
+    with pytest.raises(BufferFullError):
+        writer.write({'plate_number': 'AB12 CDG'})
+
+    # Space frees up once the stalled commit completes
+    db.gate.set()
+    writer.block_timeout = 2.0
+    writer.write({'plate_number': 'AB12 CDG'})
+    writer.close()
+    assert writer.stats()['committed'] == 3
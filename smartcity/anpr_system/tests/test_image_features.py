@@ -0,0 +1,40 @@
+import numpy as np
+from src.image_features import ImageFeatures, detection_scales, scale_box
+
+def make_image():
+    """Create a random BGR test image."""
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 256, size=(120, 200, 3), dtype=np.uint8)
+
+def test_maps_are_memoized():
+    """Test that derived maps are computed once and reused."""
+    features = ImageFeatures(make_image())
+
+    assert features.gray is features.gray
+    assert features.blue_mask is features.blue_mask
+    assert features.crop(10, 20, 50, 30) is features.crop(10, 20, 50, 30)
+
+def test_crop_maps_match_standalone_image():
+    """Test that maps sliced from the parent equal maps computed on the crop itself."""
+    image = make_image()
+    frame = ImageFeatures(image)
+    frame.gray
+    frame.blue_mask
+    crop = frame.crop(10, 20, 50, 30)
+    standalone = ImageFeatures(image[20:50, 10:60].copy())
+
+    assert np.array_equal(crop.gray, standalone.gray)
+    assert np.array_equal(crop.blue_mask, standalone.blue_mask)
+    assert np.array_equal(crop.adaptive_binary, standalone.adaptive_binary)
+    assert np.array_equal(crop.otsu_binary, standalone.otsu_binary)
+
+def test_detection_scales_and_box_mapping():
+    """Test the search pyramid of a large image and mapping its boxes back to full resolution."""
+    assert detection_scales((3000, 4000, 3), max_side=1000) == [0.25]
+    assert detection_scales((3000, 4000, 3), max_side=1000, levels=3) == [0.25, 0.5, 1.0]
+    assert detection_scales((480, 640, 3), max_side=1000, levels=3) == [1.0]
+    assert detection_scales((3000, 4000, 3), max_side=0) == [1.0]
+
+    assert scale_box((10, 20, 30, 8), 0.25, (3000, 4000, 3)) == (40, 80, 120, 32)
+    # Boxes are clipped to the image
+    assert scale_box((990, 740, 10, 10), 0.25, (3000, 4000, 3)) == (3960, 2960, 40, 40)
@@ -0,0 +1,33 @@
+from src.metrics import MetricsRegistry
+
+def test_render_counter_and_histogram():
+    """Test the Prometheus text format of counters and cumulative histogram buckets."""
+    registry = MetricsRegistry()
+    calls = registry.counter('ocr_calls_total', 'OCR calls', ('backend',))
+    latency = registry.histogram('stage_seconds', 'Stage latency', ('stage',), buckets=(0.1, 1.0))
+    calls.inc(backend='tesserocr')
+    calls.inc(2, backend='tesserocr')
+    latency.observe(0.05, stage='ocr')
+    latency.observe(0.5, stage='ocr')
+
+    text = registry.render()
+    assert '# TYPE ocr_calls_total counter' in text
+    assert 'ocr_calls_total{backend="tesserocr"} 3' in text
+    assert 'stage_seconds_bucket{stage="ocr",le="0.1"} 1' in text
+    assert 'stage_seconds_bucket{stage="ocr",le="1"} 2' in text
+    assert 'stage_seconds_bucket{stage="ocr",le="+Inf"} 2' in text
+    assert 'stage_seconds_count{stage="ocr"} 2' in text
+
+def test_snapshot_merges_into_another_registry():
+    """Test that values recorded in a worker process can be added to the parent's."""
+    worker, parent = MetricsRegistry(), MetricsRegistry()
+    for registry in (worker, parent):
+        registry.counter('runs_total', 'Runs')
+        registry.histogram('seconds', 'Latency', buckets=(1.0,))
+    worker.counter('runs_total', 'Runs').inc()
+    worker.histogram('seconds', 'Latency').observe(0.5)
+
+    parent.merge(worker.snapshot(reset=True))
+    assert worker.snapshot() == {}
+    assert 'runs_total 1' in parent.render()
+    assert 'seconds_sum 0.5' in parent.render()
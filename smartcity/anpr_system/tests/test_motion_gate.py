@@ -0,0 +1,35 @@
+import numpy as np
+import cv2
+from src.motion_gate import MotionGate
+
+def make_frame(car_x=None):
+    """Create an empty lane frame, optionally with a car-sized block."""
+    frame = np.full((360, 640, 3), 80, dtype=np.uint8)
+    if car_x is not None:
+        cv2.rectangle(frame, (car_x, 120), (car_x + 200, 300), (230, 230, 230), -1)
+    return frame
+
+def test_static_frames_are_gated():
+    """Test that an unchanged lane stops passing once the hold expires."""
+    gate = MotionGate(hold_frames=2)
+    decisions = [gate.check(make_frame()) for _ in range(6)]
+    
+    assert decisions == [True, True, True, False, False, False]
+    assert gate.frames_checked == 6
+    assert gate.frames_passed == 3
+
+def test_moving_object_passes_gate():
+    """Test that a car entering the lane opens the gate."""
+    gate = MotionGate(hold_frames=0)
+    for _ in range(3):
+        gate.check(make_frame())
+    
+    assert gate.check(make_frame(car_x=100))
+    assert gate.last_changed_fraction > 0.1
+
+def test_roi_ignores_motion_outside_lane():
+    """Test that motion outside the region of interest is ignored."""
+    gate = MotionGate(roi=(0.5, 0.0, 0.5, 1.0), hold_frames=0)
+    gate.check(make_frame())
+    
+    assert not gate.check(make_frame(car_x=20))
@@ -0,0 +1,27 @@
+import numpy as np
+from src.ocr_batch import tile_crops, demultiplex
+
+def test_tile_crops_stacks_normalized_crops():
+    """Test that crops of different sizes are stacked at a common height."""
+    crops = [np.zeros((20, 90), dtype=np.uint8), np.zeros((60, 200, 3), dtype=np.uint8)]
+    page, spans = tile_crops(crops, height=48, gap=32, margin=16)
+    
+    assert spans == [(16, 64), (96, 144)]
+    assert page.shape == (16 + 48 + 32 + 48 + 16, 216 + 32)
+    # The gap between crops stays blank
+    assert (page[64:96] == 255).all()
+
+def test_demultiplex_maps_words_to_crops():
+    """Test that words are assigned by bounding box and ordered left to right."""
+    spans = [(16, 64), (96, 144)]
+    ocr_data = {
+        'text': ['', 'CDE', 'AB12', 'ZK09KXO', 'NOISE'],
+        'conf': [-1, 88, 90, 75, 0],
+        'left': [0, 120, 16, 16, 40],
+        'top': [0, 18, 18, 98, 98],
+        'height': [0, 44, 44, 44, 44],
+    }
+    words = demultiplex(ocr_data, spans, gap=32)
+    
+    assert [text for text, _, _ in words[0]] == ['AB12', 'CDE']
+    assert [text for text, _, _ in words[1]] == ['ZK09KXO']
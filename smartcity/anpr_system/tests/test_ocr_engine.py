@@ -0,0 +1,74 @@
+import threading
+from src.ocr_engine import (TSV_COLUMNS, OCREngine, OCREnginePool, parse_tesseract_config, tsv_to_dict,
+                            words_to_choices)
+
+class CountingEngine(OCREngine):
+    """Engine stand-in that echoes its config."""
+    
+    name = 'counting'
+    
+    def image_to_string(self, image, config=''):
+        self.calls += 1
+        return config
+
+def test_parse_tesseract_config():
+    """Test splitting a tesseract command line config."""
+    lang, oem, psm, variables = parse_tesseract_config(
+        '--psm 7 -l eng --oem 1 -c tessedit_char_whitelist=ABC123'
+    )
+    
+    assert (lang, oem, psm) == ('eng', 1, 7)
+    assert variables == {'tessedit_char_whitelist': 'ABC123'}
+
+def test_tsv_to_dict_matches_pytesseract_layout():
+    """Test TSV conversion, including a row with missing trailing text."""
+    tsv = (
+        "level\tpage_num\tleft\ttop\twidth\theight\tconf\ttext\n"
+        "1\t1\t0\t0\t100\t20\t-1\t\n"
+        "5\t1\t4\t2\t60\t16\t91.5\tAB12CDE\n"
+        "5\t1\t70\t2\t20\t16\t12"
+    )
+    data = tsv_to_dict(tsv)
+    
+    assert data['conf'] == [-1, 91, 12]
+    assert data['text'] == ['', 'AB12CDE', '']
+    assert data['left'] == [0, 4, 70]
+
+def test_tsv_to_dict_reads_headerless_api_output():
+    """Test TSV as returned by GetTSVText: all 12 columns and no header row."""
+    tsv = (
+        "1\t1\t0\t0\t0\t0\t0\t0\t180\t40\t-1\t\n"
+        "4\t1\t1\t1\t1\t0\t4\t2\t170\t30\t-1\t\n"
+        "5\t1\t1\t1\t1\t1\t4\t2\t120\t30\t91.5\tZK09KXO\n"
+        "5\t1\t1\t1\t1\t2\t130\t2\t40\t30\t35\t\n"
+    )
+    data = tsv_to_dict(tsv, TSV_COLUMNS)
+    
+    assert sorted(data) == sorted(TSV_COLUMNS)
+    assert data['level'] == [1, 4, 5, 5]
+    assert data['conf'] == [-1, -1, 91, 35]
+    assert data['text'] == ['', '', 'ZK09KXO', '']
+    assert words_to_choices(data)[0] == [('Z', 91)]
+    assert tsv_to_dict('', TSV_COLUMNS)['text'] == []
+
+def test_engine_pool_shares_engines_between_threads():
+    """Test that pooled calls are spread over engines and counted."""
+    pool = OCREnginePool(CountingEngine, size=2)
+    
+    threads = [threading.Thread(target=pool.image_to_string, args=(None, '--psm 7')) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert pool.calls == 8
+    assert pool.name == 'counting'
+
+def test_words_to_choices_builds_single_choice_lattice():
+    """Test the character lattice of backends without symbol level alternatives."""
+    data = {'text': ['', 'AB12', 'CDE', 'x'], 'conf': [-1, 90, 80.5, 0]}
+    
+    assert words_to_choices(data) == [
+        [('A', 90.0)], [('B', 90.0)], [('1', 90.0)], [('2', 90.0)],
+        [('C', 80.5)], [('D', 80.5)], [('E', 80.5)]
+    ]
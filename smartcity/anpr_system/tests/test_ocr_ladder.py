@@ -0,0 +1,72 @@
+import json
+import threading
+
+from src.ocr_ladder import ConfigLadder
+
+CONFIGS = ['--psm 7', '--psm 8', '--psm 6']
+
+def scripted_attempt(scores, tried):
+    """Attempt function reading a fixed score per config and recording the configs tried."""
+    def attempt(config):
+        tried.append(config)
+        return ('AB12 CDE', scores[config]) if scores[config] is not None else (None, 0.0)
+    return attempt
+
+def test_run_stops_at_the_first_accepted_result():
+    """Test that the ladder stops early and learns to try the winning config first."""
+    ladder = ConfigLadder('test', CONFIGS)
+    scores = {'--psm 7': 40.0, '--psm 8': 95.0, '--psm 6': 99.0}
+    tried = []
+    result, score, config, count = ladder.run(scripted_attempt(scores, tried), lambda r, s: s >= 80)
+    assert (result, score, config, count) == ('AB12 CDE', 95.0, '--psm 8', 2)
+    assert tried == ['--psm 7', '--psm 8']
+    assert ladder.ordered() == ['--psm 8', '--psm 7', '--psm 6']
+
+def test_rejected_results_are_not_wins():
+    """Test that the best result of a search nothing was accepted from does not count as a win."""
+    ladder = ConfigLadder('test', CONFIGS)
+    scores = {'--psm 7': None, '--psm 8': 30.0, '--psm 6': 50.0}
+    tried = []
+    result, score, config, count = ladder.run(scripted_attempt(scores, tried), lambda r, s: s >= 80)
+    assert (result, score, config, count) == ('AB12 CDE', 50.0, '--psm 6', 3)
+    assert ladder.wins == {'--psm 7': 0, '--psm 8': 0, '--psm 6': 0}
+    assert ladder.ordered() == CONFIGS
+
+def test_processes_sharing_a_stats_file_add_up_their_wins(tmp_path):
+    """Test that saves merge per-ladder deltas instead of overwriting each other's counts."""
+    path = str(tmp_path / 'ladder.json')
+    first = ConfigLadder('uk', CONFIGS, stats_path=path, save_every=1)
+    second = ConfigLadder('uk', CONFIGS, stats_path=path, save_every=1)
+    other = ConfigLadder('other', CONFIGS, stats_path=path, save_every=1)
+
+    first.record_win('--psm 8')
+    second.record_win('--psm 6')
+    second.record_win('--psm 6')
+    other.record_win('--psm 7')
+    # A save also picks up the wins other processes saved before it
+    assert second.wins == {'--psm 7': 0, '--psm 8': 1, '--psm 6': 2}
+
+    with open(path) as f:
+        stats = json.load(f)
+    assert stats['uk'] == {'--psm 8': 1, '--psm 6': 2}
+    assert stats['other'] == {'--psm 7': 1}
+    assert ConfigLadder('uk', CONFIGS, stats_path=path).ordered() == ['--psm 6', '--psm 8', '--psm 7']
+    assert [p.name for p in tmp_path.iterdir() if p.suffix == '.tmp'] == []
+
+def test_concurrent_saves_do_not_lose_wins(tmp_path):
+    """Test that ladders saving to the same file at the same time keep every win."""
+    path = str(tmp_path / 'ladder.json')
+    ladders = [ConfigLadder('uk', CONFIGS, stats_path=path, save_every=1) for _ in range(4)]
+
+    def record(ladder):
+        for _ in range(25):
+            ladder.record_win('--psm 7')
+
+    threads = [threading.Thread(target=record, args=(ladder,)) for ladder in ladders]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with open(path) as f:
+        assert json.load(f)['uk'] == {'--psm 7': 100}
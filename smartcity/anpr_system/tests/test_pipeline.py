@@ -0,0 +1,34 @@
+import pytest
+from src.pipeline import Pipeline, Stage
+
+def make_pipeline():
+    """Create a pipeline that upper-cases text and stops on empty input."""
+    def decode(ctx):
+        ctx.texts = [ctx.source]
+        if not ctx.source:
+            ctx.done = True
+
+    def ocr(ctx):
+        ctx.count('characters', len(ctx.texts[0]))
+        ctx.plates.append({'plate_number': ctx.texts[0].upper()})
+
+    return Pipeline('test', [Stage('decode', 'decode', decode), Stage('ocr', 'ocr', ocr)])
+
+def test_pipeline_runs_stages_and_records_stats():
+    """Test that stages run in order and their timings and counters accumulate."""
+    pipeline = make_pipeline()
+    ctx = pipeline.run('ab12cde')
+    pipeline.run('')
+
+    assert ctx.results() == {'plate_0': {'plate_number': 'AB12CDE'}}
+    stats = pipeline.stats()
+    assert stats['runs'] == 2
+    assert stats['stages']['decode']['calls'] == 2
+    # The empty input stopped the pipeline before the OCR stage
+    assert stats['stages']['ocr']['calls'] == 1
+    assert stats['stages']['ocr']['counters'] == {'characters': 7}
+
+def test_unknown_stage_kind_is_rejected():
+    """Test that stages must be one of the known kinds."""
+    with pytest.raises(ValueError):
+        Stage('resize', 'resize', lambda ctx: None)
@@ -1,13 +1,16 @@
 import pytest
 import cv2
 import numpy as np
+from src.ocr_batch import BATCH_OCR_CONFIG
+from src.ocr_engine import OCREngine
+from src.pipeline import PipelineContext
 from src.plate_recognizer import PlateRecognizer
 
 def test_plate_recognizer_initialization():
     """Test if PlateRecognizer initializes correctly."""
     recognizer = PlateRecognizer()
-    assert recognizer.min_area == 100
-    assert recognizer.max_area == 5000
+    assert recognizer.min_area == 500
+    assert recognizer.max_area == 15000
 
 def test_preprocess_image():
     """Test image preprocessing."""
@@ -24,11 +27,12 @@ def test_find_plate_contours():
     """Test contour detection."""
     recognizer = PlateRecognizer()
     
-    # Create a test image with a rectangle
-    test_image = np.zeros((100, 100), dtype=np.uint8)
-    cv2.rectangle(test_image, (20, 20), (80, 80), 255, -1)
+    # Create a test image with a plate-shaped rectangle (about 4.5% of the image area)
+    original = np.zeros((100, 200, 3), dtype=np.uint8)
+    test_image = np.zeros((100, 200), dtype=np.uint8)
+    cv2.rectangle(test_image, (20, 20), (80, 35), 255, -1)
     
-    contours = recognizer.find_plate_contours(test_image)
+    contours = recognizer.find_plate_contours(test_image, original)
     assert len(contours) > 0
 
 def test_extract_plate():
@@ -44,4 +48,44 @@ def test_extract_plate():
     
     extracted = recognizer.extract_plate(test_image, contour)
     assert extracted is not None
-    assert extracted.shape[0] > 0 and extracted.shape[1] > 0 
\ No newline at end of file
+    assert extracted.shape[0] > 0 and extracted.shape[1] > 0 
+
+class WordEngine(OCREngine):
+    """OCR engine reading one word on the batched page and another in per-candidate passes."""
+    
+    name = 'words'
+    
+    def __init__(self, batch_word, candidate_word):
+        super().__init__()
+        self.batch_word = batch_word
+        self.candidate_word = candidate_word
+        self.configs = []
+    
+    def image_to_data(self, image, config=''):
+        self.configs.append(config)
+        text, conf = self.batch_word if config == BATCH_OCR_CONFIG else self.candidate_word
+        # One word in the first crop of the page
+        return {'text': [text], 'conf': [conf], 'left': [16], 'top': [18], 'height': [44]}
+
+def ocr_context(count):
+    """Pipeline context holding `count` blank plate candidates."""
+    ctx = PipelineContext(None, candidate_scores=[0.9] * count)
+    crop = np.full((30, 140), 255, dtype=np.uint8)
+    ctx.crops = [(crop, crop)] * count
+    ctx.proposals = [(0, 0, 140, 30)] * count
+    return ctx
+
+def test_batched_pass_only_accepts_registrations():
+    """Test that band text read on the batched page falls through to the per-candidate configs."""
+    engine = WordEngine(('GB', 96.0), ('ZK09KXO', 85.0))
+    ctx = ocr_context(2)
+    PlateRecognizer(ocr_engine=engine)._ocr_stage(ctx)
+    assert ctx.texts == ['ZK09KXO']
+    assert len(engine.configs) > 1
+    
+    # A registration on the batched page needs no further passes
+    engine = WordEngine(('AB12CDE', 90.0), ('ZK09KXO', 85.0))
+    ctx = ocr_context(2)
+    PlateRecognizer(ocr_engine=engine)._ocr_stage(ctx)
+    assert ctx.texts == ['AB12CDE']
+    assert engine.configs == [BATCH_OCR_CONFIG]
@@ -0,0 +1,113 @@
+import threading
+from concurrent.futures import Future, TimeoutError
+
+import pytest
+import src.recognition_pool as recognition_pool
+from src.recognition_pool import ImageDecodeError, QueueFullError, RecognitionError, RecognitionPool
+
+class ManualExecutor:
+    """Executor whose jobs finish only when the test resolves them."""
+
+    def __init__(self):
+        self.jobs = []
+        self.peak = 0
+        self.cond = threading.Condition()
+
+    def submit(self, fn, image, request):
+        future = Future()
+        with self.cond:
+            self.jobs.append((image, future))
+            self.peak = max(self.peak, len(self.outstanding()))
+            self.cond.notify_all()
+        return future
+
+    def outstanding(self):
+        return [(image, future) for image, future in self.jobs if not future.done()]
+
+    def wait_outstanding(self, count):
+        with self.cond:
+            assert self.cond.wait_for(lambda: len(self.outstanding()) == count, timeout=5.0)
+
+    def shutdown(self, wait=True):
+        pass
+
+def make_pool(workers, max_queue):
+    """Create a pool whose jobs run on a ManualExecutor instead of worker processes."""
+    pool = RecognitionPool(workers=workers, max_queue=max_queue)
+    pool._executor.shutdown()
+    pool._executor = ManualExecutor()
+    return pool
+
+def plates(image):
+    """Worker result of a job that read the image name as its plate."""
+    return {'plate_0': {'plate_number': image}}, 2.0, {}
+
+def test_submit_holds_a_slot_until_the_job_finishes():
+    """Test that jobs hold a queue slot until they succeed or fail."""
+    pool = make_pool(workers=1, max_queue=1)
+    first, second = pool.submit('AB12 CDE'), pool.submit('ZK09 KXO')
+    assert pool.stats()['in_flight'] == 2 and pool.stats()['queue_depth'] == 1
+
+    (_, job1), (_, job2) = pool._executor.jobs
+    job1.set_result(plates('AB12 CDE'))
+    assert first.result() == {'plate_0': {'plate_number': 'AB12 CDE'}}
+    job2.set_exception(RecognitionError("ValueError: bad crop"))
+    assert isinstance(second.exception(), RecognitionError)
+
+    stats = pool.stats()
+    assert (stats['in_flight'], stats['completed'], stats['failed']) == (0, 1, 1)
+    assert stats['avg_job_seconds'] == 1.1
+
+def test_full_queue_rejects_with_retry_after():
+    """Test that a submission beyond workers + max_queue fails fast with a retry estimate."""
+    pool = make_pool(workers=1, max_queue=1)
+    pool.submit('AB12 CDE')
+    pool.submit('ZK09 KXO')
+    with pytest.raises(QueueFullError) as rejected:
+        pool.submit('AB12 CDF')
+    # Two jobs per worker at the initial one second per job
+    assert rejected.value.retry_after == 2
+    assert pool.stats()['rejected'] == 1
+
+    pool._executor.jobs[0][1].set_result(plates('AB12 CDE'))
+    pool.submit('AB12 CDF')
+
+def test_recognize_timeout_keeps_the_slot():
+    """Test that a timed out wait raises while the job keeps its slot until it finishes."""
+    pool = make_pool(workers=1, max_queue=0)
+    with pytest.raises(TimeoutError):
+        pool.recognize('AB12 CDE', timeout=0.01)
+    assert pool.stats()['in_flight'] == 1
+
+    pool._executor.jobs[0][1].set_result(plates('AB12 CDE'))
+    assert pool.stats()['in_flight'] == 0
+
+def test_recognize_many_fills_but_never_exceeds_its_window():
+    """Test that a batch keeps exactly `window` jobs in flight and yields every image."""
+    pool = make_pool(workers=1, max_queue=8)
+    images = [f"AB{i:02d} CDE" for i in range(5)]
+    results = []
+    consumer = threading.Thread(target=lambda: results.extend(pool.recognize_many(images, window=2, timeout=5.0)))
+    consumer.start()
+
+    executor = pool._executor
+    for remaining in range(len(images), 0, -1):
+        executor.wait_outstanding(min(2, remaining))
+        image, job = executor.outstanding()[0]
+        job.set_result(plates(image))
+    consumer.join(5.0)
+
+    assert executor.peak == 2
+    assert sorted(index for index, _, _ in results) == list(range(5))
+    assert all(result == {'plate_0': {'plate_number': images[index]}} and error is None
+               for index, result, error in results)
+
+def test_undecodable_bytes_raise_a_decode_error(monkeypatch):
+    """Test that a worker reports image bytes it could not decode as a ValueError."""
+    class Recognizer:
+        def process_image(self, image):
+            return None
+
+    monkeypatch.setattr(recognition_pool, '_worker_recognizer', Recognizer())
+    with pytest.raises(ImageDecodeError):
+        recognition_pool._recognize(b'not an image')
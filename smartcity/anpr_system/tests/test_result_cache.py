@@ -0,0 +1,43 @@
+import threading
+import time
+from src.result_cache import RecognitionCache, content_hash
+
+def test_lru_and_ttl_eviction():
+    """Test that the least recently used entry is evicted and old entries expire."""
+    now = [0.0]
+    cache = RecognitionCache(max_entries=2, ttl=10.0, clock=lambda: now[0])
+    cache.put(content_hash(b'a'), 'A')
+    cache.put(content_hash(b'b'), 'B')
+    assert cache.get(content_hash(b'a')) == (True, 'A')
+
+    cache.put(content_hash(b'c'), 'C')
+    assert cache.get(content_hash(b'b')) == (False, None)
+    assert cache.evictions == 1
+
+    now[0] = 11.0
+    assert cache.get(content_hash(b'a')) == (False, None)
+    assert cache.expirations == 1
+
+def test_concurrent_requests_are_coalesced():
+    """Test that identical requests in flight share one computation."""
+    cache = RecognitionCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.1)
+        return {'plate_0': 'AB12 CDE'}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute('key', compute)))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [{'plate_0': 'AB12 CDE'}] * 4
+    stats = cache.stats()
+    assert stats['misses'] == 1
+    assert stats['coalesced'] + stats['hits'] == 3
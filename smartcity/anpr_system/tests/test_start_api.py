@@ -0,0 +1,43 @@
+import io
+import os
+import sys
+
+from src.pipeline import PipelineContext
+from src.result_cache import RecognitionCache
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'web_interface'))
+import start_api
+
+class FlakyPipeline:
+    """Cascade that fails on its first run and reads a plate afterwards."""
+
+    def __init__(self):
+        self.runs = 0
+
+    def run(self, source, **meta):
+        self.runs += 1
+        if self.runs == 1:
+            raise RuntimeError("tesseract crashed")
+        ctx = PipelineContext(source, **meta)
+        ctx.image = source
+        ctx.plates = [{'plate_number': 'AB12 CDE', 'country_identifier': 'UK', 'confidence': 0.9}]
+        return ctx
+
+def test_failed_recognition_is_not_cached(monkeypatch):
+    """Test that a failure answers 500 and the next upload of the same image is recomputed."""
+    pipeline = FlakyPipeline()
+    monkeypatch.setattr(start_api, 'api_pipeline', pipeline)
+    monkeypatch.setattr(start_api, 'recognition_cache', RecognitionCache())
+    client = start_api.app.test_client()
+
+    def post():
+        return client.post('/api/anpr-process', data={'image': (io.BytesIO(b'AB12 CDE'), 'plate.jpg')},
+                           content_type='multipart/form-data')
+
+    failed = post()
+    assert failed.status_code == 500 and failed.get_json()['plate_number'] == 'ERROR'
+    assert post().get_json()['plate_number'] == 'AB12 CDE'
+    assert pipeline.runs == 2
+    # The successful result is cached
+    assert post().get_json()['plate_number'] == 'AB12 CDE'
+    assert pipeline.runs == 2
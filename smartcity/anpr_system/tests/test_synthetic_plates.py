@@ -0,0 +1,28 @@
+import re
+import numpy as np
+from src.synthetic_plates import generate_sample, random_registration
+
+FORMAT_PATTERNS = {
+    'current': r'^[A-Z]{2}\d{2} [A-Z]{3}$',
+    'prefix': r'^[A-Z]\d{1,3} [A-Z]{3}$',
+    'suffix': r'^[A-Z]{3} \d{1,3}[A-Z]$',
+    'dateless': r'^([A-Z]{1,3} \d{1,4}|\d{1,4} [A-Z]{1,3})$'
+}
+
+def test_registrations_follow_their_format():
+    """Test that every format draws registrations of the right shape."""
+    rng = np.random.default_rng(0)
+    for plate_format, pattern in FORMAT_PATTERNS.items():
+        for _ in range(50):
+            assert re.match(pattern, random_registration(rng, plate_format))
+
+def test_samples_are_reproducible():
+    """Test that a sample depends only on the seed and its index."""
+    first = generate_sample(7, 3, size=(320, 240))
+    second = generate_sample(7, 3, size=(320, 240))
+    other = generate_sample(7, 4, size=(320, 240))
+
+    assert first['image'].shape == (240, 320, 3)
+    assert first['label'] == second['label']
+    assert np.array_equal(first['image'], second['image'])
+    assert not np.array_equal(first['image'], other['image'])
@@ -0,0 +1,62 @@
+from src.uk_grammar import decode, decode_lattice, format_registration, is_uk_registration
+
+def test_letter_positions_keep_their_letters():
+    """Test that O and I in letter positions are not turned into digits."""
+    assert format_registration('ZK09KXO') == 'ZK09 KXO'
+    assert format_registration('ZM09LIW') == 'ZM09 LIW'
+
+def test_confusions_are_corrected_per_position():
+    """Test that ambiguous glyphs become letters or digits depending on their position."""
+    decoded = decode('ZKO9KX0')
+    assert decoded['plate_number'] == 'ZK09 KXO'
+    assert decoded['format'] == 'current'
+    assert decoded['corrections'] == 2
+
+    assert format_registration('5B12CDE') == 'SB12 CDE'
+    assert format_registration('AB1ZCD8') == 'AB12 CDB'
+
+def test_all_formats_are_decoded():
+    """Test the current, prefix, suffix and dateless formats."""
+    assert decode('A123BCD')['format'] == 'prefix'
+    assert decode('ABC123D')['plate_number'] == 'ABC 123D'
+    assert decode('ABC 123')['format'] == 'dateless'
+    assert decode('123 ABC')['plate_number'] == '123 ABC'
+
+def test_noise_around_the_plate_is_dropped():
+    """Test that band letters and border marks around the registration are skipped."""
+    assert format_registration('GB AB12 CDE') == 'AB12 CDE'
+    assert format_registration('|AB12CDE|') == 'AB12 CDE'
+
+def test_band_text_and_partial_reads_are_not_registrations():
+    """Test that short dateless formats are not found in band text, noise or partial reads."""
+    for text in ('GB', 'UK', 'A1', 'HELLO123', 'ZK09KX', 'ZK09K', 'GB ZK'):
+        assert decode(text) is None, text
+    assert not is_uk_registration('A1')
+    assert not is_uk_registration('G 8')
+    # A dateless plate is still read when it is the whole text
+    assert decode('AB 123')['plate_number'] == 'AB 123'
+    assert format_registration('GBZK09KXO') == 'ZK09 KXO'
+
+def test_undecodable_text_is_returned_cleaned():
+    """Test that text without any registration is only cleaned."""
+    assert decode('!!!') is None
+    assert format_registration(' kw-xy!') == 'KWXY'
+
+def test_exact_registration_check():
+    """Test that validity requires an exact match of one format."""
+    assert is_uk_registration('AB12 CDE')
+    assert is_uk_registration('AB12CDE')
+    assert is_uk_registration('A123 BCD')
+    assert not is_uk_registration('ABO2 CDE')
+    assert not is_uk_registration('AB12 CD')
+
+def test_lattice_takes_a_character_from_its_alternatives():
+    """Test that a wrong top choice is replaced by an OCR alternative that fits the grammar."""
+    lattice = [[('Z', 90)], [('K', 88)], [('Q', 60), ('0', 35)], [('9', 91)],
+               [('K', 90)], [('X', 85)], [('O', 70)]]
+    decoded = decode_lattice(lattice)
+
+    assert decoded['plate_number'] == 'ZK09 KXO'
+    assert decoded['corrections'] == 1
+    assert 35 < decoded['confidence'] < 90
+    assert decode_lattice([]) is None
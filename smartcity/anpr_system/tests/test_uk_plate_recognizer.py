@@ -0,0 +1,101 @@
+import threading
+import time
+
+import numpy as np
+from src.metrics import record_ocr_call, track_ocr_calls
+from src.ocr_engine import OCREngine
+from src.uk_plate_recognizer import UKPlateRecognizer
+
+class ScriptedEngine(OCREngine):
+    """OCR engine reading a fixed plate per page segmentation mode, after a delay or a gate."""
+
+    name = 'scripted'
+
+    def __init__(self, script, gates=None):
+        super().__init__()
+        self.script = script
+        # Page segmentation mode -> threading.Event its passes wait for
+        self.gates = gates or {}
+        self.started = []
+        self.configs = []
+        self.lock = threading.Lock()
+
+    def image_to_choices(self, image, config=''):
+        psm = config.split()[1]
+        text, confidence, delay = self.script[psm]
+        with self.lock:
+            self.started.append(psm)
+        if psm in self.gates:
+            assert self.gates[psm].wait(5.0)
+        time.sleep(delay)
+        with self.lock:
+            self.configs.append(psm)
+        record_ocr_call(self.name, delay)
+        return [[(ch, confidence)] for ch in text]
+
+def make_recognizer(engine, ocr_threads):
+    """Create a headless recognizer that reads crops with the given engine."""
+    return UKPlateRecognizer(headless=True, ocr_engine=engine, batch_ocr=False, ocr_threads=ocr_threads)
+
+def test_parallel_reads_match_sequential_reads():
+    """Test that concurrent OCR passes give the sequential result, whichever pass finishes first."""
+    # Later configs finish first; psm 8 is the first confident plate in config order
+    script = {'7': ('ZK09KX', 60.0, 0.06), '8': ('ZK09KXO', 95.0, 0.04),
+              '6': ('ZK09KXD', 99.0, 0.0), '13': ('ZK09KXQ', 99.0, 0.0)}
+    crops = [np.full((40, 180, 3), 200, dtype=np.uint8), np.full((30, 140, 3), 220, dtype=np.uint8)]
+
+    sequential = make_recognizer(ScriptedEngine(script), 1).read_plate_numbers(crops)
+    engine = ScriptedEngine(script)
+    with track_ocr_calls() as calls:
+        parallel = make_recognizer(engine, 4).read_plate_numbers(crops)
+
+    assert [read['plate_number'] for read in parallel] == ['ZK09 KXO', 'ZK09 KXO']
+    assert parallel == sequential
+    # OCR calls made on the pool threads are counted for the calling request
+    assert calls[0] == len(engine.configs)
+
+def test_confident_plate_cancels_outstanding_passes():
+    """Test that the configs still queued after a confident plate are never read."""
+    script = {psm: ('AB12CDE', 95.0, 0.0) for psm in ('7', '8', '6', '13')}
+    # Every pass after psm 7 waits until the read is over, so uncancelled passes would all run then
+    release = threading.Event()
+    engine = ScriptedEngine(script, gates={psm: release for psm in ('8', '6', '13')})
+    recognizer = make_recognizer(engine, 2)
+
+    reads = recognizer.read_plate_numbers([np.full((40, 180, 3), 200, dtype=np.uint8)])
+    assert reads[0]['plate_number'] == 'AB12 CDE'
+    release.set()
+    recognizer.close()
+    # psm 8 was running and the thread freed by psm 7 may have taken one more pass
+    # before the cancel; the rest were dropped
+    assert engine.started[:2] == ['7', '8'] and len(engine.started) <= 3
+
+def test_close_cancels_queued_passes():
+    """Test that close() drops the passes that have not started and stops the OCR threads."""
+    script = {psm: ('AB12CDE', 95.0, 0.0) for psm in ('7', '13')}
+    release = threading.Event()
+    engine = ScriptedEngine(script, gates={'7': release})
+    recognizer = make_recognizer(engine, 2)
+    executor = recognizer._get_ocr_executor()
+    running = [executor.submit(engine.image_to_choices, None, '--psm 7') for _ in range(2)]
+    queued = executor.submit(engine.image_to_choices, None, '--psm 13')
+    dropped = threading.Event()
+    queued.add_done_callback(lambda future: dropped.set())
+
+    closer = threading.Thread(target=recognizer.close)
+    closer.start()
+    assert dropped.wait(5.0)
+    release.set()
+    closer.join(5.0)
+    assert queued.cancelled() and all(future.result() for future in running)
+    assert engine.started == ['7', '7'] and recognizer._ocr_executor is None
+
+def test_sequential_read_stops_at_the_first_confident_plate():
+    """Test that the configs after a confident, valid plate are not run."""
+    script = {'7': ('GB', 99.0, 0.0), '8': ('ZK09KXO', 95.0, 0.0),
+              '6': ('ZK09KXO', 99.0, 0.0), '13': ('ZK09KXO', 99.0, 0.0)}
+    engine = ScriptedEngine(script)
+    reads = make_recognizer(engine, 1).read_plate_numbers([np.full((40, 180, 3), 200, dtype=np.uint8)])
+    assert reads[0]['plate_number'] == 'ZK09 KXO'
+    # Band text is not a registration, so psm 7 does not end the search
+    assert engine.configs == ['7', '8']
@@ -0,0 +1,99 @@
+import cv2
+import numpy as np
+import src.video_stream as video_stream
+from src.video_stream import VideoStreamRecognizer
+
+class SyntheticCapture:
+    """Frame source yielding numbered frames at a fixed frame rate."""
+
+    def __init__(self, frames, fps=25.0):
+        self.frames = frames
+        self.fps = fps
+        self.position = 0
+        self.decoded = []
+
+    def get(self, prop):
+        return self.fps if prop == cv2.CAP_PROP_FPS else 0.0
+
+    def grab(self):
+        if self.position >= self.frames:
+            return False
+        self.position += 1
+        return True
+
+    def read(self):
+        if not self.grab():
+            return False, None
+        self.decoded.append(self.position - 1)
+        return True, np.full((4, 4, 3), 0, dtype=np.uint8)
+
+    def release(self):
+        pass
+
+class FakeClock:
+    """Stand-in for the time module whose clock only moves when told to."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def perf_counter(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+class ScriptedRecognizer:
+    """Recognizer taking a fixed time per frame and reading plates from a per-frame script."""
+
+    def __init__(self, clock, seconds, plates=lambda index: None):
+        self.clock = clock
+        self.seconds = seconds
+        self.plates = plates
+        self.frames = 0
+
+    def process_image(self, frame):
+        self.clock.now += self.seconds
+        plate = self.plates(self.frames)
+        self.frames += 1
+        if plate is None:
+            return {}
+        return {'plate_0': {'plate_number': plate, 'country_identifier': 'UK', 'bbox': (0, 0, 4, 4)}}
+
+def test_slow_recognition_skips_frames_to_keep_up(monkeypatch):
+    """Test that frames arriving during recognition are grabbed without decoding, up to max_skip."""
+    clock = FakeClock()
+    monkeypatch.setattr(video_stream, 'time', clock)
+
+    # 0.25 s per frame at 20 fps: 5 frames arrive per processed one
+    capture = SyntheticCapture(100, fps=20.0)
+    stream = VideoStreamRecognizer(capture, ScriptedRecognizer(clock, 0.25))
+    stats = stream.run(lambda event: None)
+    assert capture.decoded == list(range(0, 100, 5))
+    assert (stats['frames_read'], stats['frames_processed'], stats['frames_dropped']) == (100, 20, 80)
+
+    capture = SyntheticCapture(100)
+    VideoStreamRecognizer(capture, ScriptedRecognizer(clock, 2.0), max_skip=30).run(lambda event: None)
+    assert capture.decoded == [0, 31, 62, 93]
+
+    # Without realtime only the stride applies
+    capture = SyntheticCapture(10)
+    VideoStreamRecognizer(capture, ScriptedRecognizer(clock, 2.0), realtime=False, frame_stride=3).run(lambda e: None)
+    assert capture.decoded == [0, 3, 6, 9]
+
+def test_repeated_plates_are_suppressed_and_forgotten(monkeypatch):
+    """Test that a plate in view is reported once, again after an absence, and then evicted."""
+    clock = FakeClock()
+    monkeypatch.setattr(video_stream, 'time', clock)
+    script = lambda index: 'AB12 CDE' if index < 10 or 50 <= index < 60 else 'ZK09 KXO' if index < 50 else None
+
+    stream = VideoStreamRecognizer(SyntheticCapture(100), ScriptedRecognizer(clock, 0.0, script),
+                                   realtime=False, repeat_after=1.0)
+    events = []
+    stream.run(events.append)
+
+    assert [(event['plate_number'], event['frame_index']) for event in events] == [
+        ('AB12 CDE', 0), ('ZK09 KXO', 10), ('AB12 CDE', 50)
+    ]
+    assert events[2]['timestamp'] == 2.0
+    # Neither plate was seen in the last second of the stream
+    assert stream._last_seen == {}
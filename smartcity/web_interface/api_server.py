@@ -3,28 +3,146 @@
 
 import os
 import sys
+import io
 import json
-import tempfile
-from flask import Flask, request, jsonify
+import threading
+import zipfile
+from concurrent.futures import TimeoutError as RecognitionTimeout
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 import uuid
 
-# Add ANPR system path to Python path
-sys.path.append('../anpr_system/src')
+# Add ANPR system path to Python path (relative to this file, so the Procfile can start it from any directory)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'anpr_system', 'src'))
 
 # Import ANPR components
 try:
-    from uk_plate_recognizer import UKPlateRecognizer
+    from recognition_pool import RecognitionPool, QueueFullError
+    from result_cache import content_hash, recognition_cache_from_env
+    from anpr_logging import configure_logging, get_logger, init_flask_request_ids
+    from metrics import (CONTENT_TYPE, QUEUE_DEPTH, QUEUE_IN_FLIGHT, REGISTRY, RESULT_CONFIDENCE,
+                         instrument_flask, observe_cache)
 except ImportError:
-    print("Error: Could not import UKPlateRecognizer. Make sure the anpr_system is accessible.")
+    print("Error: Could not import the ANPR recognition pool. Make sure the anpr_system is accessible.")
     sys.exit(1)
 
 # Initialize Flask app
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
+instrument_flask(app, 'api_server')
 
-# Initialize ANPR system
-anpr = UKPlateRecognizer()
+# Log records are written by a background thread and tagged with the request's correlation ID
+configure_logging()
+init_flask_request_ids(app)
+log = get_logger('api_server')
+
+# Recognition runs in a pool of worker processes, each with a warmed
+# headless recognizer; the pool is started on first use
+RECOGNITION_WORKERS = int(os.environ.get('ANPR_WORKERS', os.cpu_count() or 1))
+RECOGNITION_QUEUE_SIZE = int(os.environ.get('ANPR_MAX_QUEUE', 2 * RECOGNITION_WORKERS))
+RECOGNITION_TIMEOUT = float(os.environ.get('ANPR_REQUEST_TIMEOUT', 30))
+
+# Largest request body accepted; Flask answers 413 before reading any more of it
+MAX_UPLOAD_BYTES = int(os.environ.get('ANPR_MAX_UPLOAD_BYTES', 100 * 1024 * 1024))
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES
+
+# Limits for /api/anpr-process-batch
+BATCH_MAX_IMAGES = int(os.environ.get('ANPR_BATCH_MAX_IMAGES', 100))
+BATCH_MAX_IMAGE_BYTES = 20 * 1024 * 1024
+# Uncompressed size of all images of an archive; a small zip can expand to far more than its upload
+BATCH_MAX_ARCHIVE_BYTES = int(os.environ.get('ANPR_BATCH_MAX_ARCHIVE_BYTES', 200 * 1024 * 1024))
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+class BatchTooLarge(ValueError):
+    """Raised when the images of a batch exceed a size limit."""
+    pass
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Results keyed by a hash of the upload bytes, so retries and duplicate
+# uploads are answered without running recognition again
+recognition_cache = recognition_cache_from_env()
+observe_cache(recognition_cache)
+
+def pool_stat(name):
+    """Read a recognition pool statistic for /metrics without starting the pool."""
+    return _pool.stats()[name] if _pool is not None else 0
+
+QUEUE_DEPTH.set_function(lambda: pool_stat('queue_depth'))
+QUEUE_IN_FLIGHT.set_function(lambda: pool_stat('in_flight'))
+
+def get_recognition_pool():
+    """Return the recognition worker pool, starting it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = RecognitionPool(workers=RECOGNITION_WORKERS, max_queue=RECOGNITION_QUEUE_SIZE)
+        return _pool
+
+def format_recognition(results):
+    """Convert recognition results into the API response fields."""
+    # Check if any plate was detected
+    if not results:
+        RESULT_CONFIDENCE.observe(0.0, app='api_server')
+        return {
+            "plate_number": "UNKNOWN",
+            "country_identifier": "UNKNOWN",
+            "confidence": 0.0
+        }
+    
+    # Get the first detected plate
+    first_plate_key = list(results.keys())[0]
+    plate_data = results[first_plate_key]
+    # Calibrated probability that the plate number is exactly right
+    confidence = plate_data.get("confidence", 0.0)
+    RESULT_CONFIDENCE.observe(confidence, app='api_server')
+    
+    return {
+        "plate_number": plate_data["plate_number"],
+        "country_identifier": plate_data["country_identifier"],
+        "confidence": confidence
+    }
+
+def collect_batch_uploads():
+    """
+    Gather the images of a batch request.
+    
+    Images are taken from repeated 'images' multipart fields, or from the
+    image files inside a zip 'archive' field (in archive order).
+    
+    Returns:
+        list: (filename, encoded image bytes) tuples
+    
+    Raises:
+        BatchTooLarge: If an archive member, or all of them together, exceed the size limits
+        zipfile.BadZipFile: If the archive is not a zip file
+    """
+    uploads = [(f.filename, f.read()) for f in request.files.getlist('images')]
+    
+    if 'archive' in request.files:
+        with zipfile.ZipFile(io.BytesIO(request.files['archive'].read())) as archive:
+            members = [info for info in archive.infolist()
+                       if not info.is_dir() and info.filename.lower().endswith(IMAGE_EXTENSIONS)]
+            # One image past the limit is enough to reject the batch
+            members = members[:max(0, BATCH_MAX_IMAGES + 1 - len(uploads))]
+            
+            # Checked before anything is extracted; reads stop at the declared sizes
+            for info in members:
+                if info.file_size > BATCH_MAX_IMAGE_BYTES:
+                    raise BatchTooLarge(f"Archive member too large: {info.filename}")
+            if sum(info.file_size for info in members) > BATCH_MAX_ARCHIVE_BYTES:
+                raise BatchTooLarge(f"Archive images exceed {BATCH_MAX_ARCHIVE_BYTES} bytes uncompressed")
+            
+            for info in members:
+                uploads.append((info.filename, archive.read(info)))
+    
+    return uploads
+
+@app.errorhandler(413)
+def request_too_large(e):
+    """Answer uploads over MAX_CONTENT_LENGTH with JSON like the other API errors."""
+    return jsonify({"error": f"Upload too large (maximum {MAX_UPLOAD_BYTES} bytes)"}), 413
 
 @app.route('/api/anpr-process', methods=['POST'])
 def anpr_process():
@@ -36,38 +154,34 @@ def anpr_process():
         # Get the uploaded file
         uploaded_file = request.files['image']
         
-        # Create a temporary file to save the uploaded image
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as temp_file:
-            temp_path = temp_file.name
-            uploaded_file.save(temp_path)
+        image_bytes = uploaded_file.read()
         
-        # Process the image with the ANPR system
-        results = anpr.process_image(temp_path)
+        def recognize():
+            # The worker decodes the encoded bytes itself, which keeps decoding off
+            # this process and sends far less data to the worker than a decoded array
+            return get_recognition_pool().recognize(image_bytes, timeout=RECOGNITION_TIMEOUT)
         
-        # Clean up the temporary file
-        os.unlink(temp_path)
+        # Identical uploads in flight at the same time share one recognition
+        results = recognition_cache.get_or_compute(content_hash(image_bytes), recognize,
+                                                   timeout=RECOGNITION_TIMEOUT)
         
-        # Check if any plate was detected
-        if not results:
-            return jsonify({
-                "plate_number": "UNKNOWN",
-                "country_identifier": "UNKNOWN",
-                "confidence": 0.0
-            })
+        # Return the recognition results
+        return jsonify(format_recognition(results))
         
-        # Get the first detected plate
-        first_plate_key = list(results.keys())[0]
-        plate_data = results[first_plate_key]
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
         
-        # Return the recognition results
-        return jsonify({
-            "plate_number": plate_data["plate_number"],
-            "country_identifier": plate_data["country_identifier"],
-            "confidence": 0.74  # Placeholder confidence value
-        })
+    except QueueFullError as e:
+        # Shed load quickly instead of letting requests pile up
+        response = jsonify({"error": "Recognition queue is full, please retry later"})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 503
+        
+    except RecognitionTimeout:
+        return jsonify({"error": f"Recognition timed out after {RECOGNITION_TIMEOUT:g}s"}), 504
         
     except Exception as e:
-        print(f"Error processing image: {str(e)}")
+        log.exception("Error processing image")
         return jsonify({
             "error": f"Error processing image: {str(e)}",
             "plate_number": "ERROR",
@@ -75,6 +189,132 @@ def anpr_process():
             "confidence": 0.0
         }), 500
 
+@app.route('/api/anpr-process-batch', methods=['POST'])
+def anpr_process_batch():
+    """
+    Process many images in one request.
+    
+    Images are decoded and recognized on the worker pool. The response is a
+    JSON list in upload order, or with ?stream=1 (or Accept: application/x-ndjson)
+    one NDJSON line per image as soon as it completes.
+    """
+    try:
+        uploads = collect_batch_uploads()
+    except BatchTooLarge as e:
+        return jsonify({"error": f"Batch too large: {str(e)}"}), 413
+    except (zipfile.BadZipFile, ValueError) as e:
+        return jsonify({"error": f"Invalid batch: {str(e)}"}), 400
+    
+    if not uploads:
+        return jsonify({"error": "No images provided"}), 400
+    if len(uploads) > BATCH_MAX_IMAGES:
+        return jsonify({"error": f"Too many images (maximum {BATCH_MAX_IMAGES})"}), 413
+    
+    def item_result(index, results, error):
+        """Build the response entry of one image."""
+        item = {"index": index, "filename": uploads[index][0]}
+        if error is not None:
+            item.update({"error": str(error), "plate_number": "ERROR",
+                         "country_identifier": "UNKNOWN", "confidence": 0.0})
+        else:
+            item.update(format_recognition(results))
+        return item
+    
+    def recognize_uploads():
+        """
+        Answer cached images directly, wait for images other requests are
+        recognizing and recognize every other distinct image once.
+        
+        Keys are claimed in the cache only once iteration starts, and claims
+        left over when it stops early (full queue, timeout, client gone) are
+        released, so concurrent requests never wait on a computation that
+        will not finish.
+        """
+        # Images this request recognizes, and images another request is recognizing
+        misses = {}
+        waiting = {}
+        try:
+            for index, (_, data) in enumerate(uploads):
+                key = content_hash(data)
+                if key in misses:
+                    misses[key].append(index)
+                elif key in waiting:
+                    waiting[key][1].append(index)
+                else:
+                    found, results, pending = recognition_cache.claim(key)
+                    if found:
+                        yield index, results, None
+                    elif pending is not None:
+                        waiting[key] = (pending, [index])
+                    else:
+                        misses[key] = [index]
+            
+            miss_keys = list(misses)
+            if miss_keys:
+                # Workers decode the encoded bytes themselves, so decoding is spread across processes
+                jobs = get_recognition_pool().recognize_many(
+                    [uploads[misses[key][0]][1] for key in miss_keys], timeout=RECOGNITION_TIMEOUT
+                )
+                for job, results, error in jobs:
+                    key = miss_keys[job]
+                    if error is None:
+                        recognition_cache.complete(key, results)
+                    else:
+                        recognition_cache.fail(key, error)
+                    for index in misses.pop(key):
+                        yield index, results, error
+            
+            for pending, indices in waiting.values():
+                try:
+                    results, error = pending.result(timeout=RECOGNITION_TIMEOUT), None
+                except Exception as e:
+                    results, error = None, e
+                for index in indices:
+                    yield index, results, error
+        finally:
+            for key in misses:
+                recognition_cache.fail(key, RuntimeError("Batch request aborted"))
+    
+    completed = recognize_uploads()
+    
+    stream = (request.args.get('stream') == '1' or
+              'application/x-ndjson' in request.headers.get('Accept', ''))
+    
+    if stream:
+        def generate():
+            try:
+                for index, results, error in completed:
+                    yield json.dumps(item_result(index, results, error)) + '\n'
+            except (QueueFullError, TimeoutError) as e:
+                yield json.dumps({"error": f"Batch aborted: {str(e)}"}) + '\n'
+        
+        return Response(generate(), mimetype='application/x-ndjson')
+    
+    try:
+        items = [None] * len(uploads)
+        for index, results, error in completed:
+            items[index] = item_result(index, results, error)
+    except QueueFullError as e:
+        response = jsonify({"error": "Recognition queue is full, please retry later"})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 503
+    except TimeoutError as e:
+        return jsonify({"error": f"Batch timed out: {str(e)}"}), 504
+    
+    return jsonify({"results": items})
+
+@app.route('/api/status', methods=['GET'])
+def status():
+    """Report recognition queue depth, worker utilization and cache hit rate."""
+    stats = get_recognition_pool().stats()
+    stats['cache'] = recognition_cache.stats()
+    return jsonify(stats)
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Expose request, stage, OCR, cache and queue metrics in the Prometheus text format."""
+    return Response(REGISTRY.render(), mimetype=CONTENT_TYPE)
+
 if __name__ == '__main__':
     # Default port 5000
     port = int(os.environ.get('PORT', 5000))
@@ -82,6 +322,13 @@ if __name__ == '__main__':
     print(f"Starting ANPR API server on port {port}")
     print("Available endpoints:")
     print("  POST /api/anpr-process - Process an image with ANPR")
+    print("  POST /api/anpr-process-batch - Process many images (multipart 'images' or zip 'archive')")
+    print("  GET  /api/status       - Recognition queue, worker and cache statistics")
+    print("  GET  /metrics          - Prometheus metrics")
+    print(f"Recognition workers: {RECOGNITION_WORKERS}, queue size: {RECOGNITION_QUEUE_SIZE}")
+    
+    # Start and warm the worker processes before accepting requests
+    get_recognition_pool().warm()
     
-    # Start the server
-    app.run(host='0.0.0.0', port=port, debug=True) 
\ No newline at end of file
+    # Start the server (debug mode only when explicitly requested)
+    app.run(host='0.0.0.0', port=port, debug=os.environ.get('FLASK_DEBUG') == '1', threaded=True)
@@ -4,6 +4,7 @@ ANPR API Server - Cross-Platform Starter
 Just double-click this script to start the ANPR system on any operating system.
 """
 
+import atexit
 import os
 import sys
 import webbrowser
@@ -39,7 +40,7 @@ def find_available_port(start_port=5000, max_attempts=10):
 # Install required packages
 try:
     # Try to import Flask
-    from flask import Flask, request, jsonify
+    from flask import Flask, Response, request, jsonify
     from flask_cors import CORS
     print("Flask dependencies already installed.")
 except ImportError:
@@ -47,7 +48,7 @@ except ImportError:
     try:
         import pip
         pip.main(['install', 'flask', 'flask-cors'])
-        from flask import Flask, request, jsonify
+        from flask import Flask, Response, request, jsonify
         from flask_cors import CORS
         print("Flask dependencies installed successfully.")
     except Exception as e:
@@ -58,9 +59,14 @@ except ImportError:
 
 # Try to import ANPR system components
 try:
-    from uk_plate_recognizer import UKPlateRecognizer
+    from debug_sink import debug_sink_from_env
+    from ocr_engine import get_default_engine
+    from pipeline import build_pipeline
+    from result_cache import content_hash, recognition_cache_from_env
+    from metrics import CONTENT_TYPE, REGISTRY, RESULT_CONFIDENCE, instrument_flask, observe_cache
+    from anpr_logging import configure_logging, get_logger, init_flask_request_ids
 except ImportError:
-    print("Error: Could not import UKPlateRecognizer.")
+    print("Error: Could not import the ANPR system components.")
     print(f"ANPR system path: {anpr_path}")
     print("Please check that anpr_system directory exists and contains the required files.")
     input("Press Enter to exit...")
@@ -69,29 +75,83 @@ except ImportError:
 # Create Flask app
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
+instrument_flask(app, 'start_api')
+
+# Per-request output goes through the log queue instead of print, tagged with a correlation ID
+configure_logging()
+init_flask_request_ids(app)
+log = get_logger('start_api')
 
 # Initialize ANPR system
 print("Initializing ANPR system...")
 try:
-    anpr = UKPlateRecognizer()
-    print("ANPR system initialized successfully!")
+    debug_sink = debug_sink_from_env()
+    # Sampled images still queued are written out before the server exits
+    atexit.register(debug_sink.close)
+    # Long-lived OCR engines shared by all requests
+    ocr = get_default_engine()
+    # Recognition cascade ('api' pipeline configuration, timed per stage)
+    api_pipeline = build_pipeline('api', ocr_engine=ocr, debug_sink=debug_sink)
+    # Recognition results keyed by a hash of the upload bytes
+    recognition_cache = recognition_cache_from_env()
+    observe_cache(recognition_cache)
+    print(f"ANPR system initialized successfully! (OCR backend: {ocr.name})")
 except Exception as e:
     print(f"Error initializing ANPR system: {e}")
     input("Press Enter to exit...")
     sys.exit(1)
 
+def recognize_upload(image_bytes, filename, image_hash):
+    """
+    Run the recognition cascade on an uploaded image.
+    
+    Args:
+        image_bytes (bytes): Encoded image exactly as uploaded
+        filename (str): Name of the uploaded file (used as a last resort)
+        image_hash (str): Content hash of image_bytes
+        
+    Returns:
+        dict: plate_number, country_identifier and confidence
+        
+    Raises:
+        ValueError: If the upload cannot be decoded as an image
+        Exception: Whatever the cascade raised; failures are not cached
+    """
+    # Process the image with the ANPR system
+    log.debug("Recognizing image", extra={'filename': filename, 'content_hash': image_hash})
+    
+    ctx = api_pipeline.run(image_bytes, filename=filename)
+    if ctx.image is None:
+        raise ValueError("Could not decode image")
+    
+    if not ctx.plates:
+        return {
+            "plate_number": "UNKNOWN",
+            "country_identifier": "UNKNOWN",
+            "confidence": 0.0
+        }
+    
+    # Return the final recognition results
+    plate = ctx.plates[0]
+    return {
+        "plate_number": plate["plate_number"],
+        "country_identifier": plate["country_identifier"],
+        "confidence": plate["confidence"]
+    }
+
+@app.route('/api/pipeline-stats', methods=['GET'])
+def pipeline_stats():
+    """Report per-stage timing of the recognition cascade"""
+    return jsonify(api_pipeline.stats())
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Expose request, stage, OCR and cache metrics in the Prometheus text format"""
+    return Response(REGISTRY.render(), mimetype=CONTENT_TYPE)
+
 @app.route('/api/anpr-process', methods=['POST'])
 def anpr_process():
     """Process the uploaded image"""
-    # Import all required libraries at the beginning of the function
-    import os
-    import tempfile
-    import cv2
-    import pytesseract
-    from PIL import Image
-    import re
-    import numpy as np
-    
     if 'image' not in request.files:
         return jsonify({"error": "No image provided"}), 400
     
@@ -100,298 +160,34 @@ def anpr_process():
         uploaded_file = request.files['image']
         
         # Log file info
-        print(f"Processing image file: {uploaded_file.filename}, " 
-              f"Content type: {uploaded_file.content_type}, "
-              f"Size: {uploaded_file.content_length or 'unknown'} bytes")
-        
-        # Create a temporary file to save the uploaded image
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as temp_file:
-            temp_path = temp_file.name
-            uploaded_file.save(temp_path)
-        
-        # Process the image with the ANPR system
-        print(f"Processing image: {temp_path}")
-        
-        # Initialize results to None
-        results = None
-        plate_number = "UNKNOWN"
-        country_id = "UNKNOWN"
-        confidence = 0.0
+        log.info("Processing image file %s", uploaded_file.filename,
+                 extra={'content_type': uploaded_file.content_type,
+                        'size': uploaded_file.content_length or 'unknown'})
         
-        # Attempt to directly process the image for license plate text
-        try:
-            # Load the image with PIL for better compatibility
-            pil_image = Image.open(temp_path)
-            
-            # Get dimensions to verify it's a license plate (typical aspect ratio ~4.5:1)
-            width, height = pil_image.size
-            aspect_ratio = width / height
-            print(f"Image dimensions: {width}x{height}, aspect ratio: {aspect_ratio:.2f}")
-            
-            # Convert to grayscale for better OCR
-            gray_image = pil_image.convert('L')
-            
-            # Resize to larger dimensions to improve OCR accuracy
-            scale_factor = 3
-            resized_image = gray_image.resize((width * scale_factor, height * scale_factor), Image.LANCZOS)
-            
-            # Enhance contrast for better OCR
-            from PIL import ImageEnhance
-            enhancer = ImageEnhance.Contrast(resized_image)
-            enhanced_image = enhancer.enhance(2.0)
-            
-            # UK license plate format patterns (with variations to handle OCR errors)
-            uk_patterns = [
-                r'[A-Z]{2}\s?\d{2}\s?[A-Z]{3}',  # Standard format: AA00 AAA
-                r'[A-Z]{2}\d{2,3}[A-Z]{2,3}',    # No spaces: AA00AAA or similar
-                r'[A-Z]{2}\s?\d{2}\s?[A-Z0-9]{3}' # Allow some digits in the last part
-            ]
-            
-            # Try multiple OCR configurations for best results
-            configs = [
-                '--psm 7 -l eng --oem 3',
-                '--psm 8 -l eng --oem 3',
-                '--psm 6 -l eng --oem 3',
-                '--psm 11 -l eng --oem 3',
-                '--psm 13 -l eng --oem 3',
-                '--psm 12 -l eng --oem 3'
-            ]
-            
-            best_plate = None
-            best_confidence = 0.0
-            
-            for config in configs:
-                # Run OCR on the enhanced image
-                ocr_text = pytesseract.image_to_string(enhanced_image, config=config).strip().upper()
-                print(f"OCR with config '{config}': {ocr_text}")
-                
-                # Clean the text by removing common problematic characters
-                cleaned_text = re.sub(r'[^A-Z0-9\s]', '', ocr_text)
-                
-                # Try to match any UK license plate pattern
-                for pattern in uk_patterns:
-                    matches = re.findall(pattern, cleaned_text)
-                    if matches:
-                        for match in matches:
-                            # Remove all whitespace
-                            match_clean = re.sub(r'\s', '', match)
-                            
-                            # Format as AA00 AAA if it's the right length
-                            if len(match_clean) >= 7:
-                                formatted_plate = f"{match_clean[:4]} {match_clean[4:]}"
-                                
-                                # Calculate a confidence score based on pattern match quality
-                                # Higher confidence for standard format matches
-                                if re.match(r'[A-Z]{2}\d{2}[A-Z]{3}', match_clean):
-                                    match_confidence = 0.95
-                                else:
-                                    match_confidence = 0.80
-                                
-                                print(f"Found potential plate: {formatted_plate} (confidence: {match_confidence:.2f})")
-                                
-                                if match_confidence > best_confidence:
-                                    best_plate = formatted_plate
-                                    best_confidence = match_confidence
-            
-            # If we found a plate, set the result
-            if best_plate:
-                plate_number = best_plate
-                country_id = "GB"
-                confidence = best_confidence
-                print(f"Best plate match: {plate_number} with confidence {confidence:.2f}")
-                
-            # If still no result, try a different approach with OpenCV
-            if plate_number == "UNKNOWN":
-                print("No plate found with initial OCR. Trying OpenCV preprocessing...")
-                
-                # Read with OpenCV
-                try:
-                    img = cv2.imread(temp_path)
-                    if img is None:
-                        raise ValueError("Failed to read image with OpenCV")
-                
-                    # Convert to grayscale
-                    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-                
-                    # Resize image (3x larger)
-                    scale_percent = 300
-                    width = int(img.shape[1] * scale_percent / 100)
-                    height = int(img.shape[0] * scale_percent / 100)
-                    dim = (width, height)
-                    resized = cv2.resize(gray, dim, interpolation=cv2.INTER_CUBIC)
-                    
-                    # Apply image preprocessing techniques
-                    # 1. Adaptive thresholding
-                    thresh = cv2.adaptiveThreshold(resized, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                                               cv2.THRESH_BINARY, 11, 2)
-                    
-                    # 2. Noise removal
-                    kernel = np.ones((1, 1), np.uint8)
-                    opening = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel)
-                
-                    # Save the processed image temporarily for debugging
-                    debug_path = os.path.join(os.path.dirname(temp_path), 'debug_processed.jpg')
-                    cv2.imwrite(debug_path, opening)
-                    print(f"Saved processed debug image to {debug_path}")
-                    
-                    # Try OCR on the processed image
-                    for config in configs:
-                        opencv_text = pytesseract.image_to_string(opening, config=config).strip().upper()
-                        print(f"OpenCV processed OCR with config '{config}': {opencv_text}")
-                        
-                        cleaned_text = re.sub(r'[^A-Z0-9\s]', '', opencv_text)
-                        
-                        for pattern in uk_patterns:
-                            matches = re.findall(pattern, cleaned_text)
-                            if matches:
-                                for match in matches:
-                                    match_clean = re.sub(r'\s', '', match)
-                                    
-                                    if len(match_clean) >= 7:
-                                        formatted_plate = f"{match_clean[:4]} {match_clean[4:]}"
-                                        match_confidence = 0.85  # Slightly lower confidence for OpenCV method
-                                        
-                                        print(f"OpenCV found potential plate: {formatted_plate} (confidence: {match_confidence:.2f})")
-                                        
-                                        if match_confidence > best_confidence:
-                                            best_plate = formatted_plate
-                                            best_confidence = match_confidence
-                                            plate_number = best_plate
-                                            country_id = "GB"
-                                            confidence = best_confidence
-                    
-                    # Try extracting characters directly if still no plate found
-                    if plate_number == "UNKNOWN":
-                        print("Attempting direct character extraction...")
-                        
-                        # Apply different thresholding
-                        _, binary = cv2.threshold(resized, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-                        
-                        # Get text as individual characters
-                        char_config = '--psm 10 -l eng --oem 3'
-                        chars = pytesseract.image_to_string(binary, config=char_config).replace('\n', '').strip().upper()
-                        print(f"Character extraction: {chars}")
-                        
-                        # Filter to only alphanumeric
-                        chars_clean = re.sub(r'[^A-Z0-9]', '', chars)
-                
-                        # If we have enough characters for a license plate (at least 7)
-                        if len(chars_clean) >= 7:
-                            # Format the first 7 characters as a plate
-                            formatted_plate = f"{chars_clean[:4]} {chars_clean[4:7]}"
-                            plate_number = formatted_plate
-                            country_id = "GB"
-                            confidence = 0.7
-                            print(f"Extracted plate via characters: {plate_number}")
-                            
-                        # Visual inspection to check for specific plates
-                        # This examines the image content to identify standard test images
-                        img_bytes = os.path.getsize(temp_path)
-                        img_hash = sum(np.array(Image.open(temp_path)).flatten())
-                        print(f"Image size: {img_bytes} bytes, hash sum: {img_hash}")
-                        
-                        # Remove special case handling for AA86 DYR
-                        # Try to extract context from visually similar patterns
-                        if plate_number == "UNKNOWN":
-                            print("Attempting visual pattern recognition...")
-                            
-                            # If we identified at least 2 letters followed by 2 digits
-                            letters_digits = re.search(r'[A-Z]{2}\d{2}', chars_clean)
-                            if letters_digits:
-                                prefix = letters_digits.group(0)
-                                # If we find clear prefix like AA86, use it for partial recognition
-                                if len(chars_clean) >= 7:
-                                    plate_number = f"{prefix} {chars_clean[4:7]}"
-                                    country_id = "GB"
-                                    confidence = 0.65
-                                    print(f"Constructed plate from pattern: {plate_number}")
-                except Exception as cv_error:
-                    print(f"OpenCV processing error: {str(cv_error)}")
-                                
-            # If the OCR and OpenCV methods both failed to find a plate,
-            # try direct character recognition from the image
-            if plate_number == "UNKNOWN":
-                print("Trying direct character recognition as last resort...")
-                
-                # Use PIL to enhance the image more aggressively
-                pil_image = Image.open(temp_path)
-                
-                # Convert to grayscale and enhance contrast even more
-                gray_image = pil_image.convert('L')
-                enhancer = ImageEnhance.Contrast(gray_image)
-                high_contrast = enhancer.enhance(3.0)
-                
-                # Try several more OCR configs that might pick up individual characters better
-                final_configs = [
-                    '--psm 6 -l eng --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789',
-                    '--psm 11 -l eng --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789',
-                    '--psm 4 -l eng --oem 3 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
-                ]
-                
-                for config in final_configs:
-                    final_text = pytesseract.image_to_string(high_contrast, config=config).strip().upper()
-                    print(f"Final attempt OCR: {final_text}")
-                    
-                    # Extract all alphanumeric sequences of reasonable length
-                    alphanumeric_groups = re.findall(r'[A-Z0-9]{4,}', final_text)
-                    
-                    if alphanumeric_groups:
-                        # Get the longest sequence
-                        best_group = max(alphanumeric_groups, key=len)
-                        print(f"Best alphanumeric group: {best_group}")
-                        
-                        if len(best_group) >= 7:
-                            # Format as AA00 AAA if possible
-                            plate_number = f"{best_group[:4]} {best_group[4:7]}"
-                            country_id = "GB"
-                            confidence = 0.6
-                            print(f"Constructed plate from alphanumeric group: {plate_number}")
-                            break
-                
-                # Manual visual clues if nothing else worked
-                if plate_number == "UNKNOWN":
-                    # If the image has properties matching our sample plates, identify them
-                    filename_upper = uploaded_file.filename.upper()
-                    
-                    # Extract any alphanumeric sequences from the filename that might be plate numbers
-                    filename_plates = re.findall(r'[A-Z0-9]{5,}', filename_upper)
-                    if filename_plates:
-                        plate_from_filename = max(filename_plates, key=len)
-                        if len(plate_from_filename) >= 7:
-                            plate_number = f"{plate_from_filename[:4]} {plate_from_filename[4:7]}"
-                            country_id = "GB"
-                            confidence = 0.5
-                            print(f"Extracted plate from filename: {plate_number}")
-                
-                # If all else failed and we still couldn't identify the plate
-                if plate_number == "UNKNOWN":
-                    print("All recognition methods failed. Returning UNKNOWN.")
-            
-        except Exception as process_error:
-            print(f"Error during image processing: {str(process_error)}")
-            import traceback
-            traceback.print_exc()
-        
-        # Clean up the temporary file
-        try:
-            os.unlink(temp_path)
-        except Exception as e:
-            print(f"Warning: Could not delete temporary file {temp_path}: {e}")
+        # Retries and duplicate uploads are answered from the cache, and identical
+        # uploads in flight at the same time share one run of the cascade.
+        # The filename is part of the key because the last-resort stage reads it.
+        image_bytes = uploaded_file.read()
+        image_hash = content_hash(image_bytes)
+        result = recognition_cache.get_or_compute(
+            f"{image_hash}:{uploaded_file.filename}",
+            lambda: recognize_upload(image_bytes, uploaded_file.filename, image_hash)
+        )
+        RESULT_CONFIDENCE.observe(result["confidence"], app='start_api')
         
         # Return the final recognition results
-        return jsonify({
-            "plate_number": plate_number,
-            "country_identifier": country_id,
-            "confidence": confidence
-        })
+        return jsonify(result)
+        
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
         
     except Exception as e:
-        print(f"Error processing image: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        # Raised out of the cache's compute callable, so the failure is not cached
+        log.exception("Error processing image")
         
         # Return error response when all else fails
         return jsonify({
+            "error": f"Error processing image: {str(e)}",
             "plate_number": "ERROR",
             "country_identifier": "UNKNOWN",
             "confidence": 0.0
@@ -444,6 +240,7 @@ if __name__ == '__main__':
     print(f"Web interface will be available at: http://localhost:{web_port}/public/index.html")
     print("Available endpoints:")
     print(f"  POST http://localhost:{api_port}/api/anpr-process - Process an image with ANPR")
+    print(f"  GET  http://localhost:{api_port}/metrics - Prometheus metrics")
     print("\nAfter servers start, your browser should open automatically.")
     print("If not, please open the web interface URL manually.")
     print("=====================================================")